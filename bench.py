@@ -0,0 +1,164 @@
+# 热点函数微基准(仅用于电脑端)
+# 覆盖Vector2D运算、inter_line_and_linesegment、Circle.collision、Line.collision、Line.intpos_in_rect与Physics2D.update_obj_move。
+# 每项先用timeit自动确定每轮调用次数(每轮至少0.2秒)，关闭gc重复测量多轮，以最小值作为结果(受其他进程干扰最小)，同时给出中位数与离散程度。
+# 用法:
+#   python bench.py [--json 结果.json] [--repeat 7] [--filter 名字片段]
+#   python bench.py --compare 旧结果.json 新结果.json [--threshold 0.1]   # 变慢超过阈值的项目以返回值1报告
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+from physics2d import *
+
+def make_cases() -> dict[str, tuple[str, dict]]:
+    """返回 名字 -> (语句, 命名空间)。语句在命名空间中反复执行"""
+    v1 = Vector2D(3.0, 4.0)
+    v2 = Vector2D(-1.5, 2.5)
+
+    # 两圆：重叠与远离。均非fixed且不启用扩展校正，检测不会移动它们，每次调用的输入相同
+    phys = Physics2D()
+    circle_a = Circle(Pos2D(0.0, 0.0), 1.0, 1.0)
+    circle_near = Circle(Pos2D(1.5, 0.5), 1.0, 1.0)
+    circle_far = Circle(Pos2D(10.0, 10.0), 1.0, 1.0)
+
+    # 直线与圆：关闭运动校正，避免第一次检测后圆被推开
+    phys_line = Physics2D()
+    phys_line.basic_correction_enabled = False
+    line = Line(Pos2D(0.0, 0.0), Vector2D(1.0, 0.2), 0.0, True)
+    circle_on_line = Circle(Pos2D(3.0, 1.0), 1.0, 1.0)
+    circle_off_line = Circle(Pos2D(3.0, 8.0), 1.0, 1.0)
+    circle_crossing = Circle(Pos2D(3.0, -3.0), 1.0, 1.0)
+    circle_crossing.last_pos = Pos2D(3.0, 3.0)
+
+    # 积分：受力的单个物体，默认模式与原地更新模式
+    phys_move = Physics2D()
+    phys_move.global_acceleration = Vector2D(0.0, -9.8)
+    body = Circle(Pos2D(0.0, 0.0), 1.0, 2.0)
+    body.velocity = Vector2D(1.0, 0.0)
+    body.extra_force = Vector2D(0.5, 0.0)
+    phys_move.append(body)
+    phys_inplace = Physics2D()
+    phys_inplace.global_acceleration = Vector2D(0.0, -9.8)
+    phys_inplace.inplace_update_enabled = True
+    body_inplace = Circle(Pos2D(0.0, 0.0), 1.0, 2.0)
+    body_inplace.velocity = Vector2D(1.0, 0.0)
+    phys_inplace.append(body_inplace)
+
+    namespace = {
+        "v1": v1, "v2": v2,
+        "inter": inter_line_and_linesegment,
+        "line_pos": Pos2D(0.0, 0.0), "line_dir": Vector2D(1.0, 0.0),
+        "seg_start": Pos2D(1.0, -1.0), "seg_end": Pos2D(2.0, 1.0), "seg_miss": Pos2D(2.0, -0.5),
+        "phys": phys, "circle_a": circle_a, "circle_near": circle_near, "circle_far": circle_far,
+        "phys_line": phys_line, "line": line,
+        "circle_on_line": circle_on_line, "circle_off_line": circle_off_line, "circle_crossing": circle_crossing,
+        "phys_move": phys_move, "body": body, "phys_inplace": phys_inplace, "body_inplace": body_inplace,
+    }
+    statements = {
+        "Vector2D.__add__": "v1 + v2",
+        "Vector2D.__mul__ scalar": "v1 * 2.5",
+        "Vector2D.__mul__ dot": "v1 * v2",
+        "Vector2D.normalize": "v1.normalize()",
+        "Vector2D.rotate90": "v1.rotate90()",
+        "inter_line_and_linesegment hit": "inter(line_pos, line_dir, seg_start, seg_end)",
+        "inter_line_and_linesegment miss": "inter(line_pos, line_dir, seg_start, seg_miss)",
+        "Circle.collision hit": "circle_a.collision(circle_near, phys)",
+        "Circle.collision miss": "circle_a.collision(circle_far, phys)",
+        "Line.collision hit": "line.collision(circle_on_line, phys_line)",
+        "Line.collision miss": "line.collision(circle_off_line, phys_line)",
+        "Line.collision crossing": "line.collision(circle_crossing, phys_line)",
+        "Line.intpos_in_rect": "line.intpos_in_rect(40.0, 30.0)",
+        "Physics2D.update_obj_move": "phys_move.update_obj_move(body, 1e-6)",
+        "Physics2D.update_obj_move inplace": "phys_inplace.update_obj_move(body_inplace, 1e-6)",
+    }
+    return {name: (stmt, namespace) for name, stmt in statements.items()}
+
+def measure(stmt: str, namespace: dict, repeat: int, min_time: float = 0.2) -> dict:
+    """返回每次调用的耗时统计(纳秒)"""
+    timer = timeit.Timer(stmt, globals=namespace)
+    number = 1
+    while True:
+        # 与Timer.autorange相同的思路，但要求每轮至少min_time秒
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    samples = [t / number * 1e9 for t in timer.repeat(repeat, number)]
+    return {
+        "ns": min(samples),
+        "median_ns": statistics.median(samples),
+        "stdev_ns": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+def run(repeat: int, name_filter: str | None) -> dict:
+    results = {}
+    for name, (stmt, namespace) in make_cases().items():
+        if name_filter is not None and name_filter not in name:
+            continue
+        results[name] = measure(stmt, namespace, repeat)
+        result = results[name]
+        print("{:<36} {:>10.1f} ns   median {:>10.1f}   stdev {:>6.1f}".format(
+            name, result["ns"], result["median_ns"], result["stdev_ns"]), flush=True)
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """比较两次结果，返回变慢超过threshold(比例)的项目数"""
+    with open(old_path, encoding="utf-8") as file:
+        old = json.load(file)["results"]
+    with open(new_path, encoding="utf-8") as file:
+        new = json.load(file)["results"]
+    regressions = 0
+    print("{:<36} {:>10} {:>10} {:>8}".format("benchmark", "old ns", "new ns", "change"))
+    for name in old:
+        if name not in new:
+            print("{:<36} {:>10.1f} {:>10} {:>8}".format(name, old[name]["ns"], "-", "missing"))
+            continue
+        change = new[name]["ns"] / old[name]["ns"] - 1
+        mark = ""
+        if change > threshold:
+            mark = "  SLOWER"
+            regressions += 1
+        elif change < -threshold:
+            mark = "  faster"
+        print("{:<36} {:>10.1f} {:>10.1f} {:>+7.1f}%{}".format(name, old[name]["ns"], new[name]["ns"], change * 100, mark))
+    for name in new:
+        if name not in old:
+            print("{:<36} {:>10} {:>10.1f} {:>8}".format(name, "-", new[name]["ns"], "new"))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for physics2d hot functions")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--repeat", type=int, default=7, help="timing rounds per benchmark (default 7)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown ratio reported as regression (default 0.1)")
+    args = parser.parse_args()
+    if args.compare is not None:
+        regressions = compare(args.compare[0], args.compare[1], args.threshold)
+        if regressions > 0:
+            print("{} benchmark(s) slower by more than {:.0f}%".format(regressions, args.threshold * 100))
+            sys.exit(1)
+        return
+    report = run(args.repeat, args.filter)
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
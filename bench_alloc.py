@@ -0,0 +1,113 @@
+# 每步内存分配检查(仅用于电脑端)
+# 用tracemalloc统计Physics2D.update每步的净分配与临时分配峰值，并统计每步新建的Vector2D/Pos2D与CollisionEvent个数，
+# 在两个场景中对比默认模式、原地更新模式以及原地更新加批量事件(复用事件对象)：
+# free    互不接触的球在四面墙之间飞行。原地更新模式下不应有任何净分配，也不应新建任何对象
+# contact 静置在箱底的一堆球，每步有大量接触。碰撞检测(Circle.collision、Line.collision)仍会创建临时向量，
+#         这里只报告每个接触新建的对象数，不作检查(见Physics2D.inplace_update_enabled)
+# MicroPython上每个新建的对象在下次GC前都不会释放，所以新建对象数比CPython的字节数更能反映GC压力。
+# 用法: python bench_alloc.py [步数]
+
+import sys
+import tracemalloc
+
+from physics2d import *
+
+def build_scene(n: int = 40) -> Physics2D:
+    """n个互不接触、在四面墙之间飞行的球"""
+    phys = Physics2D()
+    for pos, direction in (((0, 0), (0, 1)), ((4 * n, 0), (0, 1)), ((0, 0), (1, 0)), ((0, 40), (1, 0))):
+        phys.append(Line(Pos2D(*pos), Vector2D(*direction), 0, True))
+    for i in range(n):
+        ball = Circle(Pos2D(2 + i * 4, 20), 1, 1)
+        ball.velocity = Vector2D(0, 1)
+        phys.append(ball)
+    return phys
+
+def build_contact_scene(columns: int = 8, rows: int = 5) -> Physics2D:
+    """重力下在宽为columns个球的箱子里按行堆叠的球，预先运行到静置"""
+    phys = Physics2D()
+    phys.global_acceleration = Vector2D(0, -10)
+    width = columns * 2.0
+    for pos, direction in (((0, 0), (1, 0)), ((0, 0), (0, 1)), ((width, 0), (0, 1))):
+        phys.append(Line(Pos2D(*pos), Vector2D(*direction), 0, True))
+    for j in range(rows):
+        for i in range(columns):
+            ball = Circle(Pos2D(1.0 + i * 2.0, 1.0 + j * 2.0), 1, 1)
+            ball.collision_energy_loss = 0.5
+            phys.append(ball)
+    for _ in range(500):
+        phys.update(0.001)
+    return phys
+
+def measure(phys: Physics2D, steps: int, dt: float = 0.001):
+    """返回(每步净分配字节数, 每步临时分配峰值字节数)"""
+    for _ in range(10):
+        phys.update(dt) # 预热：让last_pos等缓冲区分配完毕
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    peak = 0
+    for _ in range(steps):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        phys.update(dt)
+        _, step_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, step_peak - before)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (end - start) / steps, peak
+
+def count_objects(phys: Physics2D, steps: int, dt: float = 0.001):
+    """返回(每步新建的向量数, 每步新建的CollisionEvent数, 每步的接触数)"""
+    counts = [0, 0, 0]
+    vector_init = Vector2D.__init__
+    event_init = CollisionEvent.__init__
+    def counted_vector(self, *args):
+        counts[0] += 1
+        vector_init(self, *args)
+    def counted_event(self, *args):
+        counts[1] += 1
+        event_init(self, *args)
+    new_event = phys._new_event
+    def count_contacts(*args):
+        counts[2] += 1
+        return new_event(*args)
+    for _ in range(10):
+        phys.update(dt)
+    phys._new_event = count_contacts
+    Vector2D.__init__ = counted_vector
+    CollisionEvent.__init__ = counted_event
+    try:
+        for _ in range(steps):
+            phys.update(dt)
+    finally:
+        Vector2D.__init__ = vector_init
+        CollisionEvent.__init__ = event_init
+        del phys._new_event
+    return counts[0] / steps, counts[1] / steps, counts[2] / steps
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("{:<8} {:<8} {:>12} {:>12} {:>10} {:>10} {:>10}".format(
+        "scene", "mode", "net B/step", "peak B/step", "vectors", "events", "contacts"))
+    failed = []
+    for scene, build in (("free", build_scene), ("contact", build_contact_scene)):
+        for mode, inplace, batch in (("default", False, False), ("inplace", True, False), ("+batch", True, True)):
+            phys = build()
+            phys.inplace_update_enabled = inplace
+            phys.batch_events_enabled = batch
+            net, peak = measure(phys, steps)
+            vectors, events, contacts = count_objects(phys, steps)
+            print("{:<8} {:<8} {:>12.1f} {:>12d} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                scene, mode, net, peak, vectors, events, contacts))
+            if scene == "contact" and contacts > 0:
+                print("{:<8} {:<8} {:>12} {:>12} {:>10.2f} {:>10.2f}   per contact".format(
+                    "", "", "", "", vectors / contacts, events / contacts))
+            if scene == "free" and inplace and (net != 0 or vectors != 0 or events != 0):
+                failed.append("inplace mode allocates in collision-free steps: {:.1f} B, {:.1f} vectors, {:.1f} events per step".format(net, vectors, events))
+    for message in failed:
+        print("FAIL: " + message)
+    if len(failed) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
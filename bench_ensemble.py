@@ -0,0 +1,61 @@
+# 系综后端对比(仅用于电脑端)
+# K个只有初始位置与速度不同的小世界(箱子中的几个球)，分别逐个用Physics2D运行和用EnsemblePhysics2D一起运行，
+# 比较总耗时，并检查每个世界的结果是否逐位相同。
+# 用法: python bench_ensemble.py [世界数] [每个世界的球数] [步数]
+
+import random
+import sys
+import time
+
+from physics2d import *
+from physics2d_ensemble import EnsemblePhysics2D
+
+def build_world(balls: int, seed: int) -> Physics2D:
+    """边长20的箱子中balls个球，位置与速度随机"""
+    random.seed(seed)
+    phys = Physics2D()
+    phys.global_acceleration = Vector2D(0, -9.8)
+    size = 20
+    for pos, direction in (((0, 0), (0, 1)), ((size, 0), (0, 1)), ((0, 0), (1, 0)), ((0, size), (1, 0))):
+        phys.append(Line(Pos2D(*pos), Vector2D(*direction), 0, True))
+    for _ in range(balls):
+        ball = Circle(Pos2D(random.uniform(2, size - 2), random.uniform(2, size - 2)), 1, 1)
+        ball.velocity = Vector2D(random.uniform(-10, 10), random.uniform(-10, 10))
+        ball.collision_energy_loss = 0.05
+        phys.append(ball)
+    return phys
+
+def state(phys: Physics2D) -> list:
+    return [(obj.pos.x, obj.pos.y, obj.velocity.x, obj.velocity.y) for obj in phys._fixed_objects + phys._active_objects]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    balls = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    steps = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    dt = 0.005
+    worlds = [build_world(balls, seed) for seed in range(count)]
+    ensemble = EnsemblePhysics2D(worlds)
+    print("{} worlds x {} balls, {} steps".format(count, balls, steps))
+
+    start = time.perf_counter()
+    for phys in worlds:
+        for _ in range(steps):
+            phys.update(dt)
+    separate = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(steps):
+        ensemble.update(dt)
+    together = time.perf_counter() - start
+    print("Physics2D one by one   {:>10.3f} s".format(separate))
+    print("EnsemblePhysics2D      {:>10.3f} s   ({:.1f}x)".format(together, separate / together))
+
+    probe = build_world(balls, 0)
+    for index, phys in enumerate(worlds):
+        ensemble.write_to(probe, index)
+        if state(probe) != state(phys):
+            print("FAIL: world {} differs from running alone".format(index))
+            sys.exit(1)
+    print("all worlds identical to running alone, {} collisions".format(int(ensemble.collision_counts.sum())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# 积分方法对比(仅用于电脑端)
+# 在没有碰撞的三个场景中，对每种integrator从大到小尝试dt，找出误差不超过容差的最大dt，
+# 比较在相同精度下各积分方法能用的步长，以及折算成每模拟1秒所需的加速度计算次数。
+#   弹簧: force_callback给出F = -kx，误差为能量的最大相对偏差
+#   洛伦兹力: 匀强磁场中的带电粒子，力垂直于速度，误差为动能的最大相对偏差(应保持不变)
+#   抛体: 只受重力，误差为终点与解析解的距离相对于位移的比例
+# 用法: python bench_integrators.py [容差] [模拟时间]
+
+import math
+import sys
+
+from physics2d import *
+from physics2d_integrators import Integrator
+
+INTEGRATORS = (("euler", 1), ("constant_acceleration", 1), ("verlet", 2), ("rk4", 4))
+"""(Integrator.method, 每步求加速度的次数)"""
+
+# 各场景设置初始状态，返回(force_callback, 求能量的函数或None)
+def spring(phys: Physics2D, ball: Circle):
+    ball.pos = Pos2D(1.0, 0.0)
+    ball.velocity = Vector2D(0.0, 0.0)
+    def energy() -> float:
+        return 0.5 * (ball.velocity.abs_square() + ball.pos.abs_square())
+    return lambda obj, pos, velocity: Vector2D(-pos.x, -pos.y), energy
+
+def lorentz(phys: Physics2D, ball: Circle):
+    ball.pos = Pos2D(0.0, 0.0)
+    ball.velocity = Vector2D(1.0, 0.0)
+    def energy() -> float:
+        return 0.5 * ball.velocity.abs_square()
+    # 与洛伦兹力.py相同的写法，角速度为1
+    return lambda obj, pos, velocity: velocity.rotate90(), energy
+
+def projectile(phys: Physics2D, ball: Circle):
+    phys.global_acceleration = Vector2D(0.0, -9.8)
+    ball.pos = Pos2D(0.0, 0.0)
+    ball.velocity = Vector2D(3.0, 20.0)
+    return None, None
+
+SCENES = (("spring", spring), ("lorentz", lorentz), ("projectile", projectile))
+
+def error_of(scene, integrator: str, dt: float, duration: float) -> float:
+    phys = Physics2D()
+    ball = Circle(Pos2D(0.0, 0.0), 0.1, 1.0)
+    phys.append(ball)
+    force_callback, energy = scene(phys, ball)
+    phys.integrator = Integrator(integrator, force_callback)
+    steps = int(round(duration / dt))
+    if energy is None:
+        for _ in range(steps):
+            phys.update(dt)
+        t = steps * dt
+        x = 3.0 * t
+        y = 20.0 * t - 4.9 * t * t
+        return math.sqrt((ball.pos.x - x) ** 2 + (ball.pos.y - y) ** 2) / math.sqrt(x * x + y * y)
+    initial = energy()
+    worst = 0.0
+    for _ in range(steps):
+        phys.update(dt)
+        worst = max(worst, abs(energy() / initial - 1.0))
+        if worst > 1e3:
+            break
+    return worst
+
+def largest_dt(scene, integrator: str, tolerance: float, duration: float) -> float | None:
+    """从0.5开始每次减半，返回第一个误差不超过tolerance的dt"""
+    dt = 0.5
+    while dt >= 1e-5:
+        if error_of(scene, integrator, dt, duration) <= tolerance:
+            return dt
+        dt *= 0.5
+    return None
+
+def main():
+    tolerance = float(sys.argv[1]) if len(sys.argv) > 1 else 1e-3
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    print("tolerance {:g}, {:g} s simulated".format(tolerance, duration))
+    print("{:<12} {:<22} {:>12} {:>10} {:>16}".format("scene", "integrator", "largest dt", "vs euler", "evaluations/s"))
+    for name, scene in SCENES:
+        euler_dt = None
+        for integrator, evaluations in INTEGRATORS:
+            dt = largest_dt(scene, integrator, tolerance, duration)
+            if integrator == "euler":
+                euler_dt = dt
+            if dt is None:
+                print("{:<12} {:<22} {:>12} {:>10} {:>16}".format(name, integrator, "< 1e-5", "-", "-"))
+                continue
+            ratio = "{:.3g}x".format(dt / euler_dt) if euler_dt is not None else "-"
+            print("{:<12} {:<22} {:>12.6g} {:>10} {:>16.0f}".format(name, integrator, dt, ratio, evaluations / dt))
+
+if __name__ == "__main__":
+    main()
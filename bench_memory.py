@@ -0,0 +1,67 @@
+# 每个物体的内存占用对比(仅用于电脑端)
+# 用tracemalloc统计创建大量Circle后每个物体占用的字节数(含其pos/velocity等向量和名字)，
+# 对比使用__slots__的当前实现与以__dict__存放属性的旧实现。
+# 休眠、数组后端、物体对缓存等功能的引擎内部状态由Physics2D按物体保存，不占物体的槽，这里检查物体没有以_开头的私有槽。
+# 用法: python bench_memory.py [物体数]
+
+import sys
+import tracemalloc
+
+from physics2d import *
+
+class DictVector2D:
+    """旧实现的向量：属性存放在__dict__中"""
+    def __init__(self, x: float, y: float):
+        self.x = x
+        self.y = y
+
+class DictPos2D(DictVector2D):
+    pass
+
+class DictCircle:
+    """旧实现的圆：与旧版PhysicalObject/Circle拥有相同的属性，全部存放在__dict__中"""
+    def __init__(self, pos: tuple[float, float], radius: float, mass: float, fixed: bool = False):
+        self.name = repr(self)
+        self.pos = DictPos2D(pos[0], pos[1])
+        self.last_pos = None
+        self.mass = mass
+        self.fixed = fixed
+        self.extra_force = DictVector2D(0, 0)
+        self.extra_acceleration = DictVector2D(0, 0)
+        self.velocity = DictVector2D(0, 0)
+        self.collision_handler = None
+        self.collision_energy_loss = 0.0
+        self.radius = radius
+
+def measure(factory, n: int) -> float:
+    """返回用factory创建n个物体时每个物体占用的字节数"""
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    objects = [factory(i) for i in range(n)]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 减去列表本身的占用
+    return (end - start) / n - 8
+
+def dict_plain(i: int):
+    return DictCircle((i * 2.0, 0.0), 1, 1)
+
+def slots_plain(i: int):
+    return Circle((i * 2.0, 0.0), 1, 1)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("{} bodies, bytes per body (including vectors and name)".format(n))
+    old_size = measure(dict_plain, n)
+    new_size = measure(slots_plain, n)
+    print("Circle             __dict__ {:>7.1f}   __slots__ {:>7.1f}   saved {:>5.1f}%".format(
+        old_size, new_size, 100 * (1 - new_size / old_size)))
+    private = [name for cls in Circle.__mro__ for name in getattr(cls, "__slots__", ()) if name.startswith("_")]
+    if len(private) > 0:
+        print("FAIL: engine-private slots on bodies: {}".format(", ".join(private)))
+        sys.exit(1)
+    print("Vector2D           __dict__ {:>7.1f}   __slots__ {:>7.1f}".format(
+        measure(lambda i: DictVector2D(i, 0.0), n), measure(lambda i: Vector2D(i, 0.0), n)))
+
+if __name__ == "__main__":
+    main()
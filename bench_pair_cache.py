@@ -0,0 +1,69 @@
+# 物体对间距缓存对比(仅用于电脑端)
+# 稀疏场景中，统计各broad_phase下开关pair_cache_enabled时每步的窄检测(collision)调用次数与耗时，并检查结果是否完全一致。
+# 用法: python bench_pair_cache.py [球数] [步数]
+
+import random
+import sys
+import time
+
+from physics2d import *
+from physics2d_broadphase import *
+
+def build_scene(n: int, seed: int = 1) -> Physics2D:
+    """边长200的箱子中n个半径1的球，彼此相距较远"""
+    random.seed(seed)
+    phys = Physics2D()
+    size = 200
+    for pos, direction in (((0, 0), (0, 1)), ((size, 0), (0, 1)), ((0, 0), (1, 0)), ((0, size), (1, 0))):
+        phys.append(Line(Pos2D(*pos), Vector2D(*direction), 0, True))
+    for _ in range(n):
+        ball = Circle(Pos2D(random.uniform(2, size - 2), random.uniform(2, size - 2)), 1, 1)
+        ball.velocity = Vector2D(random.uniform(-5, 5), random.uniform(-5, 5))
+        phys.append(ball)
+    return phys
+
+calls = 0
+
+def count_calls(cls):
+    """包装cls.collision，统计调用次数"""
+    collision = cls.collision
+    def counted(self, other, phys):
+        global calls
+        calls += 1
+        return collision(self, other, phys)
+    cls.collision = counted
+
+def run(phys: Physics2D, steps: int, dt: float = 0.01):
+    global calls
+    calls = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        phys.update(dt)
+    elapsed = time.perf_counter() - start
+    state = [(obj.pos.x, obj.pos.y, obj.velocity.x, obj.velocity.y) for obj in phys._active_objects]
+    return calls / steps, elapsed / steps * 1e3, state
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    count_calls(Circle)
+    count_calls(Line)
+    print("{} balls, {} steps".format(n, steps))
+    print("{:<24} {:>14} {:>14} {:>10} {:>10}".format("broad phase", "calls/step off", "on", "ms/step off", "on"))
+    for name, factory in (("brute force", None), ("SpatialHashBroadPhase", SpatialHashBroadPhase),
+                          ("SweepAndPruneBroadPhase", SweepAndPruneBroadPhase), ("AABBTreeBroadPhase", AABBTreeBroadPhase)):
+        results = []
+        for cached in (False, True):
+            phys = build_scene(n)
+            if factory is not None:
+                phys.broad_phase = factory()
+            phys.pair_cache_enabled = cached
+            results.append(run(phys, steps))
+        (calls_off, ms_off, state_off), (calls_on, ms_on, state_on) = results
+        print("{:<24} {:>14.1f} {:>14.1f} {:>10.3f} {:>10.3f}".format(name, calls_off, calls_on, ms_off, ms_on))
+        if state_off != state_on:
+            print("FAIL: results differ with pair_cache_enabled")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# 多进程碰撞求解对比(仅用于电脑端)
+# 箱子中随机分布的大量球，分别用单进程的Physics2D + SpatialHashBroadPhase和ParallelPhysics2D运行，
+# 比较每步update_collision的耗时，并把ParallelPhysics2D的耗时拆成主进程的串行部分(打包、划分接触岛、写回)与等待进程池的时间。
+# 主进程的串行部分决定了进程数再多也达不到的下限，按Amdahl定律输出由此得到的最大加速比。最后检查两者的结果是否完全一致。
+# 用法: python bench_parallel.py [球数] [步数] [进程数]
+
+import math
+import os
+import random
+import sys
+import time
+
+from physics2d import *
+from physics2d_broadphase import *
+from physics2d_parallel import ParallelPhysics2D
+
+def build_scene(phys: Physics2D, n: int, seed: int = 1) -> Physics2D:
+    """n个半径1的球，箱子边长使每个球平均占有32个单位面积"""
+    random.seed(seed)
+    size = math.sqrt(n * 32.0)
+    phys.global_acceleration = Vector2D(0, -9.8)
+    for pos, direction in (((0, 0), (0, 1)), ((size, 0), (0, 1)), ((0, 0), (1, 0)), ((0, size), (1, 0))):
+        phys.append(Line(Pos2D(*pos), Vector2D(*direction), 0, True))
+    for _ in range(n):
+        ball = Circle(Pos2D(random.uniform(2, size - 2), random.uniform(2, size - 2)), 1, 1)
+        ball.velocity = Vector2D(random.uniform(-5, 5), random.uniform(-5, 5))
+        ball.collision_energy_loss = 0.1
+        phys.append(ball)
+    return phys
+
+def timed(obj, name: str, totals: dict):
+    """包装obj的方法name，把耗时累加到totals[name]"""
+    method = getattr(obj, name)
+    totals[name] = 0.0
+    def wrapper(*args):
+        start = time.perf_counter()
+        result = method(*args)
+        totals[name] += time.perf_counter() - start
+        return result
+    setattr(obj, name, wrapper)
+
+def state(phys: Physics2D) -> list:
+    return [(obj.pos.x, obj.pos.y, obj.velocity.x, obj.velocity.y) for obj in phys._active_objects]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else max(2, os.cpu_count() or 1)
+    dt = 0.01
+    print("{} balls, {} steps, {} workers ({} CPUs)".format(n, steps, workers, os.cpu_count()))
+
+    serial = build_scene(Physics2D(), n)
+    serial.broad_phase = SpatialHashBroadPhase()
+    serial_times = {}
+    timed(serial, "update_collision", serial_times)
+    for _ in range(steps):
+        serial.update(dt)
+
+    parallel = build_scene(ParallelPhysics2D(workers), n)
+    parallel_times = {}
+    timed(parallel, "update_collision", parallel_times)
+    timed(parallel, "_run", parallel_times)
+    islands = 0
+    merges = 0
+    with parallel:
+        parallel.update(dt) # 不计入启动进程池的时间
+        for name in parallel_times:
+            parallel_times[name] = 0.0
+        for _ in range(steps - 1):
+            parallel.update(dt)
+            islands += parallel.last_islands
+            merges += parallel.last_island_merges
+    serial_collision = serial_times["update_collision"] / steps * 1e3
+    collision = parallel_times["update_collision"] / (steps - 1) * 1e3
+    waiting = parallel_times["_run"] / (steps - 1) * 1e3
+    main_process = collision - waiting
+    print("{:<40} {:>10.2f} ms/step".format("Physics2D + SpatialHashBroadPhase", serial_collision))
+    print("{:<40} {:>10.2f} ms/step".format("ParallelPhysics2D", collision))
+    print("{:<40} {:>10.2f} ms/step".format("  main process (pack, islands, apply)", main_process))
+    print("{:<40} {:>10.2f} ms/step".format("  waiting for workers", waiting))
+    # 进程池的部分即使无限快，每步也至少要花主进程的时间
+    print("Amdahl bound: main process is {:.0f}% of serial collision time, speedup at most {:.1f}x with any number of workers".format(
+        main_process * 100 / serial_collision, serial_collision / main_process))
+    print("{:.0f} islands/step, {:.2f} merges/step".format(islands / (steps - 1), merges / (steps - 1)))
+    if state(serial) != state(parallel):
+        print("FAIL: ParallelPhysics2D differs from Physics2D")
+        sys.exit(1)
+    print("results identical")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# 快照与恢复(仅用于电脑端)
+# 在迭代求解器下让一堆球堆积，测量snapshot/restore的耗时与快照大小，并检查：
+# 恢复快照后重新运行与原来的结果完全一致；移除一个正在接触的物体后仍能保存和恢复快照。
+# 用法: python bench_snapshot.py [球数]
+
+import sys
+import time
+
+from bench_solver import build_pile
+from physics2d import *
+from physics2d_snapshot import restore, snapshot
+
+def state(phys: Physics2D) -> list:
+    return [(obj.pos.x, obj.pos.y, obj.velocity.x, obj.velocity.y) for obj in phys._active_objects]
+
+def main():
+    columns = int(sys.argv[1]) // 8 if len(sys.argv) > 1 else 10
+    dt = 0.01
+    phys = build_pile(columns, 8, 4)
+    for _ in range(100):
+        phys.update(dt)
+    count = len(phys._active_objects)
+
+    repeat = 200
+    start = time.perf_counter()
+    for _ in range(repeat):
+        blob = snapshot(phys)
+    snapshot_time = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        restore(phys, blob)
+    restore_time = (time.perf_counter() - start) / repeat
+    nbytes = len(blob) * blob.itemsize
+    print("{} balls, {} warm-start impulses".format(count, len(phys.solver._impulses)))
+    print("{:<10} {:>10.3f} ms".format("snapshot", snapshot_time * 1e3))
+    print("{:<10} {:>10.3f} ms".format("restore", restore_time * 1e3))
+    print("{:<10} {:>10} B ({:.1f} B/body)".format("size", nbytes, nbytes / count))
+
+    for _ in range(50):
+        phys.update(dt)
+    expected = state(phys)
+    restore(phys, blob)
+    for _ in range(50):
+        phys.update(dt)
+    if state(phys) != expected:
+        print("FAIL: results differ after restore")
+        sys.exit(1)
+
+    # 移除的物体仍在接触中，热启动冲量里不应再引用它
+    phys.remove(phys._active_objects[0])
+    try:
+        restore(phys, snapshot(phys))
+    except (KeyError, ValueError) as e:
+        print("FAIL: snapshot after remove: {!r}".format(e))
+        sys.exit(1)
+    print("restore and remove checks passed")
+
+if __name__ == "__main__":
+    main()
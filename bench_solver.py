@@ -0,0 +1,66 @@
+# 迭代求解器对比(仅用于电脑端)
+# 在重力下让一堆球落入箱子中堆积，对比逐对闭式解(solver = None)与顺序冲量迭代求解在不同dt下的表现：
+# 静置阶段的最大穿透深度、平均速度(越小越稳定)以及每步耗时。
+# 用法: python bench_solver.py [每行球数] [行数]
+
+import math
+import sys
+import time
+
+from physics2d import *
+from physics2d_solver import SequentialImpulseSolver
+
+def build_pile(columns: int, rows: int, iterations: int) -> Physics2D:
+    """宽为columns个球的箱子中按六角密排堆rows层球，层间留有微小空隙"""
+    phys = Physics2D()
+    phys.global_acceleration = Vector2D(0, -10)
+    if iterations > 0:
+        phys.solver = SequentialImpulseSolver(iterations)
+    width = columns * 2.0
+    for pos, direction in (((0, 0), (1, 0)), ((0, 0), (0, 1)), ((width, 0), (0, 1))):
+        phys.append(Line(Pos2D(*pos), Vector2D(*direction), 0, True))
+    for j in range(rows):
+        # 六角密排：奇数行少一个球并错开半格，落在下一行两球之间
+        offset = j % 2
+        for i in range(columns - offset):
+            ball = Circle(Pos2D(1.0 + i * 2.0 + offset, 1.0 + j * 1.74), 1, 1)
+            ball.collision_energy_loss = 0.5
+            phys.append(ball)
+    return phys
+
+def max_penetration(phys: Physics2D) -> float:
+    result = 0.0
+    objects = phys._fixed_objects + phys._active_objects
+    for i in range(len(objects)):
+        for j in range(i + 1, len(objects)):
+            depth = Physics2D._penetration(objects[i], objects[j])
+            if depth > result:
+                result = depth
+    return result
+
+def mean_speed(phys: Physics2D) -> float:
+    balls = phys._active_objects
+    return sum(math.sqrt(b.velocity.x ** 2 + b.velocity.y ** 2) for b in balls) / len(balls)
+
+def run(columns: int, rows: int, iterations: int, dt: float, duration: float = 4.0):
+    phys = build_pile(columns, rows, iterations)
+    steps = int(duration / dt)
+    start = time.perf_counter()
+    for _ in range(steps):
+        phys.update(dt)
+    elapsed = time.perf_counter() - start
+    return max_penetration(phys), mean_speed(phys), elapsed / steps * 1e3
+
+def main():
+    columns = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print("{} x {} balls, state after 4 s".format(columns, rows))
+    print("{:<10} {:>6} {:>12} {:>12} {:>10}".format("mode", "dt", "penetration", "mean speed", "ms/step"))
+    for dt in (0.002, 0.01, 0.02):
+        for iterations in (0, 10):
+            penetration, speed, ms = run(columns, rows, iterations, dt)
+            mode = "pairwise" if iterations == 0 else "solver {}".format(iterations)
+            print("{:<10} {:>6} {:>12.4f} {:>12.4f} {:>10.3f}".format(mode, dt, penetration, speed, ms))
+
+if __name__ == "__main__":
+    main()
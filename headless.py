@@ -0,0 +1,106 @@
+# 无界面运行测试项目(仅用于电脑端)
+# 导入测试项目模块，按固定dt推进其中的phys，输出步数/秒、碰撞次数/秒以及最终状态，用于在没有图形界面的机器上长时间测试和分析性能。
+# 用法: python -m headless 平面反弹 [--steps N | --time T] [--dt DT] [--quiet] [--profile] [--record 轨迹文件]
+# 记录的轨迹可用 python window.py --replay 轨迹文件 回放
+
+import argparse
+import contextlib
+import importlib
+import io
+import time
+
+from physics2d import *
+from physics2d_stats import PhysicsStats
+
+def load_scenario(name: str) -> Physics2D:
+    """导入测试项目模块，返回其中的phys"""
+    if name.endswith(".py"):
+        name = name[:-3]
+    module = importlib.import_module(name)
+    phys = getattr(module, "phys", None)
+    if not isinstance(phys, Physics2D):
+        raise SystemExit("{}: module has no Physics2D named phys".format(name))
+    return phys
+
+def count_collisions(phys: Physics2D) -> list[int]:
+    """在phys.collision_handler之后追加计数，返回只有一个元素的计数列表"""
+    counter = [0]
+    base_callback = phys.collision_handler
+    def counting_callback(event: CollisionEvent):
+        if base_callback is not None:
+            base_callback(event)
+        counter[0] += 1
+    phys.collision_handler = counting_callback # type: ignore
+    return counter
+
+def run(phys: Physics2D, steps: int, dt: float, quiet: bool = False) -> float:
+    """推进steps步，返回耗时(秒)。quiet为True时丢弃测试项目自己的输出"""
+    output = io.StringIO() if quiet else None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        for _ in range(steps):
+            phys.update(dt)
+            if output is not None:
+                # 不让丢弃的输出一直占用内存
+                output.seek(0)
+                output.truncate()
+    return time.perf_counter() - start
+
+def print_state(phys: Physics2D):
+    """逐个输出物体的名字、位置与速度"""
+    for index, obj in enumerate(phys._fixed_objects + phys._active_objects):
+        name = str(obj.name)
+        if name.startswith("<"):
+            # 默认名字是repr，含内存地址，换成类型名与序号
+            name = "{} #{}".format(type(obj).__name__, index)
+        flags = "fixed" if obj.fixed else ("sleeping" if obj.sleeping else "")
+        print("{:<24} pos ({:>12.6f}, {:>12.6f})  velocity ({:>12.6f}, {:>12.6f})  {}".format(
+            name[:24], obj.pos.x, obj.pos.y, obj.velocity.x, obj.velocity.y, flags))
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m headless", description="Run a scenario module without GUI")
+    parser.add_argument("scenario", help="scenario module name, e.g. 平面反弹")
+    length = parser.add_mutually_exclusive_group()
+    length.add_argument("--steps", type=int, help="number of steps (default 10000)")
+    length.add_argument("--time", type=float, help="simulated seconds, converted to steps")
+    parser.add_argument("--dt", type=float, default=0.002, help="time step in seconds (default 0.002)")
+    parser.add_argument("--quiet", action="store_true", help="discard output printed by the scenario")
+    parser.add_argument("--profile", action="store_true", help="print time spent in each phase of update")
+    parser.add_argument("--record", metavar="FILE", help="record the trajectory to FILE for window.py --replay")
+    args = parser.parse_args(argv)
+    if args.dt <= 0:
+        parser.error("--dt must be positive")
+    if args.time is not None:
+        steps = int(round(args.time / args.dt))
+    else:
+        steps = args.steps if args.steps is not None else 10000
+
+    phys = load_scenario(args.scenario)
+    collisions = count_collisions(phys)
+    if args.profile:
+        phys.stats = PhysicsStats()
+    recorder = None
+    if args.record is not None:
+        from physics2d_record import TrajectoryRecorder
+        recorder = TrajectoryRecorder(args.record, phys)
+    try:
+        elapsed = run(phys, steps, args.dt, args.quiet)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+    print("scenario    {}".format(args.scenario))
+    print("bodies      {} active, {} fixed".format(len(phys._active_objects), len(phys._fixed_objects)))
+    print("steps       {} x dt {} = {:.6g} s simulated".format(steps, args.dt, steps * args.dt))
+    print("wall time   {:.3f} s".format(elapsed))
+    if elapsed > 0:
+        print("steps/s     {:.1f}".format(steps / elapsed))
+        print("collisions  {} ({:.1f}/s)".format(collisions[0], collisions[0] / elapsed))
+    else:
+        print("collisions  {}".format(collisions[0]))
+    if phys.stats is not None:
+        print(phys.stats.report())
+    print_state(phys)
+
+if __name__ == "__main__":
+    main()
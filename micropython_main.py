@@ -7,6 +7,9 @@ SCR_WIDTH = 128
 SCR_HEIGHT = 64
 
 phys = Physics2D()
+# 单片机算力有限，用较大的固定步长
+phys.fixed_dt = 0.01
+phys.max_substeps = 4
 # 左侧墙壁
 wall_left = Line(
     Pos2D(1, 0),
@@ -43,8 +46,8 @@ ball = Circle(
 )
 # 有右上的初速度
 ball.velocity = Vector2D(3, 3)
-# 自定义属性：颜色
-ball.color = (255, 0, 0) # type: ignore
+# 自定义数据：颜色
+ball.user_data = {"color": (255, 0, 0)}
 
 phys.extend([
     wall_left,
@@ -76,10 +79,11 @@ for i in range(2):
 
 
 @micropython.native
-def drawAnObject(obj):
+def drawAnObject(obj, alpha):
     scale = 3
     if isinstance(obj, Circle):
-        oled.circle(round(obj.pos.x*scale), SCR_HEIGHT-round(obj.pos.y*scale), round(obj.radius*scale), 1)
+        x, y = obj.interpolate_pos(alpha)
+        oled.circle(round(x*scale), SCR_HEIGHT-round(y*scale), round(obj.radius*scale), 1)
     elif isinstance(obj, Line):
         start, end = obj.intpos_in_rect(SCR_WIDTH/scale, SCR_HEIGHT/scale)
         if start is None or end is None:
@@ -88,12 +92,12 @@ def drawAnObject(obj):
                   round(end[0]*scale), SCR_HEIGHT-round(end[1]*scale), 1) # type: ignore
 
 @micropython.native
-def drawPhysics():
+def drawPhysics(alpha):
     oled.fill(0)
     for obj in phys._fixed_objects:
-        drawAnObject(obj)
+        drawAnObject(obj, alpha)
     for obj in phys._active_objects:
-        drawAnObject(obj)
+        drawAnObject(obj, alpha)
     oled.show()
 
 @micropython.native
@@ -109,8 +113,9 @@ def run():
             while button_a.is_pressed():
                 pass # 等待松开
         if pause: continue
-        phys.update(td / 1000000)
-        drawPhysics()
+        # 固定步长推进，帧率波动时不会出现一步过大而穿墙
+        alpha = phys.advance(td / 1000000)
+        drawPhysics(alpha)
         td = utime.ticks_diff(utime.ticks_us(), ts)
 
 run()
\ No newline at end of file
@@ -5,6 +5,7 @@ import micropython
 DIV_EPLISON = 1e-10
 
 class Vector2D:
+    __slots__ = ("x", "y")
     def __init__(self, x: float, y: float):
         self.x = x
         self.y = y
@@ -65,11 +66,11 @@ class Vector2D:
 
     @micropython.native
     def abs_square(self):
-        return self.x ** 2 + self.y ** 2
+        return self.x * self.x + self.y * self.y
     
     @micropython.native
     def __abs__(self):
-        return math.sqrt(self.x ** 2 + self.y ** 2)
+        return math.sqrt(self.x * self.x + self.y * self.y)
     
     @micropython.native
     def __repr__(self):
@@ -79,8 +80,40 @@ class Vector2D:
     def rotate90(self):
         return type(self)(-self.y, self.x)
 
+    # 原地运算：修改并返回自身，不创建新对象。注意所有引用该向量的地方都会看到修改
+    @micropython.native
+    def set(self, x: float, y: float):
+        self.x = x
+        self.y = y
+        return self
+
+    @micropython.native
+    def iadd(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    @micropython.native
+    def isub(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    @micropython.native
+    def iscale(self, k: float):
+        self.x *= k
+        self.y *= k
+        return self
+
+    @micropython.native
+    def iadd_scaled(self, other, k: float):
+        """self += other * k"""
+        self.x += other.x * k
+        self.y += other.y * k
+        return self
+
 class Pos2D(Vector2D):
-    pass
+    __slots__ = ()
 
 @micropython.native
 def inter_line_and_linesegment(line_pos: Pos2D, line_dir: Vector2D, seg_start: Pos2D, seg_end: Pos2D):
@@ -109,7 +142,8 @@ def inter_line_and_linesegment(line_pos: Pos2D, line_dir: Vector2D, seg_start: P
     return intersection
 
 class CollisionEvent:
-    """碰撞点。仅内部使用"""
+    """碰撞点。在handler中使用；Physics2D.batch_events_enabled打开时对象会被复用，需要保留时用copy()"""
+    __slots__ = ("obj1", "obj2", "pos", "normal", "obj1_last_velocity", "obj2_last_velocity")
     def __init__(self, 
                  obj1: 'PhysicalObject',
                 obj2: 'PhysicalObject',
@@ -126,10 +160,20 @@ class CollisionEvent:
         self.normal = normal
         self.obj1_last_velocity = obj1.velocity # 碰撞前速度
         self.obj2_last_velocity = obj2.velocity # 碰撞前速度
+    def copy(self) -> 'CollisionEvent':
+        """复制碰撞点，其中的向量也一并复制"""
+        event = CollisionEvent(self.obj1, self.obj2, Pos2D(self.pos.x, self.pos.y), Vector2D(self.normal.x, self.normal.y))
+        event.obj1_last_velocity = Vector2D(self.obj1_last_velocity.x, self.obj1_last_velocity.y)
+        event.obj2_last_velocity = Vector2D(self.obj2_last_velocity.x, self.obj2_last_velocity.y)
+        return event
 
 
 class PhysicalObject:
-    """通用物理对象"""
+    """通用物理对象  
+    使用__slots__存放状态，不能随意添加属性。脚本自己的数据请放在user_data中，
+    或者继承后再添加属性(子类不声明__slots__时会自动带上__dict__)"""
+    __slots__ = ("name", "pos", "last_pos", "mass", "fixed", "extra_force", "extra_acceleration", "velocity",
+                 "collision_handler", "collision_energy_loss", "user_data", "prev_pos", "sleeping")
     def __init__(self, 
                  pos: Pos2D | tuple[float, float],
                  mass: float,
@@ -144,6 +188,8 @@ class PhysicalObject:
         elif isinstance(pos, Vector2D):
             self.pos = pos
         self.last_pos: Pos2D | None = None # 上一帧位置，供连续碰撞采样使用。仅在打开了该功能时使用
+        self.prev_pos: Pos2D | None = None
+        """Physics2D.advance最后一个子步之前的位置，用于绘制时插值"""
         self.mass = mass
         self.fixed = fixed
         self.extra_force = Vector2D(0, 0)
@@ -153,10 +199,26 @@ class PhysicalObject:
         """碰撞处理函数，参数: 碰撞点。动量重分配之后调用。phys的collision_handler更优先"""
         self.collision_energy_loss = 0.0
         """碰撞能量损失，0-1之间，0表示无能量损失，1表示完全能量损失"""
+        self.user_data = None
+        """脚本自定义数据，引擎不会读写"""
+        self.sleeping = False
+        """是否处于休眠状态。仅在Physics2D.sleep_enabled打开时使用，休眠的物体不参与积分，速度为0"""
     def collision(self, other, phys: 'Physics2D') -> CollisionEvent | None:
         raise NotImplementedError
+    @micropython.native
+    def interpolate_pos(self, alpha: float) -> tuple[float, float]:
+        """按Physics2D.advance返回的alpha在prev_pos与pos之间插值，返回绘制用的(x, y)"""
+        pos = self.pos
+        prev_pos = self.prev_pos
+        if prev_pos is None:
+            return (pos.x, pos.y)
+        return (prev_pos.x + (pos.x - prev_pos.x) * alpha, prev_pos.y + (pos.y - prev_pos.y) * alpha)
+    def wake(self):
+        """唤醒休眠的物体。低速步数在进入休眠时已清零，唤醒后重新计算"""
+        self.sleeping = False
 
 class Circle(PhysicalObject):
+    __slots__ = ("radius",)
     def __init__(self, 
                  pos: Pos2D | tuple[float, float],
                  radius: float,
@@ -171,9 +233,16 @@ class Circle(PhysicalObject):
     @micropython.native
     def collision(self, other: PhysicalObject, phys: 'Physics2D'):
         if isinstance(other, Circle):
+            # 快速排除：用标量判断，未碰撞时不创建任何临时向量
+            dx = other.pos.x - self.pos.x
+            dy = other.pos.y - self.pos.y
+            radius_sum = self.radius + other.radius
+            if dx * dx + dy * dy >= radius_sum * radius_sum:
+                if phys.swept_collision_enabled:
+                    return self._swept_collision(other, phys, radius_sum)
+                return None
             # 提前计算一些数值
             pos_d = other.pos - self.pos # 指向other.pos
-            radius_sum = self.radius + other.radius
             # 对于一方fixed,碰撞位置：固定圆的圆周上与另一圆心连线的交点
             if self.fixed:
                 pos = self.pos + pos_d.normalize() * self.radius
@@ -184,7 +253,7 @@ class Circle(PhysicalObject):
                 pos = self.pos + (pos_d) * (self.radius / radius_sum)
             dis_square = pos_d.abs_square()
             # 若两圆心距离小于两圆半径之和，则碰撞。为优化逻辑，这里检查是否不碰撞
-            if dis_square >= radius_sum ** 2:
+            if dis_square >= radius_sum * radius_sum:
                 return None
             dis = math.sqrt(dis_square)
             # 两圆心单位法向量，任意方向
@@ -212,11 +281,58 @@ class Circle(PhysicalObject):
                     # 方案2: 按半径平均分配移动量
                     self.pos -= normal * (penetration * (other.radius / radius_sum))
                     other.pos += normal * (penetration * (self.radius / radius_sum))
-            return CollisionEvent(self, other, pos, normal)
+            return phys._new_event(self, other, pos, normal)
         else:
             return other.collision(self, phys)
 
+    @micropython.native
+    def _swept_collision(self, other: 'Circle', phys: 'Physics2D', radius_sum: float):
+        """扫掠检测：两圆心在本步内都沿直线从last_pos运动到pos，求最早的接触时刻。  
+        本步结束时未接触才会调用。接触时把两圆放回接触时刻的位置，未接触返回None"""
+        start1 = self.pos if self.fixed or self.last_pos is None else self.last_pos
+        start2 = other.pos if other.fixed or other.last_pos is None else other.last_pos
+        move1x = self.pos.x - start1.x
+        move1y = self.pos.y - start1.y
+        move2x = other.pos.x - start2.x
+        move2y = other.pos.y - start2.y
+        # 相对位置 c + e * s，s为本步内的时间比例(0-1)
+        cx = start2.x - start1.x
+        cy = start2.y - start1.y
+        ex = move2x - move1x
+        ey = move2y - move1y
+        a = ex * ex + ey * ey
+        b = cx * ex + cy * ey
+        c = cx * cx + cy * cy - radius_sum * radius_sum
+        if c <= 0 or b >= 0 or a < DIV_EPLISON:
+            # 起点已接触、相互远离或几乎没有相对运动
+            return None
+        discriminant = b * b - a * c
+        if discriminant < 0:
+            return None
+        s = (-b - math.sqrt(discriminant)) / a
+        if s > 1:
+            return None
+        pos1 = Pos2D(start1.x + move1x * s, start1.y + move1y * s)
+        pos2 = Pos2D(start2.x + move2x * s, start2.y + move2y * s)
+        pos_d = pos2 - pos1
+        normal = pos_d.normalize() # 指向other
+        # 碰撞位置与离散检测相同
+        if self.fixed:
+            pos = pos1 + normal * self.radius
+        elif other.fixed:
+            pos = pos2 - normal * other.radius
+        else:
+            pos = pos1 + pos_d * (self.radius / radius_sum)
+        # 运动校正：退回到接触时刻的位置
+        if phys.basic_correction_enabled:
+            if not self.fixed:
+                self.pos = pos1
+            if not other.fixed:
+                other.pos = pos2
+        return phys._new_event(self, other, pos, normal)
+
 class Line(PhysicalObject):
+    __slots__ = ("direction",)
     def __init__(self, 
                  pos: Pos2D | tuple[float, float],
                  direction: Vector2D | tuple[float, float],
@@ -240,6 +356,23 @@ class Line(PhysicalObject):
             p = self.pos
             d = self.direction
 
+            # 快速排除：用标量重复下面的计算，既不穿过直线也未接触时不创建任何临时向量
+            crossed = False
+            last_pos = other.last_pos
+            if phys.continuous_collision_sampling_enabled and last_pos is not None:
+                sx = c.x - last_pos.x
+                sy = c.y - last_pos.y
+                det = d.x * sy - d.y * sx
+                if abs(det) >= DIV_EPLISON:
+                    u = ((last_pos.x - p.x) * d.y - (last_pos.y - p.y) * d.x) / det
+                    crossed = not (u < 0 or u > 1)
+            if not crossed:
+                t = d.x * (c.x - p.x) + d.y * (c.y - p.y)
+                vx = c.x - (p.x + d.x * t)
+                vy = c.y - (p.y + d.y * t)
+                if vx * vx + vy * vy >= other.radius * other.radius:
+                    return None
+
             # 连续采样：检测两帧之间的圆心运动轨迹是否与直线相交
             if phys.continuous_collision_sampling_enabled and other.last_pos is not None:
                 intersection = inter_line_and_linesegment(p, d, other.last_pos, other.pos)
@@ -251,7 +384,7 @@ class Line(PhysicalObject):
                     # 运动校正:如果线是固定的，将圆的坐标设置为恰好让线接触圆的边界而不进入圆内
                     if phys.basic_correction_enabled and self.fixed:
                         other.pos = intersection + normal * other.radius
-                    return CollisionEvent(self, other, intersection, normal)
+                    return phys._new_event(self, other, intersection, normal)
 
             # 投影参数t
             t = d * (c - p)
@@ -263,7 +396,7 @@ class Line(PhysicalObject):
 
             dist_square = vec.abs_square()
 
-            if dist_square >= other.radius ** 2:
+            if dist_square >= other.radius * other.radius:
                 return None
             
             dist = math.sqrt(dist_square)
@@ -280,7 +413,7 @@ class Line(PhysicalObject):
             if phys.basic_correction_enabled and self.fixed:
                 other.pos = foot + normal * other.radius
 
-            return CollisionEvent(self, other, foot, normal)
+            return phys._new_event(self, other, foot, normal)
         else:
             return other.collision(self, phys)
     
@@ -330,9 +463,6 @@ class Line(PhysicalObject):
             return points[0], points[1]
 
 
-        
-
-
 class Physics2D:
     def __init__(self):
         self._active_objects: list[PhysicalObject] = []
@@ -343,18 +473,108 @@ class Physics2D:
         """collision_handler参数列表：collision_point。优先于各物体的collision_handler调用"""
         self.update_callback = None
         """update_callback参数列表：dt"""
+        self.post_update_callback = None
+        """每步结束后调用，参数列表：dt。用于记录每步的结果"""
         self.basic_correction_enabled = True
         """基本穿透校正。能确保在大多数场景中不会出现异常"""
         self.extend_correction_enabled = False
         """更激进的穿透校正。在极端场景下可能会出现异常"""
         self.continuous_collision_sampling_enabled = True
         """基于数学的连续碰撞采样。在高速运动时能有效减少穿透现象，略微增加计算量"""
+        self.swept_collision_enabled = False
+        """圆-圆扫掠检测：两圆在本步结束时未接触，但从last_pos到pos的运动途中接触过时，也视为碰撞并退回到接触时刻的位置。
+        可防止高速的球互相穿过，从而使用更大的dt"""
+        self.inplace_update_enabled = False
+        """原地更新：积分与碰撞后的速度直接写入已有的向量，不再每步创建临时对象，可避免MicroPython频繁GC。
+        结果与默认模式完全相同，但物体的pos、velocity、last_pos会被原地修改，不应与其他对象共用同一个向量。  
+        只有没有碰撞的步骤完全不分配：碰撞检测(各物体的collision)仍为每个接触创建碰撞点和若干临时向量(两圆接触约5个)，
+        碰撞点只在batch_events_enabled时复用；有handler时还会复制碰撞前的速度。见bench_alloc.py"""
+        self._integrator = None # 见integrator
+        self.broad_phase = None
+        """粗检测(broad phase)。None表示两两检查所有物体；可设为physics2d_broadphase中的SpatialHashBroadPhase等，大量物体时能显著减少碰撞检查次数。
+        任何有update_collision(phys)方法、按两两检查的顺序对候选对调用phys.handle_collision的对象都可以"""
+        self.sleep_enabled = False
+        """休眠：速度连续sleep_steps步低于sleep_velocity_threshold的物体进入休眠，不再积分，也不再与fixed物体或其他休眠物体检查碰撞。
+        被碰撞且获得的速度超过阈值、extra_force/extra_acceleration或全局力改变、速度被修改、调用setFixed时唤醒"""
+        self.sleep_velocity_threshold = 0.1
+        """休眠速度阈值"""
+        self.sleep_steps = 60
+        """速度连续低于阈值多少步后进入休眠"""
+        self._sleep_global = (0.0, 0.0, 0.0, 0.0) # 上一步的global_force和global_acceleration
+        self._sleep_counts = {} # 未休眠的物体 -> 连续低速的步数，没有记录即为0
+        self._sleep_forces = {} # 休眠的物体 -> 进入休眠时的extra_force和extra_acceleration
+        self.fixed_dt = 0.005
+        """advance使用的固定步长"""
+        self.max_substeps = 8
+        """advance每次调用最多模拟的步数。超出的时间会被丢弃，画面变慢而不会越积越多"""
+        self.last_substeps = 0
+        """上一次advance实际模拟的步数"""
+        self._accumulator = 0.0 # 尚未模拟的时间
+        self.solver = None
+        """速度求解器。None表示按原来的方式逐对以闭式解处理碰撞；可设为physics2d_solver中的SequentialImpulseSolver，
+        先收集本步所有接触再统一迭代求解，堆叠、成堆的物体更稳定。任何有add_contact(collision_point)、solve(phys)和remove(obj)方法的对象都可以"""
+        self._step_dt = 0.0 # 本步的dt，供solver使用
+        self.pair_cache_enabled = False
+        """缓存物体对的间距，利用帧间连贯性跳过远离的物体对。
+        每个物体记录累计移动距离，检查过且未碰撞的一对记下当时的间距，此后两物体累计移动的距离之和达到该间距前不会相碰，直接跳过，结果不变。
+        对任何broad_phase都有效，适合稀疏的场景。修改物体的形状(radius、direction)后需调用reset_pair_cache()；
+        碰撞handler若移动了这对物体之外的物体，该物体的移动要到下一步才计入"""
+        self._pair_cache = {} # (obj1, obj2) -> 两物体累计移动距离之和达到该值前不会相碰
+        self._odometers = {} # 物体 -> [累计移动距离, 上次累计时的x, y]
+        self.pair_cache_limit = 65536
+        """间距缓存的条目数上限。达到上限后不再添加，并在本步结束时删除已失效(间距已被累计移动距离用完)的条目，剩下的仍多于一半则全部清空。
+        只影响跳过的物体对的多少，不影响结果"""
+        self.stats = None
+        """设为physics2d_stats中的PhysicsStats()后统计每步各阶段的耗时与计数。为None时update只多一次判断"""
+        self.batch_events_enabled = False
+        """碰撞事件按步批量投递：碰撞点写入复用的事件对象，每步结束后先以本步全部事件的列表调用一次collision_batch_handler，
+        再逐个调用phys和物体的collision_handler。没有任何handler时不保留事件。
+        事件对象和列表在下一步被复用，需要保留时用CollisionEvent.copy()"""
+        self.collision_batch_handler = None
+        """批量碰撞处理函数，参数: 本步的碰撞点列表。仅在batch_events_enabled打开时调用"""
+        self._batch: list[CollisionEvent] = [] # 本步待投递的事件
+        self._event_pool: list[CollisionEvent] = [] # 复用的事件对象
+        self._event_count = 0 # 本步已占用的事件对象数
+        self.history = None
+        """设为physics2d_snapshot中的SnapshotHistory后每步自动记录快照，用于回退"""
+
+    @property
+    def integrator(self):
+        """积分方法。None为半隐式欧拉法，即类中的update_obj_move；可设为physics2d_integrators中的Integrator，
+        如Integrator("rk4", force_callback)。设置时选择update_obj_move的实现，每步不必再逐个物体判断"""
+        return self._integrator
+
+    @integrator.setter
+    def integrator(self, integrator):
+        self._integrator = integrator
+        if integrator is None:
+            try:
+                del self.update_obj_move
+            except AttributeError:
+                pass
+        else:
+            # 用实例属性覆盖类中的update_obj_move
+            integrate = integrator.update_obj_move
+            self.update_obj_move = lambda obj, dt: integrate(self, obj, dt)
 
     @micropython.native
     def update_obj_move(self, obj: PhysicalObject, dt: float):
         """仅更新单个物体的移动，不考虑碰撞"""
         if obj.fixed:
             return
+        if self.inplace_update_enabled:
+            # 与下面的向量运算逐项相同，只是不创建临时向量
+            global_force = self.global_force
+            global_acceleration = self.global_acceleration
+            extra_force = obj.extra_force
+            extra_acceleration = obj.extra_acceleration
+            mass = obj.mass
+            velocity = obj.velocity
+            velocity.x += ((global_force.x + extra_force.x) / mass + (extra_acceleration.x + global_acceleration.x)) * dt
+            velocity.y += ((global_force.y + extra_force.y) / mass + (extra_acceleration.y + global_acceleration.y)) * dt
+            obj.velocity = velocity
+            obj.pos = obj.pos.iadd_scaled(velocity, dt)
+            return
         obj_acceleration = (self.global_force + obj.extra_force) / obj.mass + (obj.extra_acceleration + self.global_acceleration)
         obj.velocity += obj_acceleration * dt
         obj.pos += obj.velocity * dt
@@ -362,81 +582,347 @@ class Physics2D:
     @micropython.native
     def update_move(self, dt: float):
         """仅更新移动，不考虑碰撞"""
+        if self.sleep_enabled:
+            self._check_wake()
         for obj in self._active_objects:
-            if self.continuous_collision_sampling_enabled:
+            if obj.sleeping:
+                if self.sleep_enabled:
+                    continue
+                obj.wake() # 休眠功能已关闭
+            if self.continuous_collision_sampling_enabled or self.swept_collision_enabled:
                 # 记录上一帧位置
-                obj.last_pos = Pos2D(obj.pos.x, obj.pos.y)
+                if self.inplace_update_enabled and obj.last_pos is not None:
+                    obj.last_pos = obj.last_pos.set(obj.pos.x, obj.pos.y)
+                else:
+                    obj.last_pos = Pos2D(obj.pos.x, obj.pos.y)
             self.update_obj_move(obj, dt)
     
     @micropython.native
-    def update_collision(self):
-        """更新碰撞"""
-        # 碰撞检查与处理函数
-        @micropython.native
-        def handle_collision(obj1: PhysicalObject, obj2: PhysicalObject):
-            # 检查碰撞
-            collision_point: CollisionEvent | None = obj1.collision(obj2, self)
-            if collision_point is None:
+    def handle_collision(self, obj1: PhysicalObject, obj2: PhysicalObject):
+        """检查并处理一对物体的碰撞"""
+        if self.sleep_enabled and (obj1.fixed or obj1.sleeping) and (obj2.fixed or obj2.sleeping):
+            # 双方都不会移动
+            return
+        pair_cache_enabled = self.pair_cache_enabled
+        if pair_cache_enabled:
+            odometers = self._odometers
+            bound = self._pair_cache.get((obj1, obj2))
+            if bound is not None and odometers[obj1][0] + odometers[obj2][0] < bound:
+                # 自上次检查以来移动的距离不足以消除间距
                 return
-            
-            # 计算各自的动能保留率
-            obj1_p = 1.0 - obj1.collision_energy_loss
-            obj2_p = 1.0 - obj2.collision_energy_loss
-            # print(f"{obj1.name}与{obj2.name}碰撞")
-            # 处理碰撞
-            # 根据动量守恒和动能守恒计算碰撞后的速度
-
-            # 根据法向向量计算切向向量
-            tangent = collision_point.normal.rotate90()
-            
-            # 两物体的速度分解到法向和切向
-            v1n = obj1.velocity * collision_point.normal 
-            v1t = obj1.velocity * tangent
-            v2n = obj2.velocity * collision_point.normal
-            v2t = obj2.velocity * tangent
-
-            # 损失动能
-            v1n *= obj1_p
-            v2n *= obj2_p
-
-            # 根据fixed属性判断是否需要更新速度
-            if obj1.fixed:
-                # obj2的法向反弹
-                v2n = -v2n
-                # 损失对面的动能
-                v1n *= obj2_p
-            elif obj2.fixed:
-                # obj1的法向反弹
-                v1n = -v1n
-                # 损失对面的动能
-                v2n *= obj1_p
-            else: # 计算
-                # 法向上两物体碰撞后的速度。为了加速计算，这里缓存部分变量。
-                m1_p_m2 = obj1.mass + obj2.mass
-                v1n, v2n = (
-                    (v1n * (obj1.mass - obj2.mass) + 2 * obj2.mass * v2n) / m1_p_m2, 
-                    (v2n * (obj2.mass - obj1.mass) + 2 * obj1.mass * v1n) / m1_p_m2
-                )
-            
+        # 检查碰撞
+        collision_point: CollisionEvent | None = obj1.collision(obj2, self)
+        if collision_point is None:
+            if pair_cache_enabled:
+                gap = -self._penetration(obj1, obj2)
+                # 本步中途加入的物体要到下一步才有累计移动距离
+                if (gap > 0 and len(self._pair_cache) < self.pair_cache_limit
+                        and obj1 in odometers and obj2 in odometers):
+                    odometer = odometers[obj1][0] + odometers[obj2][0]
+                    # 留出余量，抵消间距与累计距离的舍入误差
+                    self._pair_cache[(obj1, obj2)] = odometer + gap - DIV_EPLISON - odometer * 1e-12
+            return
+        if self.solver is not None:
+            # 留到solver统一求解
+            self.solver.add_contact(collision_point)
+        else:
+            self.resolve_collision(collision_point)
+        if pair_cache_enabled:
+            # 运动校正和handler可能移动了两物体
+            self._advance_odometer(obj1)
+            self._advance_odometer(obj2)
+
+    @micropython.native
+    def _advance_odometer(self, obj: PhysicalObject):
+        """把物体自上次累计以来的位移计入累计移动距离。第一次累计时从当前位置开始"""
+        pos = obj.pos
+        odometer = self._odometers.get(obj)
+        if odometer is None:
+            self._odometers[obj] = [0.0, pos.x, pos.y]
+            return
+        dx = pos.x - odometer[1]
+        dy = pos.y - odometer[2]
+        if dx != 0 or dy != 0:
+            odometer[0] += math.sqrt(dx * dx + dy * dy)
+            odometer[1] = pos.x
+            odometer[2] = pos.y
+
+    @micropython.native
+    def _advance_odometers(self):
+        """每步碰撞检测前，把所有物体的位移(积分以及步与步之间脚本的修改)计入累计移动距离"""
+        advance_odometer = self._advance_odometer
+        for obj in self._fixed_objects:
+            advance_odometer(obj)
+        for obj in self._active_objects:
+            advance_odometer(obj)
+
+    def _prune_pair_cache(self):
+        """删除已失效的间距缓存。剩下的仍多于上限的一半时全部清空，保证每次清理至少删掉一半"""
+        pair_cache = {}
+        odometers = self._odometers
+        for pair, bound in self._pair_cache.items():
+            if odometers[pair[0]][0] + odometers[pair[1]][0] < bound:
+                pair_cache[pair] = bound
+        if len(pair_cache) > self.pair_cache_limit // 2:
+            pair_cache = {}
+        self._pair_cache = pair_cache
+
+    def reset_pair_cache(self):
+        """清空物体对的间距缓存。修改物体形状后调用"""
+        self._pair_cache = {}
 
-            # 合并切向和法向速度
-            obj1.velocity = collision_point.normal * v1n + tangent * v1t # type: ignore
-            obj2.velocity = collision_point.normal * v2n + tangent * v2t # type: ignore
+    @micropython.native
+    def resolve_collision(self, collision_point: CollisionEvent):
+        """按碰撞点重新分配两物体的速度，并调用handler"""
+        obj1 = collision_point.obj1
+        obj2 = collision_point.obj2
+        # 计算各自的动能保留率
+        obj1_p = 1.0 - obj1.collision_energy_loss
+        obj2_p = 1.0 - obj2.collision_energy_loss
+        # print(f"{obj1.name}与{obj2.name}碰撞")
+        # 处理碰撞
+        # 根据动量守恒和动能守恒计算碰撞后的速度
+
+        # 根据法向向量计算切向向量(normal.rotate90())
+        normal = collision_point.normal
+        nx = normal.x
+        ny = normal.y
+        tx = -ny
+        ty = nx
+        
+        # 两物体的速度分解到法向和切向
+        velocity1 = obj1.velocity
+        velocity2 = obj2.velocity
+        v1n = velocity1.x * nx + velocity1.y * ny
+        v1t = velocity1.x * tx + velocity1.y * ty
+        v2n = velocity2.x * nx + velocity2.y * ny
+        v2t = velocity2.x * tx + velocity2.y * ty
+
+        # 损失动能
+        v1n *= obj1_p
+        v2n *= obj2_p
+
+        # 根据fixed属性判断是否需要更新速度
+        if obj1.fixed:
+            # obj2的法向反弹
+            v2n = -v2n
+            # 损失对面的动能
+            v1n *= obj2_p
+        elif obj2.fixed:
+            # obj1的法向反弹
+            v1n = -v1n
+            # 损失对面的动能
+            v2n *= obj1_p
+        else: # 计算
+            # 法向上两物体碰撞后的速度。为了加速计算，这里缓存部分变量。
+            m1_p_m2 = obj1.mass + obj2.mass
+            v1n, v2n = (
+                (v1n * (obj1.mass - obj2.mass) + 2 * obj2.mass * v2n) / m1_p_m2, 
+                (v2n * (obj2.mass - obj1.mass) + 2 * obj1.mass * v1n) / m1_p_m2
+            )
+        
+
+        # 合并切向和法向速度
+        if self.inplace_update_enabled:
+            # 碰撞点记录的碰撞前速度与物体共用同一个向量，原地修改前先复制。没有handler时不会有人读取，不必复制
+            if (self.collision_batch_handler is not None or self.collision_handler is not None
+                    or obj1.collision_handler is not None or obj2.collision_handler is not None):
+                if collision_point.obj1_last_velocity is velocity1:
+                    collision_point.obj1_last_velocity = Vector2D(velocity1.x, velocity1.y)
+                if collision_point.obj2_last_velocity is velocity2:
+                    collision_point.obj2_last_velocity = Vector2D(velocity2.x, velocity2.y)
+            obj1.velocity = velocity1.set(nx * v1n + tx * v1t, ny * v1n + ty * v1t)
+            obj2.velocity = velocity2.set(nx * v2n + tx * v2t, ny * v2n + ty * v2t)
+        else:
+            obj1.velocity = Vector2D(nx * v1n + tx * v1t, ny * v1n + ty * v1t)
+            obj2.velocity = Vector2D(nx * v2n + tx * v2t, ny * v2n + ty * v2t)
+        self._notify_collision(collision_point)
+
+    @micropython.native
+    def _notify_collision(self, collision_point: CollisionEvent):
+        """速度分配完成后：检查休眠物体是否被唤醒，并调用handler"""
+        obj1 = collision_point.obj1
+        obj2 = collision_point.obj2
+        # 被碰撞的休眠物体：自身获得的速度或对方的速度超过阈值才唤醒，否则保持静止，避免缓慢接触的物体反复唤醒对方
+        if self.sleep_enabled:
+            if obj1.sleeping:
+                self._touch_sleeping(obj1, obj2)
+            if obj2.sleeping:
+                self._touch_sleeping(obj2, obj1)
+
+        if self.batch_events_enabled:
+            # 留到本步结束统一投递
+            if (self.collision_batch_handler is not None or self.collision_handler is not None
+                    or obj1.collision_handler is not None or obj2.collision_handler is not None):
+                self._batch.append(collision_point)
+            return
+
+        # 调用handler
+        if self.collision_handler is not None:
+            self.collision_handler(collision_point)
+        if obj1.collision_handler is not None:
+            obj1.collision_handler(collision_point)
+        if obj2.collision_handler is not None:
+            obj2.collision_handler(collision_point)
+
+    @micropython.native
+    def _new_event(self, obj1: PhysicalObject, obj2: PhysicalObject, pos: Pos2D, normal: Vector2D) -> CollisionEvent:
+        """创建碰撞点，由各物体的collision调用。批量投递时从复用的事件对象中取"""
+        if not self.batch_events_enabled:
+            return CollisionEvent(obj1, obj2, pos, normal)
+        pool = self._event_pool
+        index = self._event_count
+        if index < len(pool):
+            event = pool[index]
+            event.obj1 = obj1
+            event.obj2 = obj2
+            event.pos = pos
+            event.normal = normal
+            event.obj1_last_velocity = obj1.velocity
+            event.obj2_last_velocity = obj2.velocity
+        else:
+            event = CollisionEvent(obj1, obj2, pos, normal)
+            pool.append(event)
+        if (self.collision_batch_handler is not None or self.collision_handler is not None
+                or obj1.collision_handler is not None or obj2.collision_handler is not None
+                or self.solver is not None):
+            # 要投递或留给solver的事件占用该对象直到本步结束，否则下一次碰撞直接复用
+            self._event_count = index + 1
+        return event
+
+    def _deliver_events(self):
+        """批量投递本步的事件，并回收事件对象"""
+        batch = self._batch
+        if len(batch) > 0:
+            if self.collision_batch_handler is not None:
+                self.collision_batch_handler(batch)
+            for collision_point in batch:
+                if self.collision_handler is not None:
+                    self.collision_handler(collision_point)
+                if collision_point.obj1.collision_handler is not None:
+                    collision_point.obj1.collision_handler(collision_point)
+                if collision_point.obj2.collision_handler is not None:
+                    collision_point.obj2.collision_handler(collision_point)
+            batch.clear()
+        self._event_count = 0
+
+    @micropython.native
+    def _touch_sleeping(self, obj: PhysicalObject, other: PhysicalObject):
+        velocity = obj.velocity
+        other_velocity = other.velocity
+        threshold_square = self.sleep_velocity_threshold * self.sleep_velocity_threshold
+        if (velocity.x * velocity.x + velocity.y * velocity.y > threshold_square
+                or other_velocity.x * other_velocity.x + other_velocity.y * other_velocity.y > threshold_square):
+            obj.wake()
+        elif self.inplace_update_enabled:
+            obj.velocity = velocity.set(0.0, 0.0)
+        else:
+            obj.velocity = Vector2D(0.0, 0.0)
 
-            # 调用handler
-            if self.collision_handler is not None:
-                self.collision_handler(collision_point)
-            if obj1.collision_handler is not None:
-                obj1.collision_handler(collision_point)
-            if obj2.collision_handler is not None:
-                obj2.collision_handler(collision_point)
+    @micropython.native
+    def _check_wake(self):
+        """检查休眠物体是否需要唤醒：速度被修改、受力改变或全局力改变"""
+        global_force = self.global_force
+        global_acceleration = self.global_acceleration
+        global_state = (global_force.x, global_force.y, global_acceleration.x, global_acceleration.y)
+        global_changed = global_state != self._sleep_global
+        self._sleep_global = global_state
+        for obj in self._active_objects:
+            if not obj.sleeping:
+                continue
+            velocity = obj.velocity
+            extra_force = obj.extra_force
+            extra_acceleration = obj.extra_acceleration
+            if (global_changed or velocity.x != 0.0 or velocity.y != 0.0
+                    or (extra_force.x, extra_force.y, extra_acceleration.x, extra_acceleration.y) != self._sleep_forces.get(obj)):
+                obj.wake()
 
-        # 两两检查碰撞
-        # 1. fixed-active
+    @micropython.native
+    def _update_sleep(self):
+        """统计各物体连续低速的步数，达到sleep_steps后进入休眠"""
+        threshold_square = self.sleep_velocity_threshold * self.sleep_velocity_threshold
+        sleep_steps = self.sleep_steps
+        sleep_counts = self._sleep_counts
+        for obj in self._active_objects:
+            if obj.sleeping:
+                continue
+            velocity = obj.velocity
+            if velocity.x * velocity.x + velocity.y * velocity.y >= threshold_square:
+                if obj in sleep_counts:
+                    del sleep_counts[obj]
+                continue
+            count = sleep_counts.get(obj, 0) + 1
+            if count < sleep_steps:
+                sleep_counts[obj] = count
+                continue
+            # 唤醒后从0开始计数
+            if obj in sleep_counts:
+                del sleep_counts[obj]
+            obj.sleeping = True
+            if self.inplace_update_enabled:
+                obj.velocity = velocity.set(0.0, 0.0)
+            else:
+                obj.velocity = Vector2D(0.0, 0.0)
+            obj.last_pos = None
+            extra_force = obj.extra_force
+            extra_acceleration = obj.extra_acceleration
+            self._sleep_forces[obj] = (extra_force.x, extra_force.y, extra_acceleration.x, extra_acceleration.y)
+
+    def count_awake(self) -> int:
+        """未休眠的非fixed物体数"""
+        count = 0
+        for obj in self._active_objects:
+            if not obj.sleeping:
+                count += 1
+        return count
+
+    def count_sleeping(self) -> int:
+        """休眠的物体数"""
+        return len(self._active_objects) - self.count_awake()
+
+    @micropython.native
+    def update_collision(self):
+        """更新碰撞"""
+        if self.pair_cache_enabled:
+            self._advance_odometers()
+        if self.broad_phase is not None:
+            self.broad_phase.update_collision(self)
+        else:
+            # 两两检查碰撞
+            self._collide_fixed_active()
+            self._collide_active_active()
+        if self.solver is not None:
+            self.solver.solve(self)
+        if self.pair_cache_enabled and len(self._pair_cache) >= self.pair_cache_limit:
+            self._prune_pair_cache()
+
+    @staticmethod
+    @micropython.native
+    def _penetration(obj1: PhysicalObject, obj2: PhysicalObject) -> float:
+        """两物体当前的穿透深度，不支持的物体返回0"""
+        if isinstance(obj1, Circle) and isinstance(obj2, Circle):
+            dx = obj2.pos.x - obj1.pos.x
+            dy = obj2.pos.y - obj1.pos.y
+            return obj1.radius + obj2.radius - math.sqrt(dx * dx + dy * dy)
+        if isinstance(obj2, Line):
+            obj1, obj2 = obj2, obj1
+        if isinstance(obj1, Line) and isinstance(obj2, Circle):
+            d = obj1.direction
+            return obj2.radius - abs(d.x * (obj2.pos.y - obj1.pos.y) - d.y * (obj2.pos.x - obj1.pos.x))
+        return 0.0
+
+    @micropython.native
+    def _collide_fixed_active(self):
+        """两两检查fixed-active碰撞"""
+        handle_collision = self.handle_collision
         for obj1 in self._fixed_objects:
             for obj2 in self._active_objects:
                 handle_collision(obj1, obj2)
-        # 2. active-active
+
+    @micropython.native
+    def _collide_active_active(self):
+        """两两检查active-active碰撞"""
+        handle_collision = self.handle_collision
         n = len(self._active_objects)
         for i in range(n):
             for j in range(i + 1, n):
@@ -446,10 +932,55 @@ class Physics2D:
     @micropython.native
     def update(self, dt: float):
         """更新。"""
+        if self.stats is not None:
+            self.stats.step(self, dt)
+            return
         if self.update_callback is not None:
             self.update_callback(dt)
+        self._step_dt = dt
         self.update_move(dt)
         self.update_collision()
+        if self.sleep_enabled:
+            self._update_sleep()
+        if self.batch_events_enabled:
+            self._deliver_events()
+        if self.history is not None:
+            self.history._step(self)
+        if self.post_update_callback is not None:
+            self.post_update_callback(dt)
+    @micropython.native
+    def advance(self, elapsed: float) -> float:
+        """推进elapsed秒：以固定步长fixed_dt调用若干次update，不足一步的时间留到下次。  
+        返回插值系数alpha(0-1)，绘制时用obj.interpolate_pos(alpha)可在前后两步之间平滑过渡，无需额外模拟"""
+        fixed_dt = self.fixed_dt
+        accumulator = self._accumulator + elapsed
+        steps = int(accumulator / fixed_dt)
+        if steps > self.max_substeps:
+            # 丢弃超出预算的整步
+            accumulator -= (steps - self.max_substeps) * fixed_dt
+            steps = self.max_substeps
+        for step in range(steps):
+            if step == steps - 1:
+                # 只有最后一步之前的位置用于插值
+                self._record_prev_pos()
+            self.update(fixed_dt)
+            accumulator -= fixed_dt
+        if accumulator < 0.0:
+            accumulator = 0.0
+        self._accumulator = accumulator
+        self.last_substeps = steps
+        return accumulator / fixed_dt
+
+    @micropython.native
+    def _record_prev_pos(self):
+        inplace = self.inplace_update_enabled
+        for obj in self._active_objects:
+            pos = obj.pos
+            if inplace and obj.prev_pos is not None:
+                obj.prev_pos = obj.prev_pos.set(pos.x, pos.y)
+            else:
+                obj.prev_pos = Pos2D(pos.x, pos.y)
+
     def append(self, obj: PhysicalObject):
         if obj.fixed:
             self._fixed_objects.append(obj)
@@ -463,7 +994,22 @@ class Physics2D:
             self._fixed_objects.remove(obj)
         else:
             self._active_objects.remove(obj)
+        # 不再引用已移除的物体
+        if len(self._pair_cache) > 0:
+            self._pair_cache = {}
+        self._forget(obj)
+        if self.solver is not None:
+            self.solver.remove(obj)
+    def _forget(self, obj: PhysicalObject):
+        """丢弃引擎为物体记录的休眠计数和累计移动距离"""
+        for state in (self._sleep_counts, self._sleep_forces, self._odometers):
+            if obj in state:
+                del state[obj]
     def setFixed(self, obj: PhysicalObject, fixed: bool):
+        obj.wake()
+        if obj in self._sleep_counts:
+            del self._sleep_counts[obj]
+        obj.prev_pos = None
         if obj.fixed == fixed:
             return
         obj.fixed = fixed
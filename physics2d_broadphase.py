@@ -0,0 +1,642 @@
+# physics2d的粗检测(broad phase)。
+# 与physics2d分开存放，不使用粗检测的程序(如单片机上的小场景)不必编译和加载这部分代码。
+# 用法: phys.broad_phase = SpatialHashBroadPhase() (或SweepAndPruneBroadPhase、AABBTreeBroadPhase)
+
+import math
+import heapq
+
+import micropython
+
+from physics2d import *
+
+@micropython.native
+def aabb_of(obj: PhysicalObject, swept: bool = False):
+    """返回物体的轴对齐包围盒(min_x, min_y, max_x, max_y)。无界物体(如直线)返回None  
+    swept: 包含本步从last_pos到pos扫过的范围，供扫掠检测使用"""
+    if isinstance(obj, Circle):
+        r = obj.radius
+        p = obj.pos
+        last_pos = obj.last_pos
+        if swept and last_pos is not None and not obj.fixed:
+            return (
+                (p.x if p.x < last_pos.x else last_pos.x) - r,
+                (p.y if p.y < last_pos.y else last_pos.y) - r,
+                (p.x if p.x > last_pos.x else last_pos.x) + r,
+                (p.y if p.y > last_pos.y else last_pos.y) + r,
+            )
+        return (p.x - r, p.y - r, p.x + r, p.y + r)
+    return None
+
+@micropython.native
+def aabb_overlap(a: tuple, b: tuple) -> bool:
+    """两包围盒是否相交(含恰好接触)"""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+class BroadPhase:
+    """粗检测(broad phase)基类  
+    update_collision只把包围盒相交的对象对交给Physics2D.handle_collision，且顺序与两两检查一致(先fixed-active，再active-active)。
+    若某次穿透校正移动了物体，会立即用新包围盒重新查询该物体，因此碰撞结果与两两检查完全相同。  
+    无界物体(如直线)由基类负责，总是与所有物体配对。子类需实现_build、_query和_move"""
+
+    @micropython.native
+    def update_collision(self, phys: 'Physics2D'):
+        fixed_objects = phys._fixed_objects
+        active_objects = phys._active_objects
+        nf = len(fixed_objects)
+        na = len(active_objects)
+        # 对象对编号：fixed-active为fi * na + ai；active-active为base + i * na + j(i < j)
+        # 按编号从小到大处理即为两两检查的顺序
+        base = nf * na
+        keys = set()
+        fixed_boxes = []
+        active_boxes = []
+        swept = phys.swept_collision_enabled
+        self._swept = swept
+        for fi in range(nf):
+            box = aabb_of(fixed_objects[fi], swept)
+            if box is None:
+                for ai in range(na):
+                    keys.add(fi * na + ai)
+            fixed_boxes.append(box)
+        for ai in range(na):
+            box = aabb_of(active_objects[ai], swept)
+            if box is None:
+                for fi in range(nf):
+                    keys.add(fi * na + ai)
+                for aj in range(na):
+                    if aj < ai:
+                        keys.add(base + aj * na + ai)
+                    elif aj > ai:
+                        keys.add(base + ai * na + aj)
+            active_boxes.append(box)
+        self._build(fixed_objects, active_objects, fixed_boxes, active_boxes, keys, na, base)
+
+        handle_collision = phys.handle_collision
+        ordered = sorted(keys)
+        # 处理过程中因校正新增的候选对
+        extra = []
+        count = len(ordered)
+        index = 0
+        while index < count or len(extra) > 0:
+            if len(extra) > 0 and (index >= count or extra[0] < ordered[index]):
+                key = heapq.heappop(extra)
+            else:
+                key = ordered[index]
+                index += 1
+            if key < base:
+                ai = key % na
+                obj1 = fixed_objects[key // na]
+                obj2 = active_objects[ai]
+                box2 = active_boxes[ai]
+                x, y = obj2.pos.x, obj2.pos.y
+                handle_collision(obj1, obj2)
+                # fixed物体不会被校正，只需检查active一方
+                if box2 is not None and (obj2.pos.x != x or obj2.pos.y != y):
+                    self._requery(obj2, ai, active_boxes, key, keys, extra, na, base)
+            else:
+                ai = (key - base) // na
+                aj = (key - base) % na
+                obj1 = active_objects[ai]
+                obj2 = active_objects[aj]
+                x1, y1 = obj1.pos.x, obj1.pos.y
+                x2, y2 = obj2.pos.x, obj2.pos.y
+                handle_collision(obj1, obj2)
+                if active_boxes[ai] is not None and (obj1.pos.x != x1 or obj1.pos.y != y1):
+                    self._requery(obj1, ai, active_boxes, key, keys, extra, na, base)
+                if active_boxes[aj] is not None and (obj2.pos.x != x2 or obj2.pos.y != y2):
+                    self._requery(obj2, aj, active_boxes, key, keys, extra, na, base)
+
+    @micropython.native
+    def _requery(self, obj: PhysicalObject, index: int, active_boxes: list, current: int, keys: set, extra: list, na: int, base: int):
+        """物体被校正移动后，更新其包围盒并查询新的候选对。只加入编号大于当前对的对象对"""
+        old_box = active_boxes[index]
+        new_box = aabb_of(obj, self._swept)
+        active_boxes[index] = new_box
+        self._move(index, old_box, new_box)
+        for other_active, other in self._query(new_box):
+            if other_active:
+                if other == index:
+                    continue
+                if other < index:
+                    key = base + other * na + index
+                else:
+                    key = base + index * na + other
+            else:
+                key = other * na + index
+            if key > current and key not in keys:
+                keys.add(key)
+                heapq.heappush(extra, key)
+
+    def _build(self, fixed_objects: list, active_objects: list, fixed_boxes: list, active_boxes: list, keys: set, na: int, base: int):
+        """建立本步的加速结构，并把包围盒相交的对象对编号加入keys  
+        fixed_boxes/active_boxes: 按下标排列的包围盒，无界物体为None，应忽略"""
+        raise NotImplementedError
+
+    def _query(self, box: tuple):
+        """返回与box相交的所有物体[(是否active(0/1), 下标), ...]"""
+        raise NotImplementedError
+
+    def _move(self, index: int, old_box: tuple, new_box: tuple):
+        """下标为index的active物体包围盒由old_box变为new_box"""
+        raise NotImplementedError
+
+    @staticmethod
+    @micropython.native
+    def _pair_key(active1: int, index1: int, active2: int, index2: int, na: int, base: int) -> int:
+        """对象对编号。fixed-fixed返回-1"""
+        if active1 and active2:
+            if index1 < index2:
+                return base + index1 * na + index2
+            return base + index2 * na + index1
+        elif active1:
+            return index2 * na + index1
+        elif active2:
+            return index1 * na + index2
+        return -1
+
+class SpatialHashBroadPhase(BroadPhase):
+    """均匀网格(空间哈希)粗检测  
+    每步将圆按包围盒放入网格，只有落在同一网格中的对象才会成为候选对。适用于大小相近的大量圆"""
+    def __init__(self, cell_size: float | None = None):
+        """cell_size: 网格边长。为None时每步根据半径分布自动取值"""
+        self.cell_size = cell_size
+        self.last_cell_size = 0.0
+        """上一步实际使用的网格边长"""
+        self._grid = {}
+        self._inv = 1.0
+        self._boxes = ([], [])
+
+    @micropython.native
+    def _auto_cell_size(self, fixed_boxes: list, active_boxes: list) -> float:
+        """取直径的中位数。少数特别大的物体会跨越多个网格，但不会拖大整体的网格"""
+        diameters = [box[2] - box[0] for box in active_boxes if box is not None]
+        if len(diameters) == 0:
+            diameters = [box[2] - box[0] for box in fixed_boxes if box is not None]
+        if len(diameters) == 0:
+            return 1.0
+        diameters.sort()
+        return diameters[len(diameters) // 2]
+
+    @micropython.native
+    def _cells(self, box: tuple):
+        inv = self._inv
+        x0 = math.floor(box[0] * inv)
+        x1 = math.floor(box[2] * inv)
+        y0 = math.floor(box[1] * inv)
+        y1 = math.floor(box[3] * inv)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield (cx, cy)
+
+    @micropython.native
+    def _insert(self, entry: tuple, box: tuple):
+        grid = self._grid
+        for cell_key in self._cells(box):
+            cell = grid.get(cell_key)
+            if cell is None:
+                grid[cell_key] = [entry]
+            else:
+                cell.append(entry)
+
+    @micropython.native
+    def _build(self, fixed_objects: list, active_objects: list, fixed_boxes: list, active_boxes: list, keys: set, na: int, base: int):
+        cell_size = self.cell_size
+        if cell_size is None:
+            cell_size = self._auto_cell_size(fixed_boxes, active_boxes)
+        self.last_cell_size = cell_size
+        self._inv = 1.0 / cell_size
+        self._grid = {}
+        self._boxes = (fixed_boxes, active_boxes)
+        for is_active, boxes in ((0, fixed_boxes), (1, active_boxes)):
+            for index in range(len(boxes)):
+                if boxes[index] is not None:
+                    self._insert((is_active, index), boxes[index])
+        # 同一格内两两检查包围盒
+        pair_key = self._pair_key
+        for cell in self._grid.values():
+            n = len(cell)
+            for i in range(n):
+                active1, index1 = cell[i]
+                box1 = self._boxes[active1][index1]
+                for j in range(i + 1, n):
+                    active2, index2 = cell[j]
+                    key = pair_key(active1, index1, active2, index2, na, base)
+                    if key < 0 or key in keys:
+                        continue
+                    if aabb_overlap(box1, self._boxes[active2][index2]):
+                        keys.add(key)
+
+    @micropython.native
+    def _query(self, box: tuple):
+        found = set()
+        result = []
+        boxes = self._boxes
+        grid = self._grid
+        for cell_key in self._cells(box):
+            cell = grid.get(cell_key)
+            if cell is None:
+                continue
+            for entry in cell:
+                if entry in found:
+                    continue
+                found.add(entry)
+                if aabb_overlap(box, boxes[entry[0]][entry[1]]):
+                    result.append(entry)
+        return result
+
+    @micropython.native
+    def _move(self, index: int, old_box: tuple, new_box: tuple):
+        entry = (1, index)
+        grid = self._grid
+        for cell_key in self._cells(old_box):
+            grid[cell_key].remove(entry)
+        self._insert(entry, new_box)
+
+
+class SweepAndPruneBroadPhase(BroadPhase):
+    """扫描裁剪(sweep and prune)粗检测  
+    沿一个坐标轴保存包围盒区间的排序，跨步保留该顺序，每步用插入排序增量更新。
+    物体每步只移动一点时，排序几乎是线性的，适合帧间连续的场景"""
+    def __init__(self, axis: int = 0):
+        """axis: 排序所沿的坐标轴，0为x轴，1为y轴"""
+        self.axis = axis
+        self.last_swaps = 0
+        """上一步插入排序的交换次数。场景越连贯越小"""
+        self._order: list[PhysicalObject] = []
+        self._entries: list[tuple[int, int]] = []
+        self._mins: list[float] = []
+        self._boxes = ([], [])
+        self._max_extent = 0.0
+
+    @micropython.native
+    def _bisect(self, value: float) -> int:
+        """返回_mins中第一个大于value的位置"""
+        mins = self._mins
+        lo = 0
+        hi = len(mins)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mins[mid] > value:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    @micropython.native
+    def _build(self, fixed_objects: list, active_objects: list, fixed_boxes: list, active_boxes: list, keys: set, na: int, base: int):
+        axis = self.axis
+        self._boxes = (fixed_boxes, active_boxes)
+        # 物体 -> (是否active, 下标)
+        locations = {}
+        for is_active, objects, boxes in ((0, fixed_objects, fixed_boxes), (1, active_objects, active_boxes)):
+            for index in range(len(objects)):
+                if boxes[index] is not None:
+                    locations[objects[index]] = (is_active, index)
+        # 沿用上一步的顺序，剔除已移除的物体，追加新物体
+        order = [obj for obj in self._order if obj in locations]
+        if len(order) != len(locations):
+            known = set(order)
+            for obj in locations:
+                if obj not in known:
+                    order.append(obj)
+        entries = [locations[obj] for obj in order]
+        mins = [self._boxes[entry[0]][entry[1]][axis] for entry in entries]
+
+        # 插入排序
+        swaps = 0
+        for i in range(1, len(order)):
+            value = mins[i]
+            if mins[i - 1] <= value:
+                continue
+            obj = order[i]
+            entry = entries[i]
+            j = i - 1
+            while j >= 0 and mins[j] > value:
+                mins[j + 1] = mins[j]
+                order[j + 1] = order[j]
+                entries[j + 1] = entries[j]
+                j -= 1
+            mins[j + 1] = value
+            order[j + 1] = obj
+            entries[j + 1] = entry
+            swaps += i - 1 - j
+        self.last_swaps = swaps
+        self._order = order
+        self._entries = entries
+        self._mins = mins
+
+        # 扫描：窗口中保存区间尚未结束的物体
+        pair_key = self._pair_key
+        max_extent = 0.0
+        window = []
+        for entry in entries:
+            box = self._boxes[entry[0]][entry[1]]
+            low = box[axis]
+            extent = box[axis + 2] - low
+            if extent > max_extent:
+                max_extent = extent
+            count = 0
+            for other in window:
+                other_box = self._boxes[other[0]][other[1]]
+                if other_box[axis + 2] < low:
+                    continue # 区间已结束，移出窗口
+                window[count] = other
+                count += 1
+                key = pair_key(entry[0], entry[1], other[0], other[1], na, base)
+                if key >= 0 and aabb_overlap(box, other_box):
+                    keys.add(key)
+            del window[count:]
+            window.append(entry)
+        self._max_extent = max_extent
+
+    @micropython.native
+    def _query(self, box: tuple):
+        axis = self.axis
+        boxes = self._boxes
+        entries = self._entries
+        result = []
+        # 区间起点不早于box起点减去最大区间长度，且不晚于box终点
+        start = self._bisect(box[axis] - self._max_extent - DIV_EPLISON)
+        if start > 0:
+            start -= 1
+        end = self._bisect(box[axis + 2])
+        for k in range(start, end):
+            entry = entries[k]
+            if aabb_overlap(box, boxes[entry[0]][entry[1]]):
+                result.append(entry)
+        return result
+
+    @micropython.native
+    def _move(self, index: int, old_box: tuple, new_box: tuple):
+        axis = self.axis
+        entry = (1, index)
+        entries = self._entries
+        # 找到并移出旧位置
+        k = self._bisect(old_box[axis]) - 1
+        while entries[k] != entry:
+            k -= 1
+        obj = self._order.pop(k)
+        entries.pop(k)
+        self._mins.pop(k)
+        # 插入新位置
+        k = self._bisect(new_box[axis])
+        self._order.insert(k, obj)
+        entries.insert(k, entry)
+        self._mins.insert(k, new_box[axis])
+        extent = new_box[axis + 2] - new_box[axis]
+        if extent > self._max_extent:
+            self._max_extent = extent
+
+
+class _TreeNode:
+    """动态AABB树节点。仅内部使用"""
+    __slots__ = ("box", "obj", "entry", "parent", "child1", "child2", "height")
+    def __init__(self, box: tuple, obj: PhysicalObject | None = None):
+        self.box = box
+        self.obj = obj
+        self.entry: tuple[int, int] | None = None # 叶子对应的(是否active, 下标)
+        self.parent: _TreeNode | None = None
+        self.child1: _TreeNode | None = None
+        self.child2: _TreeNode | None = None
+        self.height = 0
+
+@micropython.native
+def _aabb_union(a: tuple, b: tuple) -> tuple:
+    return (
+        a[0] if a[0] < b[0] else b[0],
+        a[1] if a[1] < b[1] else b[1],
+        a[2] if a[2] > b[2] else b[2],
+        a[3] if a[3] > b[3] else b[3],
+    )
+
+@micropython.native
+def _aabb_perimeter(a: tuple) -> float:
+    return 2 * ((a[2] - a[0]) + (a[3] - a[1]))
+
+@micropython.native
+def _aabb_contains(outer: tuple, inner: tuple) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+class AABBTreeBroadPhase(BroadPhase):
+    """动态AABB树(包围体层次)粗检测  
+    每个物体对应一个放大(fat)后的包围盒叶子，树跨步保留。物体移动但仍在放大包围盒内时无需改动树，
+    移出后才重新插入。树的查询代价与物体大小无关，适合大小相差悬殊的场景(如半径100的固定圆与半径1的球)"""
+    def __init__(self, margin: float | None = None):
+        """margin: 包围盒放大量。为None时取各自包围盒较长边的0.2倍"""
+        self.margin = margin
+        self.last_reinserts = 0
+        """上一步因移出放大包围盒而重新插入的叶子数"""
+        self._root: _TreeNode | None = None
+        self._leaves: dict[PhysicalObject, _TreeNode] = {}
+        self._active_leaves: list[_TreeNode] = []
+        self._boxes = ([], [])
+
+    @micropython.native
+    def _fatten(self, box: tuple) -> tuple:
+        margin = self.margin
+        if margin is None:
+            w = box[2] - box[0]
+            h = box[3] - box[1]
+            margin = 0.2 * (w if w > h else h)
+        return (box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin)
+
+    @micropython.native
+    def _balance(self, a: _TreeNode) -> _TreeNode:
+        """若a的左右子树高度差超过1，则做一次旋转，返回旋转后该位置的节点"""
+        if a.child1 is None or a.height < 2:
+            return a
+        b = a.child1
+        c = a.child2
+        balance = c.height - b.height
+        if balance > 1:
+            # 将c提升
+            f = c.child1
+            g = c.child2
+            c.child1 = a
+            c.parent = a.parent
+            a.parent = c
+            self._replace_child(c.parent, a, c)
+            if f.height > g.height:
+                c.child2 = f
+                a.child2 = g
+                g.parent = a
+                a.box = _aabb_union(b.box, g.box)
+                c.box = _aabb_union(a.box, f.box)
+                a.height = 1 + max(b.height, g.height)
+                c.height = 1 + max(a.height, f.height)
+            else:
+                c.child2 = g
+                a.child2 = f
+                f.parent = a
+                a.box = _aabb_union(b.box, f.box)
+                c.box = _aabb_union(a.box, g.box)
+                a.height = 1 + max(b.height, f.height)
+                c.height = 1 + max(a.height, g.height)
+            return c
+        if balance < -1:
+            # 将b提升
+            d = b.child1
+            e = b.child2
+            b.child1 = a
+            b.parent = a.parent
+            a.parent = b
+            self._replace_child(b.parent, a, b)
+            if d.height > e.height:
+                b.child2 = d
+                a.child1 = e
+                e.parent = a
+                a.box = _aabb_union(c.box, e.box)
+                b.box = _aabb_union(a.box, d.box)
+                a.height = 1 + max(c.height, e.height)
+                b.height = 1 + max(a.height, d.height)
+            else:
+                b.child2 = e
+                a.child1 = d
+                d.parent = a
+                a.box = _aabb_union(c.box, d.box)
+                b.box = _aabb_union(a.box, e.box)
+                a.height = 1 + max(c.height, d.height)
+                b.height = 1 + max(a.height, e.height)
+            return b
+        return a
+
+    def _replace_child(self, parent: _TreeNode | None, old: _TreeNode, new: _TreeNode):
+        if parent is None:
+            self._root = new
+        elif parent.child1 is old:
+            parent.child1 = new
+        else:
+            parent.child2 = new
+
+    @micropython.native
+    def _refit(self, node: _TreeNode | None):
+        """从node向上重新计算包围盒与高度，并保持平衡"""
+        while node is not None:
+            node = self._balance(node)
+            child1 = node.child1
+            child2 = node.child2
+            node.height = 1 + max(child1.height, child2.height)
+            node.box = _aabb_union(child1.box, child2.box)
+            node = node.parent
+
+    @micropython.native
+    def _insert_leaf(self, leaf: _TreeNode):
+        if self._root is None:
+            self._root = leaf
+            leaf.parent = None
+            return
+        # 按周长代价选择兄弟节点
+        box = leaf.box
+        node = self._root
+        while node.child1 is not None:
+            area = _aabb_perimeter(node.box)
+            combined = _aabb_perimeter(_aabb_union(node.box, box))
+            cost = 2 * combined
+            inheritance = 2 * (combined - area)
+            child1 = node.child1
+            child2 = node.child2
+            cost1 = _aabb_perimeter(_aabb_union(box, child1.box)) + inheritance
+            if child1.child1 is not None:
+                cost1 -= _aabb_perimeter(child1.box)
+            cost2 = _aabb_perimeter(_aabb_union(box, child2.box)) + inheritance
+            if child2.child1 is not None:
+                cost2 -= _aabb_perimeter(child2.box)
+            if cost < cost1 and cost < cost2:
+                break
+            node = child1 if cost1 < cost2 else child2
+        sibling = node
+        old_parent = sibling.parent
+        new_parent = _TreeNode(_aabb_union(box, sibling.box))
+        new_parent.parent = old_parent
+        new_parent.height = sibling.height + 1
+        self._replace_child(old_parent, sibling, new_parent)
+        new_parent.child1 = sibling
+        new_parent.child2 = leaf
+        sibling.parent = new_parent
+        leaf.parent = new_parent
+        self._refit(new_parent)
+
+    @micropython.native
+    def _remove_leaf(self, leaf: _TreeNode):
+        if leaf is self._root:
+            self._root = None
+            return
+        parent = leaf.parent
+        grand_parent = parent.parent
+        sibling = parent.child2 if parent.child1 is leaf else parent.child1
+        self._replace_child(grand_parent, parent, sibling)
+        sibling.parent = grand_parent
+        leaf.parent = None
+        self._refit(grand_parent)
+
+    @micropython.native
+    def _build(self, fixed_objects: list, active_objects: list, fixed_boxes: list, active_boxes: list, keys: set, na: int, base: int):
+        self._boxes = (fixed_boxes, active_boxes)
+        leaves = self._leaves
+        locations = {}
+        for is_active, objects, boxes in ((0, fixed_objects, fixed_boxes), (1, active_objects, active_boxes)):
+            for index in range(len(objects)):
+                if boxes[index] is not None:
+                    locations[objects[index]] = (is_active, index)
+        # 移除已不在场景中的物体
+        for obj in list(leaves.keys()):
+            if obj not in locations:
+                self._remove_leaf(leaves.pop(obj))
+        # 插入新物体，移出放大包围盒的物体重新插入
+        reinserts = 0
+        active_leaves = [None] * na
+        for obj, entry in locations.items():
+            box = self._boxes[entry[0]][entry[1]]
+            leaf = leaves.get(obj)
+            if leaf is None:
+                leaf = _TreeNode(self._fatten(box), obj)
+                self._insert_leaf(leaf)
+                leaves[obj] = leaf
+            elif not _aabb_contains(leaf.box, box):
+                self._remove_leaf(leaf)
+                leaf.box = self._fatten(box)
+                self._insert_leaf(leaf)
+                reinserts += 1
+            leaf.entry = entry
+            if entry[0]:
+                active_leaves[entry[1]] = leaf
+        self.last_reinserts = reinserts
+        self._active_leaves = active_leaves
+        # 以每个active物体查询树，即可得到fixed-active与active-active的所有候选对
+        pair_key = self._pair_key
+        for index in range(na):
+            box = active_boxes[index]
+            if box is None:
+                continue
+            for other_active, other in self._query(box):
+                key = pair_key(1, index, other_active, other, na, base)
+                if key >= 0 and not (other_active and other == index):
+                    keys.add(key)
+
+    @micropython.native
+    def _query(self, box: tuple):
+        result = []
+        if self._root is None:
+            return result
+        boxes = self._boxes
+        stack = [self._root]
+        while len(stack) > 0:
+            node = stack.pop()
+            if not aabb_overlap(node.box, box):
+                continue
+            if node.child1 is None:
+                entry = node.entry
+                if aabb_overlap(box, boxes[entry[0]][entry[1]]):
+                    result.append(entry)
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+        return result
+
+    @micropython.native
+    def _move(self, index: int, old_box: tuple, new_box: tuple):
+        leaf = self._active_leaves[index]
+        if not _aabb_contains(leaf.box, new_box):
+            self._remove_leaf(leaf)
+            leaf.box = self._fatten(new_box)
+            self._insert_leaf(leaf)
@@ -0,0 +1,413 @@
+# physics2d的系综(ensemble)后端，仅用于电脑端。
+# K个拓扑相同(物体的种类、顺序、是否fixed都相同)、只有初始条件不同的小世界按(K, n)的数组批量存放，
+# 每步用同一组向量化运算同时积分所有世界，适合蒙特卡罗等需要大量小世界的场合。
+# 运动校正会影响后面物体对的检测，因此碰撞仍按Physics2D两两检查的顺序逐对处理，但每一对在K个世界上一次完成，
+# 各世界的结果与单独用Physics2D运行逐位相同。
+
+import numpy as np
+
+from physics2d import *
+
+_PAIR_CIRCLES = 0
+_PAIR_LINE_CIRCLE = 1
+
+def _normalize(vx: np.ndarray, vy: np.ndarray, length: np.ndarray):
+    """与Vector2D.normalize相同：长度小于DIV_EPLISON时取(1, 0)
+    返回(nx, ny, degenerate)，degenerate标记取了(1, 0)的元素"""
+    degenerate = length < DIV_EPLISON
+    safe = np.where(degenerate, 1.0, length)
+    return np.where(degenerate, 1.0, vx / safe), np.where(degenerate, 0.0, vy / safe), degenerate
+
+def _circles_test(ax, ay, bx, by, ra, rb):
+    """与Circle.collision相同的圆-圆检测，返回(dx, dy, radius_sum, dis_square, hit)"""
+    dx = bx - ax
+    dy = by - ay
+    radius_sum = ra + rb
+    dis_square = dx * dx + dy * dy
+    return dx, dy, radius_sum, dis_square, dis_square < radius_sum * radius_sum
+
+def _line_circle_test(px, py, dx, dy, cx, cy, r, lx, ly):
+    """与Line.collision相同的直线-圆检测
+    lx, ly: 圆的上一帧位置，NaN表示没有；均为None表示不进行连续采样
+    返回(crossed, hit, t, vx, vy, dist_square, det)：crossed为圆心轨迹穿过直线，t为垂足的投影参数，(vx, vy)为垂足指向圆心的向量"""
+    t = dx * (cx - px) + dy * (cy - py)
+    vx = cx - (px + dx * t)
+    vy = cy - (py + dy * t)
+    dist_square = vx * vx + vy * vy
+    hit = dist_square < r * r
+    if lx is None:
+        return np.zeros_like(hit), hit, t, vx, vy, dist_square, None
+    sx = cx - lx
+    sy = cy - ly
+    det = dx * sy - dy * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        u = ((lx - px) * dy - (ly - py) * dx) / det
+    crossed = (lx == lx) & (np.abs(det) >= DIV_EPLISON) & (u >= 0) & (u <= 1)
+    return crossed, crossed | hit, t, vx, vy, dist_square, det
+
+class EnsemblePhysics2D:
+    """K个世界的系综
+    由K个拓扑相同的Physics2D创建(同一个phys可以重复出现，如[phys] * K)，只复制状态，之后与它们无关。
+    物体按先fixed后active的顺序编号(与TrajectoryRecorder相同)。状态通过数组视图访问，可以直接修改：
+    pos / velocity / last_pos / extra_force / extra_acceleration / direction: (K, n, 2)，direction仅对直线有意义，须为单位向量
+    mass / radius / collision_energy_loss: (K, n)
+    global_force / global_acceleration: (K, 2)
+    各世界的basic_correction_enabled、extend_correction_enabled、continuous_collision_sampling_enabled须相同；
+    不支持休眠、扫掠检测、迭代求解(solver)、统计、快照历史、update_callback和默认以外的积分方法(integrator)，也不支持直线之间的碰撞。
+    phys与物体的collision_handler不会被调用，碰撞改为按世界计数(collision_counts)，并调用本类的collision_handler"""
+    def __init__(self, worlds: list[Physics2D]):
+        if len(worlds) == 0:
+            raise ValueError("Ensemble needs at least one world")
+        first = worlds[0]
+        self.basic_correction_enabled = first.basic_correction_enabled
+        """基本穿透校正，同Physics2D"""
+        self.extend_correction_enabled = first.extend_correction_enabled
+        """扩展穿透校正，同Physics2D"""
+        self.continuous_collision_sampling_enabled = first.continuous_collision_sampling_enabled
+        """连续碰撞采样，同Physics2D"""
+        self.collision_handler = None
+        """碰撞处理函数，每个物体对在这一步有碰撞时调用一次，参数: obj1编号, obj2编号, 世界下标数组, 碰撞点(m, 2), 单位法向量(m, 2)。
+        与Physics2D一样在速度分配之后、检查下一对之前调用；直线与圆碰撞时obj1是直线"""
+        bodies = [world._fixed_objects + world._active_objects for world in worlds]
+        nf = len(first._fixed_objects)
+        template = bodies[0]
+        for world, objs in zip(worlds, bodies):
+            if (world.basic_correction_enabled != self.basic_correction_enabled
+                    or world.extend_correction_enabled != self.extend_correction_enabled
+                    or world.continuous_collision_sampling_enabled != self.continuous_collision_sampling_enabled):
+                raise ValueError("All worlds must use the same correction and sampling settings")
+            if (world.sleep_enabled or world.swept_collision_enabled or world.solver is not None
+                    or world.stats is not None or world.history is not None or world.update_callback is not None
+                    or world.integrator is not None):
+                raise ValueError("Ensemble does not support sleeping, swept collision, solver, stats, history, update_callback "
+                                 "or integrators")
+            if len(world._fixed_objects) != nf or len(objs) != len(template):
+                raise ValueError("All worlds must have the same bodies")
+            for obj, model in zip(objs, template):
+                if not isinstance(obj, (Circle, Line)):
+                    raise ValueError("Ensemble only supports Circle and Line")
+                if isinstance(obj, Circle) != isinstance(model, Circle) or bool(obj.fixed) != bool(model.fixed):
+                    raise ValueError("All worlds must have the same bodies")
+        self.world_count = len(worlds)
+        """世界数K"""
+        self.body_count = len(template)
+        """每个世界的物体数n"""
+        self._fixed_count = nf
+        self.names = [str(obj.name) for obj in template]
+        """各物体的名字(取自第一个世界)"""
+        self._circle = [isinstance(obj, Circle) for obj in template]
+        self._fixed = [bool(obj.fixed) for obj in template]
+        self.collision_counts = np.zeros(self.world_count, dtype=np.int64)
+        """各世界累计的碰撞次数"""
+
+        # 内部按(分量, 物体, 世界)存放，每个物体一行，逐对处理时取到的是连续的K个数
+        n = self.body_count
+        k = self.world_count
+        def vectors(getter) -> np.ndarray:
+            array = np.full((2, n, k), np.nan)
+            for w, objs in enumerate(bodies):
+                for b, obj in enumerate(objs):
+                    vector = getter(obj)
+                    if vector is not None:
+                        array[0, b, w] = vector.x
+                        array[1, b, w] = vector.y
+            return array
+        def scalars(getter) -> np.ndarray:
+            return np.array([[getter(objs[b]) for objs in bodies] for b in range(n)], dtype=float).reshape(n, k)
+        self._pos = vectors(lambda obj: obj.pos)
+        self._last_pos = vectors(lambda obj: obj.last_pos)
+        self._velocity = vectors(lambda obj: obj.velocity)
+        self._extra_force = vectors(lambda obj: obj.extra_force)
+        self._extra_acceleration = vectors(lambda obj: obj.extra_acceleration)
+        self._direction = vectors(lambda obj: obj.direction if isinstance(obj, Line) else Vector2D(0.0, 0.0))
+        self._mass = scalars(lambda obj: obj.mass)
+        self._radius = scalars(lambda obj: obj.radius if isinstance(obj, Circle) else 0.0)
+        self._energy_loss = scalars(lambda obj: obj.collision_energy_loss)
+        self._global_force = np.array([[world.global_force.x for world in worlds], [world.global_force.y for world in worlds]], dtype=float)
+        self._global_acceleration = np.array([[world.global_acceleration.x for world in worlds], [world.global_acceleration.y for world in worlds]], dtype=float)
+
+        # 按两两检查的顺序列出物体对。Circle.collision遇到直线时交给Line.collision，碰撞点的obj1是直线
+        pairs = [(a, b) for a in range(nf) for b in range(nf, n)] + [(a, b) for a in range(nf, n) for b in range(a + 1, n)]
+        self._pairs: list[tuple[int, int, int, int]] = []
+        """(种类, obj1, obj2, 在该种类的预检测矩阵中的行)"""
+        circle_pairs = []
+        line_pairs = []
+        for a, b in pairs:
+            if self._circle[a] and self._circle[b]:
+                self._pairs.append((_PAIR_CIRCLES, a, b, len(circle_pairs)))
+                circle_pairs.append((a, b))
+            elif self._circle[a] or self._circle[b]:
+                line, circle = (b, a) if self._circle[a] else (a, b)
+                self._pairs.append((_PAIR_LINE_CIRCLE, line, circle, len(line_pairs)))
+                line_pairs.append((line, circle))
+            else:
+                raise ValueError("Ensemble does not support collision between lines")
+        self._circle_pairs = np.array(circle_pairs, dtype=np.int64).reshape(-1, 2).T
+        self._line_pairs = np.array(line_pairs, dtype=np.int64).reshape(-1, 2).T
+
+    @classmethod
+    def replicate(cls, phys: Physics2D, count: int) -> 'EnsemblePhysics2D':
+        """count个与phys相同的世界，之后可通过数组视图分别设置初始条件"""
+        return cls([phys] * count)
+
+    # 数组视图：(K, n, 2)或(K, n)
+    @property
+    def pos(self) -> np.ndarray:
+        return self._pos.transpose(2, 1, 0)
+    @property
+    def last_pos(self) -> np.ndarray:
+        """NaN表示没有上一帧位置"""
+        return self._last_pos.transpose(2, 1, 0)
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._velocity.transpose(2, 1, 0)
+    @property
+    def extra_force(self) -> np.ndarray:
+        return self._extra_force.transpose(2, 1, 0)
+    @property
+    def extra_acceleration(self) -> np.ndarray:
+        return self._extra_acceleration.transpose(2, 1, 0)
+    @property
+    def direction(self) -> np.ndarray:
+        return self._direction.transpose(2, 1, 0)
+    @property
+    def mass(self) -> np.ndarray:
+        return self._mass.T
+    @property
+    def radius(self) -> np.ndarray:
+        return self._radius.T
+    @property
+    def collision_energy_loss(self) -> np.ndarray:
+        return self._energy_loss.T
+    @property
+    def global_force(self) -> np.ndarray:
+        return self._global_force.T
+    @property
+    def global_acceleration(self) -> np.ndarray:
+        return self._global_acceleration.T
+
+    def update(self, dt: float):
+        """所有世界前进一步"""
+        self.update_move(dt)
+        self.update_collision()
+
+    def update_move(self, dt: float):
+        """仅更新移动，与Physics2D.update_obj_move逐项相同"""
+        nf = self._fixed_count
+        pos = self._pos[:, nf:]
+        if self.continuous_collision_sampling_enabled:
+            # 记录上一帧位置
+            self._last_pos[:, nf:] = pos
+        velocity = self._velocity[:, nf:]
+        acceleration = ((self._global_force[:, None, :] + self._extra_force[:, nf:]) / self._mass[None, nf:]
+                        + (self._extra_acceleration[:, nf:] + self._global_acceleration[:, None, :]))
+        velocity += acceleration * dt
+        pos += velocity * dt
+
+    def _candidates(self) -> tuple[np.ndarray, np.ndarray]:
+        """按本步碰撞检测开始时的位置，一次检测所有物体对，返回圆-圆与直线-圆的(对数, K)命中矩阵
+        与逐对检测的公式相同，对没有被校正移动过的物体，结果与逐对检测一致"""
+        x, y = self._pos
+        a, b = self._circle_pairs
+        circles = _circles_test(x[a], y[a], x[b], y[b], self._radius[a], self._radius[b])[4]
+        line, circle = self._line_pairs
+        lx = ly = None
+        if self.continuous_collision_sampling_enabled:
+            lx = self._last_pos[0][circle]
+            ly = self._last_pos[1][circle]
+        lines = _line_circle_test(x[line], y[line], self._direction[0][line], self._direction[1][line],
+                                  x[circle], y[circle], self._radius[circle], lx, ly)[1]
+        return circles, lines
+
+    def update_collision(self):
+        """按Physics2D两两检查的顺序逐对处理碰撞，每一对在所有世界上一次完成
+        先用一次批量检测找出可能碰撞的对，只有命中的世界、或其中的物体已被前面的校正移动过的世界才逐对检测"""
+        circles, lines = self._candidates()
+        circles_any = circles.any(axis=1).tolist()
+        lines_any = lines.any(axis=1).tolist()
+        moved = np.zeros((self.body_count, self.world_count), dtype=bool)
+        moved_any = [False] * self.body_count
+        for kind, obj1, obj2, row in self._pairs:
+            if kind == _PAIR_CIRCLES:
+                hit_any = circles_any[row]
+                hit = circles[row]
+            else:
+                hit_any = lines_any[row]
+                hit = lines[row]
+            if moved_any[obj1] or moved_any[obj2]:
+                hit = hit | moved[obj1] | moved[obj2]
+            elif not hit_any:
+                continue
+            worlds = np.flatnonzero(hit)
+            if len(worlds) == 0:
+                continue
+            if kind == _PAIR_CIRCLES:
+                self._collide_circles(obj1, obj2, worlds, moved, moved_any)
+            else:
+                self._collide_line_circle(obj1, obj2, worlds, moved, moved_any)
+
+    def _collide_circles(self, a: int, b: int, worlds: np.ndarray, moved: np.ndarray, moved_any: list[bool]):
+        """在worlds中检测并处理圆a与圆b，与Circle.collision及resolve_collision逐项相同"""
+        x, y = self._pos
+        radius = self._radius
+        ax = x[a, worlds]
+        ay = y[a, worlds]
+        bx = x[b, worlds]
+        by = y[b, worlds]
+        ra = radius[a, worlds]
+        rb = radius[b, worlds]
+        dx, dy, radius_sum, dis_square, hit = _circles_test(ax, ay, bx, by, ra, rb)
+        if not hit.all():
+            worlds = worlds[hit]
+            if len(worlds) == 0:
+                return
+            ax, ay, bx, by, ra, rb = ax[hit], ay[hit], bx[hit], by[hit], ra[hit], rb[hit]
+            dx, dy, radius_sum, dis_square = dx[hit], dy[hit], radius_sum[hit], dis_square[hit]
+        dis = np.sqrt(dis_square)
+        nx, ny, degenerate = _normalize(dx, dy, dis)
+        # 碰撞点：一方固定时取固定圆的圆周上与另一圆心连线的交点，否则取两圆心的加权中点
+        if self._fixed[a]:
+            px = ax + nx * ra
+            py = ay + ny * ra
+        elif self._fixed[b]:
+            px = bx - nx * rb
+            py = by - ny * rb
+        else:
+            k = ra / radius_sum
+            px = ax + dx * k
+            py = ay + dy * k
+        # 运动校正
+        if self.basic_correction_enabled:
+            if self._fixed[a]:
+                x[b, worlds] = px + nx * rb
+                y[b, worlds] = py + ny * rb
+                moved[b, worlds] = True
+                moved_any[b] = True
+            elif self._fixed[b]:
+                x[a, worlds] = px - nx * ra
+                y[a, worlds] = py - ny * ra
+                moved[a, worlds] = True
+                moved_any[a] = True
+            elif self.extend_correction_enabled:
+                penetration = radius_sum - dis
+                k = penetration * (rb / radius_sum)
+                x[a, worlds] = ax - nx * k
+                y[a, worlds] = ay - ny * k
+                k = penetration * (ra / radius_sum)
+                x[b, worlds] = bx + nx * k
+                y[b, worlds] = by + ny * k
+                moved[a, worlds] = True
+                moved[b, worlds] = True
+                moved_any[a] = moved_any[b] = True
+        self._resolve(a, b, worlds, nx, ny, degenerate, px, py)
+
+    def _collide_line_circle(self, line: int, circle: int, worlds: np.ndarray, moved: np.ndarray, moved_any: list[bool]):
+        """在worlds中检测并处理直线与圆，与Line.collision及resolve_collision逐项相同"""
+        x, y = self._pos
+        px = x[line, worlds]
+        py = y[line, worlds]
+        dx = self._direction[0][line, worlds]
+        dy = self._direction[1][line, worlds]
+        cx = x[circle, worlds]
+        cy = y[circle, worlds]
+        r = self._radius[circle, worlds]
+        lx = ly = None
+        if self.continuous_collision_sampling_enabled:
+            lx = self._last_pos[0][circle, worlds]
+            ly = self._last_pos[1][circle, worlds]
+        crossed, hit, t, vx, vy, dist_square, det = _line_circle_test(px, py, dx, dy, cx, cy, r, lx, ly)
+        if not hit.all():
+            worlds = worlds[hit]
+            if len(worlds) == 0:
+                return
+            px, py, dx, dy, cx, cy, r = px[hit], py[hit], dx[hit], dy[hit], cx[hit], cy[hit], r[hit]
+            crossed, t, vx, vy, dist_square = crossed[hit], t[hit], vx[hit], vy[hit], dist_square[hit]
+            if lx is not None:
+                lx, ly, det = lx[hit], ly[hit], det[hit]
+        # 离散检测：垂足与垂足指向圆心的法向量，圆心恰在直线上时取垂直于direction的方向
+        dist = np.sqrt(dist_square)
+        nx, ny, degenerate = _normalize(vx, vy, dist)
+        on_line = dist == 0
+        nx = np.where(on_line, -dy, nx)
+        ny = np.where(on_line, dx, ny)
+        degenerate &= ~on_line
+        contact_x = px + dx * t
+        contact_y = py + dy * t
+        if crossed.any():
+            # 连续采样：圆心轨迹与直线的交点，法向量为上一帧位置到直线的垂线方向
+            ex = lx - px
+            ey = ly - py
+            sx = cx - lx
+            sy = cy - ly
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = (ex * sy - ey * sx) / det
+            dot = dx * ex + dy * ey
+            qx = ex - dx * dot
+            qy = ey - dy * dot
+            cross_nx, cross_ny, cross_degenerate = _normalize(qx, qy, np.sqrt(qx * qx + qy * qy))
+            contact_x = np.where(crossed, px + dx * t, contact_x)
+            contact_y = np.where(crossed, py + dy * t, contact_y)
+            nx = np.where(crossed, cross_nx, nx)
+            ny = np.where(crossed, cross_ny, ny)
+            degenerate = np.where(crossed, cross_degenerate, degenerate)
+        # 运动校正：固定的直线把圆放到恰好接触的位置
+        if self.basic_correction_enabled and self._fixed[line]:
+            x[circle, worlds] = contact_x + nx * r
+            y[circle, worlds] = contact_y + ny * r
+            moved[circle, worlds] = True
+            moved_any[circle] = True
+        self._resolve(line, circle, worlds, nx, ny, degenerate, contact_x, contact_y)
+
+    def _resolve(self, obj1: int, obj2: int, worlds: np.ndarray, nx: np.ndarray, ny: np.ndarray, degenerate: np.ndarray,
+                 px: np.ndarray, py: np.ndarray):
+        """与Physics2D.resolve_collision逐项相同地重新分配速度，然后计数并调用collision_handler"""
+        vx, vy = self._velocity
+        keep1 = 1.0 - self._energy_loss[obj1, worlds]
+        keep2 = 1.0 - self._energy_loss[obj2, worlds]
+        # 切向量normal.rotate90()。法向量取(1, 0)时Vector2D中是整数0，没有负零
+        tx = np.where(degenerate, 0.0, -ny)
+        ty = nx
+        v1x = vx[obj1, worlds]
+        v1y = vy[obj1, worlds]
+        v2x = vx[obj2, worlds]
+        v2y = vy[obj2, worlds]
+        v1n = v1x * nx + v1y * ny
+        v1t = v1x * tx + v1y * ty
+        v2n = v2x * nx + v2y * ny
+        v2t = v2x * tx + v2y * ty
+        v1n = v1n * keep1
+        v2n = v2n * keep2
+        if self._fixed[obj1]:
+            v2n = -v2n
+            v1n = v1n * keep2
+        elif self._fixed[obj2]:
+            v1n = -v1n
+            v2n = v2n * keep1
+        else:
+            m1 = self._mass[obj1, worlds]
+            m2 = self._mass[obj2, worlds]
+            m1_p_m2 = m1 + m2
+            v1n, v2n = (
+                (v1n * (m1 - m2) + 2 * m2 * v2n) / m1_p_m2,
+                (v2n * (m2 - m1) + 2 * m1 * v1n) / m1_p_m2,
+            )
+        vx[obj1, worlds] = nx * v1n + tx * v1t
+        vy[obj1, worlds] = ny * v1n + ty * v1t
+        vx[obj2, worlds] = nx * v2n + tx * v2t
+        vy[obj2, worlds] = ny * v2n + ty * v2t
+        self.collision_counts[worlds] += 1
+        if self.collision_handler is not None:
+            self.collision_handler(obj1, obj2, worlds, np.stack((px, py), axis=1), np.stack((nx, ny), axis=1))
+
+    def write_to(self, phys: Physics2D, index: int):
+        """把第index个世界的位置、速度与上一帧位置写入拓扑相同的phys中的物体，用于检查或显示单个世界"""
+        objs = phys._fixed_objects + phys._active_objects
+        if len(objs) != self.body_count or len(phys._fixed_objects) != self._fixed_count:
+            raise ValueError("phys does not have the same bodies")
+        pos = self._pos[:, :, index].T.tolist()
+        last_pos = self._last_pos[:, :, index].T.tolist()
+        velocity = self._velocity[:, :, index].T.tolist()
+        for obj, (x, y), (lx, ly), (vx, vy) in zip(objs, pos, last_pos, velocity):
+            obj.pos = Pos2D(x, y)
+            obj.last_pos = None if lx != lx else Pos2D(lx, ly)
+            obj.velocity = Vector2D(vx, vy)
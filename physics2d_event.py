@@ -0,0 +1,358 @@
+# physics2d的事件驱动引擎。
+# 对圆-圆、圆-直线求出精确的碰撞时刻(time of impact)，从一次碰撞直接跳到下一次碰撞，
+# 没有碰撞的时间段不做任何计算，也不会因速度太大而穿模。适合台球一类碰撞稀疏的场景。
+
+import math
+import heapq
+
+import micropython
+
+from physics2d import *
+
+@micropython.native
+def _poly_eval(coeffs: list, x: float) -> float:
+    """计算多项式的值。coeffs为从高次到低次的系数"""
+    y = 0.0
+    for c in coeffs:
+        y = y * x + c
+    return y
+
+def _poly_roots(coeffs: list, lo: float, hi: float) -> list:
+    """多项式在[lo, hi]内的全部实根(升序)。coeffs为从高次到低次的系数
+    以导数的根把区间分为若干单调段，在有变号的段内二分，因此不会漏掉根"""
+    start = 0
+    while start < len(coeffs) - 1 and coeffs[start] == 0.0:
+        start += 1
+    coeffs = coeffs[start:]
+    degree = len(coeffs) - 1
+    if degree <= 0:
+        return []
+    if degree == 1:
+        root = -coeffs[1] / coeffs[0]
+        return [root] if lo <= root <= hi else []
+    derivative = [coeffs[i] * (degree - i) for i in range(degree)]
+    points = [lo] + _poly_roots(derivative, lo, hi) + [hi]
+    roots = []
+    for k in range(len(points) - 1):
+        a = points[k]
+        b = points[k + 1]
+        fa = _poly_eval(coeffs, a)
+        fb = _poly_eval(coeffs, b)
+        if fa == 0.0:
+            if len(roots) == 0 or roots[-1] != a:
+                roots.append(a)
+            continue
+        if fb == 0.0:
+            if k == len(points) - 2:
+                roots.append(b)
+            continue
+        if (fa < 0.0) == (fb < 0.0):
+            continue
+        # 二分直到区间无法再缩小
+        while True:
+            m = (a + b) * 0.5
+            if m <= a or m >= b:
+                break
+            fm = _poly_eval(coeffs, m)
+            if (fm < 0.0) == (fa < 0.0):
+                a = m
+                fa = fm
+            else:
+                b = m
+        roots.append(b)
+    return roots
+
+def _first_contact(coeffs: list, horizon: float):
+    """coeffs(从高次到低次)描述的间隙函数在[0, horizon]内第一次由正变为非正的时刻，没有则返回None。
+    间隙函数：圆-圆为距离平方减半径和的平方，圆-直线为有向距离减半径"""
+    gap = coeffs[-1]
+    slope = coeffs[-2]
+    if gap <= 0.0:
+        # 已经接触：正在靠近则立即碰撞，否则认为正在分离
+        if slope < 0.0 or (slope == 0.0 and len(coeffs) > 2 and coeffs[-3] < 0.0):
+            return 0.0
+        return None
+    degree = len(coeffs) - 1
+    derivative = [coeffs[i] * (degree - i) for i in range(degree)]
+    for root in _poly_roots(coeffs, 0.0, horizon):
+        # 擦边(导数不为负)不算碰撞
+        if _poly_eval(derivative, root) < 0.0:
+            return root
+    return None
+
+class EventPhysics2D(Physics2D):
+    """事件驱动的Physics2D
+    每个物体在一次update内受恒定的力，按匀加速运动精确求出每对物体的碰撞时刻并放入优先队列，
+    依次跳到最早的碰撞处理；每个物体有碰撞计数，计数变化后队列中与它有关的旧预测自动作废。
+    碰撞仍由resolve_collision处理，collision_handler照常调用，同一个场景文件可直接用from_physics转换后运行。
+    支持Circle与Line(Line之间不碰撞)。停在fixed直线上的圆会沿直线滑动而不是无限次地弹跳；
+    停在其他物体上的持续接触无法处理，一次update中事件超过max_events时抛出RuntimeError。
+    不使用穿透校正、连续碰撞采样、粗检测、休眠、积分方法(integrator)等时间步进引擎的设置"""
+    def __init__(self):
+        super().__init__()
+        self._init_event_state()
+
+    def _init_event_state(self):
+        self.time = 0.0
+        """已模拟的总时间"""
+        self.rest_velocity = 1e-3
+        """与fixed直线碰撞后离开直线的速度低于该值，且受力指向直线时，认为圆停在直线上，此后沿直线滑动"""
+        self.max_events = 100000
+        """一次update中最多处理的碰撞数"""
+        self.last_events = 0
+        """上一次update处理的碰撞数"""
+        self._supports = {} # 停在直线上的圆 -> (直线, 指向圆的法向x, y)
+
+    @classmethod
+    def from_physics(cls, phys: Physics2D) -> 'EventPhysics2D':
+        """把phys原地转换为EventPhysics2D并返回它。物体与collision_handler等设置均保留"""
+        if isinstance(phys, EventPhysics2D):
+            return phys
+        phys.__class__ = cls
+        phys._init_event_state() # type: ignore
+        return phys # type: ignore
+
+    def remove(self, obj: PhysicalObject):
+        super().remove(obj)
+        self._supports.pop(obj, None)
+
+    def setFixed(self, obj: PhysicalObject, fixed: bool):
+        super().setFixed(obj, fixed)
+        self._supports.pop(obj, None)
+        for circle in [circle for circle, support in self._supports.items() if support[0] is obj]:
+            del self._supports[circle]
+
+    @micropython.native
+    def _raw_acceleration(self, obj: PhysicalObject) -> tuple[float, float]:
+        """与update_obj_move相同的加速度"""
+        if obj.fixed:
+            return (0.0, 0.0)
+        mass = obj.mass
+        return (
+            (self.global_force.x + obj.extra_force.x) / mass + (obj.extra_acceleration.x + self.global_acceleration.x),
+            (self.global_force.y + obj.extra_force.y) / mass + (obj.extra_acceleration.y + self.global_acceleration.y),
+        )
+
+    @micropython.native
+    def _support_acceleration(self, obj: PhysicalObject) -> tuple[float, float]:
+        """考虑所停靠直线后的加速度。受力离开直线时解除停靠"""
+        ax, ay = self._raw_acceleration(obj)
+        support = self._supports.get(obj)
+        if support is None:
+            return (ax, ay)
+        _, nx, ny = support
+        an = ax * nx + ay * ny
+        if an >= 0.0:
+            del self._supports[obj]
+            return (ax, ay)
+        return (ax - an * nx, ay - an * ny)
+
+    @micropython.native
+    def _state(self, obj: PhysicalObject, t: float) -> tuple[float, float, float, float]:
+        """物体在t时刻的(px, py, vx, vy)，不修改物体"""
+        s = t - self._t0[obj]
+        ax, ay = self._acc[obj]
+        pos = obj.pos
+        velocity = obj.velocity
+        return (
+            pos.x + velocity.x * s + 0.5 * ax * s * s,
+            pos.y + velocity.y * s + 0.5 * ay * s * s,
+            velocity.x + ax * s,
+            velocity.y + ay * s,
+        )
+
+    @micropython.native
+    def _advance_to(self, obj: PhysicalObject, t: float):
+        """把物体的pos、velocity推进到t时刻"""
+        if self._t0[obj] == t:
+            return
+        px, py, vx, vy = self._state(obj, t)
+        if self.inplace_update_enabled:
+            obj.pos = obj.pos.set(px, py)
+            obj.velocity = obj.velocity.set(vx, vy)
+        else:
+            obj.pos = Pos2D(px, py)
+            obj.velocity = Vector2D(vx, vy)
+        self._t0[obj] = t
+
+    @micropython.native
+    def _time_of_impact(self, obj1: PhysicalObject, obj2: PhysicalObject, now: float, horizon: float):
+        """obj1与obj2在now之后的碰撞时刻，horizon内没有碰撞返回None"""
+        if isinstance(obj1, Line):
+            obj1, obj2 = obj2, obj1
+        if not isinstance(obj1, Circle):
+            return None
+        p1x, p1y, v1x, v1y = self._state(obj1, now)
+        p2x, p2y, v2x, v2y = self._state(obj2, now)
+        a1x, a1y = self._acc[obj1]
+        a2x, a2y = self._acc[obj2]
+        # 相对运动 d(s) = c + b*s + a*s^2
+        cx = p2x - p1x
+        cy = p2y - p1y
+        bx = v2x - v1x
+        by = v2y - v1y
+        ax = 0.5 * (a2x - a1x)
+        ay = 0.5 * (a2y - a1y)
+        span = horizon - now
+        if isinstance(obj2, Circle):
+            radius_sum = obj1.radius + obj2.radius
+            # 快速排除：本次update内相对位移不足以接触
+            reach = math.sqrt(bx * bx + by * by) * span + math.sqrt(ax * ax + ay * ay) * span * span + radius_sum
+            if cx * cx + cy * cy > reach * reach:
+                return None
+            coeffs = [
+                ax * ax + ay * ay,
+                2.0 * (ax * bx + ay * by),
+                bx * bx + by * by + 2.0 * (ax * cx + ay * cy),
+                2.0 * (bx * cx + by * cy),
+                cx * cx + cy * cy - radius_sum * radius_sum,
+            ]
+        elif isinstance(obj2, Line):
+            if self._supports.get(obj1, (None,))[0] is obj2:
+                return None
+            # 直线法向，朝向圆所在的一侧
+            nx = -obj2.direction.y
+            ny = obj2.direction.x
+            if cx * nx + cy * ny > 0.0:
+                nx = -nx
+                ny = -ny
+            # 圆心到直线的有向距离减去半径
+            coeffs = [
+                -(ax * nx + ay * ny),
+                -(bx * nx + by * ny),
+                -(cx * nx + cy * ny) - obj1.radius,
+            ]
+            if coeffs[2] > abs(coeffs[1]) * span + abs(coeffs[0]) * span * span:
+                return None
+        else:
+            return None
+        s = _first_contact(coeffs, span)
+        if s is None:
+            return None
+        return now + s
+
+    def _predict(self, obj: PhysicalObject, now: float, horizon: float, queue: list):
+        """预测obj与其他所有物体的下一次碰撞并放入队列"""
+        order = self._order
+        counter = self._counter
+        for other in order:
+            if other is obj or (other.fixed and obj.fixed):
+                continue
+            if isinstance(other, Line) and isinstance(obj, Line):
+                continue
+            t = self._time_of_impact(obj, other, now, horizon)
+            if t is None:
+                continue
+            # 同一时刻按两两检查的顺序处理
+            if order[obj] < order[other]:
+                obj1, obj2 = obj, other
+            else:
+                obj1, obj2 = other, obj
+            self._sequence += 1
+            heapq.heappush(queue, (t, order[obj1], order[obj2], self._sequence, counter[obj1], counter[obj2], obj1, obj2))
+
+    def _collide(self, obj1: PhysicalObject, obj2: PhysicalObject):
+        """处理两物体在当前时刻的碰撞。两物体已推进到同一时刻"""
+        if isinstance(obj1, Circle) and isinstance(obj2, Circle):
+            # 与Circle.collision相同的碰撞点与法向
+            pos_d = obj2.pos - obj1.pos
+            normal = pos_d.normalize()
+            if obj1.fixed:
+                pos = obj1.pos + normal * obj1.radius
+            elif obj2.fixed:
+                pos = obj2.pos - normal * obj2.radius
+            else:
+                pos = obj1.pos + pos_d * (obj1.radius / (obj1.radius + obj2.radius))
+            self.resolve_collision(CollisionEvent(obj1, obj2, pos, normal))
+            self._check_support(obj1)
+            self._check_support(obj2)
+            return
+        # 与Line.collision相同：obj1为直线，法向由垂足指向圆心
+        line, circle = (obj1, obj2) if isinstance(obj1, Line) else (obj2, obj1)
+        d = line.direction # type: ignore
+        foot = line.pos + d * (d * (circle.pos - line.pos))
+        vec = circle.pos - foot
+        normal = d.rotate90() if vec.abs_square() == 0 else vec.normalize()
+        self.resolve_collision(CollisionEvent(line, circle, foot, normal))
+        self._check_support(circle)
+        if line.fixed and not circle.fixed:
+            self._settle(circle, line, normal)
+
+    def _settle(self, circle: PhysicalObject, line: PhysicalObject, normal: Vector2D):
+        """与fixed直线碰撞后，离开速度很小且受力指向直线的圆停在直线上"""
+        velocity = circle.velocity
+        vn = velocity.x * normal.x + velocity.y * normal.y
+        ax, ay = self._raw_acceleration(circle)
+        if vn >= self.rest_velocity or ax * normal.x + ay * normal.y >= 0.0:
+            return
+        circle.velocity = Vector2D(velocity.x - vn * normal.x, velocity.y - vn * normal.y)
+        self._supports[circle] = (line, normal.x, normal.y)
+        self._acc[circle] = self._support_acceleration(circle)
+
+    def _check_support(self, circle: PhysicalObject):
+        """停在直线上的圆与其他物体碰撞后：离开直线的速度足够大则解除停靠，否则去掉法向速度继续滑动"""
+        support = self._supports.get(circle)
+        if support is None:
+            return
+        _, nx, ny = support
+        velocity = circle.velocity
+        vn = velocity.x * nx + velocity.y * ny
+        if vn > self.rest_velocity or vn < 0.0:
+            # 向直线内运动时解除停靠，下一次预测会立即与直线碰撞
+            del self._supports[circle]
+            self._acc[circle] = self._raw_acceleration(circle)
+        elif vn != 0.0:
+            circle.velocity = Vector2D(velocity.x - vn * nx, velocity.y - vn * ny)
+
+    def update(self, dt: float):
+        """推进dt时间，期间的碰撞按发生的先后逐个处理"""
+        if self.update_callback is not None:
+            self.update_callback(dt)
+        objects = self._fixed_objects + self._active_objects
+        for obj in objects:
+            if not isinstance(obj, (Circle, Line)):
+                raise ValueError("EventPhysics2D only supports Circle and Line")
+        now = self.time
+        horizon = now + dt
+        self._order = {}
+        self._counter = {}
+        self._t0 = {}
+        self._acc = {}
+        self._sequence = 0
+        for index in range(len(objects)):
+            obj = objects[index]
+            self._order[obj] = index
+            self._counter[obj] = 0
+            self._t0[obj] = now
+            self._acc[obj] = self._support_acceleration(obj)
+        queue = []
+        for obj in self._active_objects:
+            self._predict(obj, now, horizon, queue)
+        events = 0
+        while len(queue) > 0:
+            t, _, _, _, count1, count2, obj1, obj2 = heapq.heappop(queue)
+            if count1 != self._counter[obj1] or count2 != self._counter[obj2]:
+                continue # 预测之后参与过其他碰撞，作废
+            events += 1
+            if events > self.max_events:
+                raise RuntimeError("Too many collision events in one update; bodies are probably in persistent contact")
+            self._advance_to(obj1, t)
+            self._advance_to(obj2, t)
+            self._collide(obj1, obj2)
+            # fixed物体的运动不会改变，与它有关的其他预测依然有效
+            if not obj1.fixed:
+                self._counter[obj1] += 1
+                self._predict(obj1, t, horizon, queue)
+            if not obj2.fixed:
+                self._counter[obj2] += 1
+                self._predict(obj2, t, horizon, queue)
+        for obj in self._active_objects:
+            self._advance_to(obj, horizon)
+        self.time = horizon
+        self.last_events = events
+        if self.batch_events_enabled:
+            self._deliver_events()
+        if self.history is not None:
+            self.history._step(self)
+        if self.post_update_callback is not None:
+            self.post_update_callback(dt)
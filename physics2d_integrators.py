@@ -0,0 +1,94 @@
+# physics2d的积分方法。
+# 与physics2d分开存放，只用默认的半隐式欧拉法(Physics2D.update_obj_move)的程序不必编译和加载这部分代码。
+# 用法: phys.integrator = Integrator("rk4", force_callback)
+
+import micropython
+
+from physics2d import *
+
+class Integrator:
+    """积分方法。赋给Physics2D.integrator后代替默认的update_obj_move，设回None恢复默认"""
+    METHODS = ("euler", "constant_acceleration", "verlet", "rk4")
+    def __init__(self, method: str = "constant_acceleration", force_callback=None):
+        if method not in Integrator.METHODS:
+            raise ValueError("Unknown integrator: {}".format(method))
+        self.method = method
+        """积分方法：
+        "euler": 半隐式欧拉法，先更新速度，再用新速度更新位置。与默认的update_obj_move相同，只是支持force_callback
+        "constant_acceleration": 认为步内加速度不变，x += v t + a t² / 2，即设计思路.md中的公式。恒力下没有截断误差
+        "verlet": 速度Verlet，步末按新位置再求一次加速度，能量长期不漂移，适合弹簧等随位置变化的力
+        "rk4": 四阶龙格-库塔，每步求4次加速度，适合洛伦兹力等随速度变化的力"""
+        self.force_callback = force_callback
+        """随状态变化的力，参数列表：物体, 位置, 速度，返回Vector2D，与extra_force相加。
+        积分时按需要在一步内多次调用(euler与constant_acceleration一次，verlet两次，rk4四次)，不应修改物体"""
+
+    @micropython.native
+    def _acceleration(self, phys: Physics2D, obj: PhysicalObject, x: float, y: float, vx: float, vy: float) -> tuple[float, float]:
+        """物体处于位置(x, y)、速度(vx, vy)时的加速度，包括force_callback的力"""
+        fx = phys.global_force.x + obj.extra_force.x
+        fy = phys.global_force.y + obj.extra_force.y
+        force_callback = self.force_callback
+        if force_callback is not None:
+            force = force_callback(obj, Pos2D(x, y), Vector2D(vx, vy))
+            fx += force.x
+            fy += force.y
+        mass = obj.mass
+        return (
+            fx / mass + (obj.extra_acceleration.x + phys.global_acceleration.x),
+            fy / mass + (obj.extra_acceleration.y + phys.global_acceleration.y),
+        )
+
+    @micropython.native
+    def update_obj_move(self, phys: Physics2D, obj: PhysicalObject, dt: float):
+        """按method积分单个物体，由Physics2D.update_obj_move调用"""
+        if obj.fixed:
+            return
+        method = self.method
+        pos = obj.pos
+        velocity = obj.velocity
+        x = pos.x
+        y = pos.y
+        vx = velocity.x
+        vy = velocity.y
+        ax, ay = self._acceleration(phys, obj, x, y, vx, vy)
+        if method == "euler":
+            vx += ax * dt
+            vy += ay * dt
+            x += vx * dt
+            y += vy * dt
+        elif method == "constant_acceleration" or method == "verlet":
+            half_dt_square = 0.5 * dt * dt
+            x += vx * dt + ax * half_dt_square
+            y += vy * dt + ay * half_dt_square
+            if method == "verlet":
+                # 新位置处的加速度。随速度变化的力按步末的预测速度计算
+                ax1, ay1 = self._acceleration(phys, obj, x, y, vx + ax * dt, vy + ay * dt)
+                half_dt = 0.5 * dt
+                vx += (ax + ax1) * half_dt
+                vy += (ay + ay1) * half_dt
+            else:
+                vx += ax * dt
+                vy += ay * dt
+        else: # rk4
+            half_dt = 0.5 * dt
+            # 各阶段的速度即位置的导数，加速度即速度的导数
+            vx2 = vx + ax * half_dt
+            vy2 = vy + ay * half_dt
+            ax2, ay2 = self._acceleration(phys, obj, x + vx * half_dt, y + vy * half_dt, vx2, vy2)
+            vx3 = vx + ax2 * half_dt
+            vy3 = vy + ay2 * half_dt
+            ax3, ay3 = self._acceleration(phys, obj, x + vx2 * half_dt, y + vy2 * half_dt, vx3, vy3)
+            vx4 = vx + ax3 * dt
+            vy4 = vy + ay3 * dt
+            ax4, ay4 = self._acceleration(phys, obj, x + vx3 * dt, y + vy3 * dt, vx4, vy4)
+            sixth_dt = dt / 6.0
+            x += (vx + 2.0 * (vx2 + vx3) + vx4) * sixth_dt
+            y += (vy + 2.0 * (vy2 + vy3) + vy4) * sixth_dt
+            vx += (ax + 2.0 * (ax2 + ax3) + ax4) * sixth_dt
+            vy += (ay + 2.0 * (ay2 + ay3) + ay4) * sixth_dt
+        if phys.inplace_update_enabled:
+            obj.velocity = velocity.set(vx, vy)
+            obj.pos = pos.set(x, y)
+        else:
+            obj.velocity = Vector2D(vx, vy)
+            obj.pos = Pos2D(x, y)
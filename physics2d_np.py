@@ -0,0 +1,473 @@
+# physics2d的NumPy后端，仅用于电脑端。
+# 所有物体的状态按结构数组(structure of arrays)连续存放，积分一步只需几次数组运算。
+
+import numpy as np
+
+from physics2d import *
+
+KIND_OTHER = 0
+KIND_CIRCLE = 1
+KIND_LINE = 2
+
+def _vector_property(array_name: str, vector_type: type, nullable: bool = False):
+    """生成读写数组中一行(x, y)的属性。nullable为True时，NaN表示None"""
+    def getter(self):
+        world = self._world
+        value = getattr(world, array_name)[world._row_index[self]]
+        x = float(value[0])
+        if nullable and x != x:
+            return None
+        return vector_type(x, float(value[1]))
+    def setter(self, vector):
+        world = self._world
+        value = getattr(world, array_name)[world._row_index[self]]
+        if vector is None:
+            value[0] = value[1] = np.nan
+        else:
+            value[0] = vector.x
+            value[1] = vector.y
+    return property(getter, setter)
+
+def _scalar_property(array_name: str, scalar_type: type):
+    """生成读写数组中一个元素的属性"""
+    def getter(self):
+        world = self._world
+        return scalar_type(getattr(world, array_name)[world._row_index[self]])
+    def setter(self, value):
+        world = self._world
+        getattr(world, array_name)[world._row_index[self]] = value
+    return property(getter, setter)
+
+_BODY_VIEW_PROPERTIES = {
+    "pos": _vector_property("_pos", Pos2D),
+    "last_pos": _vector_property("_last_pos", Pos2D, nullable=True),
+    "velocity": _vector_property("_velocity", Vector2D),
+    "extra_force": _vector_property("_extra_force", Vector2D),
+    "extra_acceleration": _vector_property("_extra_acceleration", Vector2D),
+    "mass": _scalar_property("_mass", float),
+    "fixed": _scalar_property("_fixed", bool),
+}
+
+def circle_candidate_pairs(pos: np.ndarray, radius: np.ndarray, rows: np.ndarray):
+    """在rows所指的圆中，找出包围盒相交的所有对(沿x轴排序后扫描)
+    返回行号数组(a, b)，两者等长"""
+    lower = pos[rows, 0] - radius[rows]
+    upper = pos[rows, 0] + radius[rows]
+    order = np.argsort(lower, kind="stable")
+    lower = lower[order]
+    upper = upper[order]
+    n = len(rows)
+    # 排序后第k个区间与其后[k + 1, end[k])范围内的区间在x轴上相交
+    end = np.searchsorted(lower, upper, side="right")
+    counts = np.maximum(end - np.arange(1, n + 1), 0)
+    first = np.repeat(np.arange(n), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    a = rows[order[first]]
+    b = rows[order[second]]
+    overlap = np.abs(pos[a, 1] - pos[b, 1]) <= radius[a] + radius[b]
+    return a[overlap], b[overlap]
+
+def circle_narrow_phase(pos: np.ndarray, radius: np.ndarray, fixed: np.ndarray, i: np.ndarray, j: np.ndarray):
+    """批量的圆-圆窄检测，与逐对调用Circle.collision(不含运动校正)的结果相同
+    i, j: 候选对的行号数组，i对应obj1
+    返回(hit, normal, penetration, contact)：
+    hit为发生碰撞的候选对下标；normal为指向j的单位法向量；penetration为穿透深度；contact为碰撞点"""
+    pos_d = pos[j] - pos[i]
+    radius_sum = radius[i] + radius[j]
+    dis_square = pos_d[:, 0] * pos_d[:, 0] + pos_d[:, 1] * pos_d[:, 1]
+    hit = np.flatnonzero(dis_square < radius_sum * radius_sum)
+    pos_d = pos_d[hit]
+    radius_sum = radius_sum[hit]
+    hit_i = i[hit]
+    hit_j = j[hit]
+    dis = np.sqrt(dis_square[hit])
+    # 与Vector2D.normalize相同：长度过小时取(1, 0)
+    degenerate = dis < DIV_EPLISON
+    normal = pos_d / np.where(degenerate, 1.0, dis)[:, None]
+    normal[degenerate] = (1.0, 0.0)
+    # 碰撞点：一方固定时取固定圆的圆周上与另一圆心连线的交点，否则取两圆心的加权中点
+    fixed_i = fixed[hit_i]
+    fixed_j = fixed[hit_j] & ~fixed_i
+    contact = pos[hit_i] + pos_d * (radius[hit_i] / radius_sum)[:, None]
+    contact[fixed_i] = pos[hit_i][fixed_i] + normal[fixed_i] * radius[hit_i][fixed_i, None]
+    contact[fixed_j] = pos[hit_j][fixed_j] - normal[fixed_j] * radius[hit_j][fixed_j, None]
+    return hit, normal, radius_sum - dis, contact
+
+def apply_circle_correction(pos: np.ndarray, radius: np.ndarray, fixed: np.ndarray, i: np.ndarray, j: np.ndarray,
+                            normal: np.ndarray, penetration: np.ndarray, contact: np.ndarray, extend: bool):
+    """批量运动校正，规则与Circle.collision相同
+    基本校正：一方固定时，把另一方移到恰好接触的位置；extend为True时，双方均不固定的按半径分配移动量。
+    同一物体参与多个碰撞时，各次校正的位移相加"""
+    fixed_i = fixed[i]
+    fixed_j = fixed[j] & ~fixed_i
+    free = ~(fixed_i | fixed_j)
+    # 需要移动的行与目标位置/位移
+    moved_rows = [j[fixed_i], i[fixed_j]]
+    targets = [
+        contact[fixed_i] + normal[fixed_i] * radius[j][fixed_i, None],
+        contact[fixed_j] - normal[fixed_j] * radius[i][fixed_j, None],
+    ]
+    delta_rows = []
+    deltas = []
+    if extend:
+        i = i[free]
+        j = j[free]
+        normal = normal[free]
+        penetration = penetration[free]
+        radius_sum = radius[i] + radius[j]
+        delta_rows = [i, j]
+        deltas = [
+            -normal * (penetration * (radius[j] / radius_sum))[:, None],
+            normal * (penetration * (radius[i] / radius_sum))[:, None],
+        ]
+    moved_rows = np.concatenate(moved_rows)
+    targets = np.concatenate(targets)
+    if len(delta_rows) > 0:
+        delta_rows = np.concatenate(delta_rows)
+        deltas = np.concatenate(deltas)
+    else:
+        delta_rows = np.zeros(0, dtype=np.int64)
+        deltas = np.zeros((0, 2))
+    # 只被校正一次的物体直接赋值，保证与逐对校正的结果完全相同；多次校正的位移相加
+    counts = np.bincount(np.concatenate((moved_rows, delta_rows)), minlength=len(pos))
+    single = counts[moved_rows] == 1
+    pos[moved_rows[single]] = targets[single]
+    np.add.at(pos, moved_rows[~single], targets[~single] - pos[moved_rows[~single]])
+    np.add.at(pos, delta_rows, deltas)
+
+def line_circle_hits(line_pos: np.ndarray, line_dir: np.ndarray, pos: np.ndarray, radius: np.ndarray, last_pos: np.ndarray | None = None):
+    """批量检测直线与圆，结果与逐对调用Line.collision是否返回碰撞完全相同
+    line_pos, line_dir: (L, 2)，直线上一点与已归一化的方向
+    pos: (N, 2)；radius: (N,)
+    last_pos: (N, 2)，为None表示不进行连续采样；其中为NaN的行(没有上一帧位置)同样不采样
+    返回(L, N)的布尔矩阵"""
+    px = line_pos[:, 0, None]
+    py = line_pos[:, 1, None]
+    dx = line_dir[:, 0, None]
+    dy = line_dir[:, 1, None]
+    cx = pos[None, :, 0]
+    cy = pos[None, :, 1]
+    # 离散检测：圆心到垂足的距离小于半径
+    t = dx * (cx - px) + dy * (cy - py)
+    vx = cx - (px + dx * t)
+    vy = cy - (py + dy * t)
+    hits = vx * vx + vy * vy < radius * radius
+    if last_pos is not None:
+        # 连续采样：上一帧到这一帧的圆心轨迹与直线相交
+        lx = last_pos[None, :, 0]
+        ly = last_pos[None, :, 1]
+        sx = cx - lx
+        sy = cy - ly
+        det = dx * sy - dy * sx
+        ex = lx - px
+        ey = ly - py
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = (ex * dy - ey * dx) / det
+        hits |= (np.abs(det) >= DIV_EPLISON) & (u >= 0) & (u <= 1)
+    return hits
+
+class ArrayPhysics2D(Physics2D):
+    """以NumPy结构数组存放物体状态的Physics2D
+    pos、velocity、last_pos、mass、radius、extra_force、extra_acceleration、fixed都保存在连续数组中，
+    update_move以几次向量化数组运算完成所有物体的积分，结果与Physics2D逐个积分完全相同。
+    物体仍是原来的Circle/Line对象，只是变为数组的视图，因此现有场景脚本无需修改。
+    可用from_physics把已搭建好的Physics2D原地转换为本后端
+    只有数组运算的路径快：update_move的向量化积分、vectorized_lines_enabled的直线检测与batched_narrow_phase_enabled。
+    逐个物体读pos、velocity等属性时每次都要查行号并从数组复制出一个新的向量，比Physics2D慢得多，
+    逐对的handle_collision、碰撞handler以及每帧遍历物体绘制的脚本都会因此变慢。
+    batched_narrow_phase_enabled默认关闭，打开后结果与Physics2D不再完全相同，见其说明"""
+    def __init__(self, capacity: int = 64):
+        super().__init__()
+        self._init_arrays(capacity)
+
+    def _init_arrays(self, capacity: int):
+        capacity = max(capacity, 1)
+        self.batched_narrow_phase_enabled = False
+        """批量处理圆-圆碰撞：候选对的查找、窄检测与运动校正均以数组运算一次完成，之后再逐个分配速度。
+        与Physics2D不等价：逐对处理时后面的对看到的是前面校正后的位置，这里同一步内各次校正基于相同的初始位置，
+        因此多个圆互相接触时结果与Physics2D不同，只适合不要求逐步复现的场景。不使用broad_phase。
+        打开休眠、扫掠检测或迭代求解(solver)时不生效"""
+        self.vectorized_lines_enabled = True
+        """固定直线与所有圆一次性向量化检测，只对真正碰撞的对调用Line.collision。结果与逐对检测完全相同。
+        在未设置broad_phase或打开批量窄检测时生效"""
+        self._count = 0
+        self._rows: list[PhysicalObject] = []
+        """按行排列的物体"""
+        self._row_index = {} # 物体 -> 行号
+        self._view_classes = {} # 原类 -> 本后端的视图类，见_view_class
+        self._pos = np.zeros((capacity, 2))
+        self._last_pos = np.full((capacity, 2), np.nan)
+        self._velocity = np.zeros((capacity, 2))
+        self._extra_force = np.zeros((capacity, 2))
+        self._extra_acceleration = np.zeros((capacity, 2))
+        self._mass = np.zeros(capacity)
+        self._radius = np.zeros(capacity)
+        self._fixed = np.zeros(capacity, dtype=bool)
+        self._kind = np.zeros(capacity, dtype=np.int8)
+        self._listed_active = np.zeros(capacity, dtype=bool)
+        """该行物体是否在_active_objects中"""
+
+    _ARRAY_NAMES = (
+        "_pos", "_last_pos", "_velocity", "_extra_force", "_extra_acceleration",
+        "_mass", "_radius", "_fixed", "_kind", "_listed_active",
+    )
+
+    @classmethod
+    def from_physics(cls, phys: Physics2D) -> 'ArrayPhysics2D':
+        """把phys原地转换为ArrayPhysics2D并返回它。设置与物体均保留，脚本中对phys的引用依然有效"""
+        if isinstance(phys, ArrayPhysics2D):
+            return phys
+        fixed_objects = phys._fixed_objects
+        active_objects = phys._active_objects
+        phys.__class__ = cls
+        phys._init_arrays(len(fixed_objects) + len(active_objects)) # type: ignore
+        for obj in fixed_objects:
+            phys._attach(obj, False) # type: ignore
+        for obj in active_objects:
+            phys._attach(obj, True) # type: ignore
+        return phys # type: ignore
+
+    def _grow(self, capacity: int):
+        for name in self._ARRAY_NAMES:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            if name == "_last_pos":
+                new[:] = np.nan
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _view_class(self, cls: type) -> type:
+        """物体状态的数组视图类
+        加入ArrayPhysics2D的物体，其类会被替换为原类的一个子类，pos、velocity等属性改为直接读写本后端数组中对应的行。
+        视图类的_world指向所属的后端，行号保存在后端的_row_index中，物体本身不需要额外的槽。
+        注意：读到的向量是数组的拷贝，每次读取都会新建一个向量，需要整体赋值(obj.pos = ...或obj.pos += ...)才会写回；
+        obj.pos.x = ...不会写回"""
+        view = self._view_classes.get(cls)
+        if view is None:
+            namespace = dict(_BODY_VIEW_PROPERTIES)
+            if issubclass(cls, Circle):
+                namespace["radius"] = _scalar_property("_radius", float)
+            namespace["__slots__"] = ()
+            namespace["_base_class"] = cls
+            namespace["_world"] = self
+            view = type(cls.__name__, (cls,), namespace)
+            self._view_classes[cls] = view
+        return view
+
+    def _attach(self, obj: PhysicalObject, listed_active: bool):
+        if getattr(obj, "_world", None) is not None:
+            raise ValueError("Object already belongs to an ArrayPhysics2D")
+        row = self._count
+        if row >= len(self._mass):
+            self._grow(2 * len(self._mass))
+        self._pos[row] = (obj.pos.x, obj.pos.y)
+        self._last_pos[row] = np.nan if obj.last_pos is None else (obj.last_pos.x, obj.last_pos.y)
+        self._velocity[row] = (obj.velocity.x, obj.velocity.y)
+        self._extra_force[row] = (obj.extra_force.x, obj.extra_force.y)
+        self._extra_acceleration[row] = (obj.extra_acceleration.x, obj.extra_acceleration.y)
+        self._mass[row] = obj.mass
+        self._fixed[row] = obj.fixed
+        if isinstance(obj, Circle):
+            self._radius[row] = obj.radius
+            self._kind[row] = KIND_CIRCLE
+        else:
+            self._radius[row] = 0.0
+            self._kind[row] = KIND_LINE if isinstance(obj, Line) else KIND_OTHER
+        self._listed_active[row] = listed_active
+        self._row_index[obj] = row
+        obj.__class__ = self._view_class(type(obj))
+        self._rows.append(obj)
+        self._count += 1
+
+    def _detach(self, obj: PhysicalObject):
+        row = self._row_index[obj]
+        # 把数组中的状态写回物体本身
+        state = {name: getattr(obj, name) for name in ("pos", "last_pos", "velocity", "extra_force", "extra_acceleration", "mass", "fixed")}
+        if isinstance(obj, Circle):
+            state["radius"] = obj.radius
+        obj.__class__ = type(obj)._base_class # type: ignore
+        for name, value in state.items():
+            setattr(obj, name, value)
+        del self._row_index[obj]
+        # 用最后一行填补空位
+        last = self._count - 1
+        if row != last:
+            for name in self._ARRAY_NAMES:
+                array = getattr(self, name)
+                array[row] = array[last]
+            moved = self._rows[last]
+            self._row_index[moved] = row
+            self._rows[row] = moved
+        self._rows.pop()
+        self._last_pos[last] = np.nan
+        self._count -= 1
+
+    def row_of(self, obj: PhysicalObject) -> int:
+        """返回物体在状态数组中的行号"""
+        return self._row_index[obj]
+
+    def update_move(self, dt: float):
+        """仅更新移动，不考虑碰撞。与Physics2D.update_move逐个调用update_obj_move的结果相同"""
+        integrator = self.integrator
+        method = "euler" if integrator is None else integrator.method
+        if (self.sleep_enabled or (integrator is not None and integrator.force_callback is not None)
+                or method not in ("euler", "constant_acceleration", "verlet")):
+            # 休眠需要逐个物体判断，force_callback与rk4需要逐个物体求加速度，使用逐个物体的实现
+            super().update_move(dt)
+            return
+        n = self._count
+        rows = np.flatnonzero(self._listed_active[:n])
+        if len(rows) == 0:
+            return
+        if self.continuous_collision_sampling_enabled or self.swept_collision_enabled:
+            # 记录上一帧位置
+            self._last_pos[rows] = self._pos[rows]
+        rows = rows[~self._fixed[rows]]
+        force = np.array((self.global_force.x, self.global_force.y)) + self._extra_force[rows]
+        acceleration = force / self._mass[rows, None] + (self._extra_acceleration[rows] + np.array((self.global_acceleration.x, self.global_acceleration.y)))
+        if method == "euler":
+            velocity = self._velocity[rows] + acceleration * dt
+            self._velocity[rows] = velocity
+            self._pos[rows] += velocity * dt
+            return
+        # 没有force_callback时加速度在步内不变，verlet的步末加速度与步初相同
+        half_dt_square = 0.5 * dt * dt
+        self._pos[rows] += self._velocity[rows] * dt + acceleration * half_dt_square
+        if method == "verlet":
+            self._velocity[rows] += (acceleration + acceleration) * (0.5 * dt)
+        else:
+            self._velocity[rows] += acceleration * dt
+
+    def append(self, obj: PhysicalObject):
+        super().append(obj)
+        self._attach(obj, not obj.fixed)
+    def remove(self, obj: PhysicalObject):
+        super().remove(obj)
+        self._detach(obj)
+    def setFixed(self, obj: PhysicalObject, fixed: bool):
+        super().setFixed(obj, fixed)
+        self._listed_active[self._row_index[obj]] = not fixed
+
+    def update_collision(self):
+        """更新碰撞"""
+        if (not self.batched_narrow_phase_enabled or self.sleep_enabled or self.swept_collision_enabled
+                or self.solver is not None):
+            super().update_collision()
+            return
+        if self.pair_cache_enabled:
+            self._advance_odometers()
+        handle_collision = self.handle_collision
+        fixed_objects = self._fixed_objects
+        active_objects = self._active_objects
+        nf = len(fixed_objects)
+        na = len(active_objects)
+        # 1. 涉及非圆物体的对，按两两检查的顺序逐对处理
+        self._collide_fixed_active(skip_circles=True)
+        others = [k for k in range(na) if not isinstance(active_objects[k], Circle)]
+        if len(others) > 0:
+            pairs = set()
+            for k in others:
+                for fi in range(nf):
+                    if isinstance(fixed_objects[fi], Circle):
+                        pairs.add((-1, fi, k))
+                for other in range(na):
+                    if other != k:
+                        pairs.add((0, min(k, other), max(k, other)))
+            for group, a, b in sorted(pairs):
+                if group < 0:
+                    handle_collision(fixed_objects[a], active_objects[b])
+                else:
+                    handle_collision(active_objects[a], active_objects[b])
+
+        # 2. 圆-圆对批量处理
+        n = self._count
+        # 行号 -> 在所属列表中的下标
+        list_index = np.zeros(n, dtype=np.int64)
+        listed = np.zeros(n, dtype=bool)
+        row_index = self._row_index
+        for index in range(nf):
+            list_index[row_index[fixed_objects[index]]] = index
+            listed[row_index[fixed_objects[index]]] = True
+        for index in range(na):
+            list_index[row_index[active_objects[index]]] = index
+            listed[row_index[active_objects[index]]] = True
+        listed_active = self._listed_active[:n]
+        rows = np.flatnonzero(listed & (self._kind[:n] == KIND_CIRCLE))
+        a, b = circle_candidate_pairs(self._pos, self._radius, rows)
+        active_a = listed_active[a]
+        active_b = listed_active[b]
+        keep = active_a | active_b
+        a, b, active_a, active_b = a[keep], b[keep], active_a[keep], active_b[keep]
+        # 排成两两检查的顺序：fixed一方、下标小的一方作为obj1
+        swap = ~active_b | (active_a & (list_index[b] < list_index[a]))
+        i = np.where(swap, b, a)
+        j = np.where(swap, a, b)
+        both_active = listed_active[i]
+        keys = np.where(both_active, nf * na + list_index[i] * na + list_index[j], list_index[i] * na + list_index[j])
+        order = np.argsort(keys, kind="stable")
+        i = i[order]
+        j = j[order]
+
+        hit, normal, penetration, contact = circle_narrow_phase(self._pos, self._radius, self._fixed, i, j)
+        i = i[hit]
+        j = j[hit]
+        if self.basic_correction_enabled:
+            apply_circle_correction(self._pos, self._radius, self._fixed, i, j, normal, penetration, contact, self.extend_correction_enabled)
+        rows_list = self._rows
+        resolve_collision = self.resolve_collision
+        for k in range(len(i)):
+            resolve_collision(CollisionEvent(
+                rows_list[i[k]],
+                rows_list[j[k]],
+                Pos2D(float(contact[k, 0]), float(contact[k, 1])),
+                Vector2D(float(normal[k, 0]), float(normal[k, 1])),
+            ))
+        if self.pair_cache_enabled and len(self._pair_cache) >= self.pair_cache_limit:
+            self._prune_pair_cache()
+
+    def _collide_fixed_active(self, skip_circles: bool = False):
+        """两两检查fixed-active碰撞，固定直线走向量化检测
+        skip_circles: 跳过固定圆(由批量窄检测处理)"""
+        fixed_objects = self._fixed_objects
+        active_objects = self._active_objects
+        lines = [obj for obj in fixed_objects if isinstance(obj, Line)]
+        if not self.vectorized_lines_enabled or len(lines) == 0:
+            if not skip_circles:
+                super()._collide_fixed_active()
+                return
+            lines = []
+        handle_collision = self.handle_collision
+        na = len(active_objects)
+        row_index = self._row_index
+        rows = np.array([row_index[obj] for obj in active_objects], dtype=np.int64)
+        pos = self._pos
+        if len(lines) > 0:
+            line_rows = [row_index[obj] for obj in lines]
+            last_pos = self._last_pos[rows] if self.continuous_collision_sampling_enabled else None
+            hits = line_circle_hits(
+                pos[line_rows],
+                np.array([(obj.direction.x, obj.direction.y) for obj in lines]), # type: ignore
+                pos[rows],
+                self._radius[rows],
+                last_pos,
+            )
+            # 非圆物体总是逐对检测
+            hits[:, self._kind[rows] != KIND_CIRCLE] = True
+        # 被前面的碰撞校正移动过的物体，矩阵中的结果已过期，需逐对检测
+        moved = np.zeros(na, dtype=bool)
+        line_index = 0
+        for obj1 in fixed_objects:
+            if isinstance(obj1, Line) and len(lines) > 0:
+                candidates = np.flatnonzero(hits[line_index] | moved)
+                line_index += 1
+            elif isinstance(obj1, Circle) and skip_circles:
+                continue
+            else:
+                candidates = range(na)
+            for ai in candidates:
+                row = rows[ai]
+                x = pos[row, 0]
+                y = pos[row, 1]
+                handle_collision(obj1, active_objects[ai])
+                if pos[row, 0] != x or pos[row, 1] != y:
+                    moved[ai] = True
@@ -0,0 +1,446 @@
+# physics2d的多进程碰撞求解，仅用于电脑端。
+# 每步把会互相接触的物体划分为互不相干的接触岛(contact island)，各岛分给进程池并行求解，状态通过共享内存交换。
+# 主进程按列批量打包物体，并用NumPy数组运算划分接触岛，重新求解时只恢复需要重新求解的行。
+
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from physics2d import *
+from physics2d_broadphase import *
+from physics2d_broadphase import _aabb_union
+
+KIND_CIRCLE = 0.0
+KIND_LINE = 1.0
+
+# 共享内存中每个物体一行：kind, pos, last_pos(NaN表示None), velocity, mass, radius或direction, collision_energy_loss, sleeping
+# 碰撞求解不会改变休眠计数(Physics2D._sleep_counts)，不需要传给工作进程
+_ROW = struct.Struct("12d")
+_NAN = float("nan")
+
+# 工作进程中已打开的共享内存
+_worker_memory: dict[str, shared_memory.SharedMemory] = {}
+
+def _open_memory(name: str) -> shared_memory.SharedMemory:
+    memory = _worker_memory.get(name)
+    if memory is None:
+        # 主进程换了一块更大的共享内存，旧的不再使用
+        for old in _worker_memory.values():
+            old.close()
+        _worker_memory.clear()
+        memory = shared_memory.SharedMemory(name=name)
+        _worker_memory[name] = memory
+    return memory
+
+def _body_row(obj: PhysicalObject) -> tuple:
+    """物体在共享内存中的一行"""
+    last_pos = obj.last_pos
+    if isinstance(obj, Circle):
+        kind, a, b = KIND_CIRCLE, obj.radius, 0.0
+    else:
+        kind, a, b = KIND_LINE, obj.direction.x, obj.direction.y # type: ignore
+    return (kind, obj.pos.x, obj.pos.y,
+        _NAN if last_pos is None else last_pos.x, _NAN if last_pos is None else last_pos.y,
+        obj.velocity.x, obj.velocity.y, obj.mass, a, b, obj.collision_energy_loss,
+        1.0 if obj.sleeping else 0.0)
+
+def _pack_body(buf, row: int, obj: PhysicalObject):
+    _ROW.pack_into(buf, row * _ROW.size, *_body_row(obj))
+
+def _pack_circles(rows: np.ndarray, objs: list):
+    """按列把一组圆写入共享内存的连续若干行，与逐个_pack_body相同"""
+    rows[:, 0] = KIND_CIRCLE
+    rows[:, 1] = [obj.pos.x for obj in objs]
+    rows[:, 2] = [obj.pos.y for obj in objs]
+    last_pos = [obj.last_pos for obj in objs]
+    rows[:, 3] = [_NAN if p is None else p.x for p in last_pos]
+    rows[:, 4] = [_NAN if p is None else p.y for p in last_pos]
+    rows[:, 5] = [obj.velocity.x for obj in objs]
+    rows[:, 6] = [obj.velocity.y for obj in objs]
+    rows[:, 7] = [obj.mass for obj in objs]
+    rows[:, 8] = [obj.radius for obj in objs]
+    rows[:, 9] = 0.0
+    rows[:, 10] = [obj.collision_energy_loss for obj in objs]
+    rows[:, 11] = [obj.sleeping for obj in objs]
+
+def _unpack_body(buf, row: int, fixed: bool, row_index: dict) -> PhysicalObject:
+    """从共享内存的一行重建物体，并在row_index中记下它的行号"""
+    kind, px, py, lx, ly, vx, vy, mass, a, b, loss, sleeping = _ROW.unpack_from(buf, row * _ROW.size)
+    if kind == KIND_CIRCLE:
+        obj = Circle(Pos2D(px, py), a, mass, fixed)
+    else:
+        obj = Line(Pos2D(px, py), Vector2D(a, b), mass, fixed)
+        obj.direction = Vector2D(a, b) # 已经归一化，避免再次归一化带来的误差
+    if lx == lx:
+        obj.last_pos = Pos2D(lx, ly)
+    obj.velocity = Vector2D(vx, vy)
+    obj.collision_energy_loss = loss
+    obj.sleeping = sleeping != 0.0
+    row_index[obj] = row
+    return obj
+
+class _IslandPhysics(Physics2D):
+    """工作进程中求解一个接触岛的Physics2D。记录碰撞事件和物体在本步中经过的包围盒"""
+    def __init__(self, settings: tuple, nf: int, na: int, row_index: dict):
+        super().__init__()
+        (self.basic_correction_enabled, self.extend_correction_enabled, self.continuous_collision_sampling_enabled,
+         self.swept_collision_enabled, self.sleep_enabled, self.sleep_velocity_threshold) = settings
+        self.collision_handler = self._record
+        self.nf = nf
+        self.na = na
+        self.row_index = row_index # 物体 -> 共享内存中的行号
+        self.events = []
+        self.swept = {}
+
+    def handle_collision(self, obj1: PhysicalObject, obj2: PhysicalObject):
+        x1, y1 = obj1.pos.x, obj1.pos.y
+        x2, y2 = obj2.pos.x, obj2.pos.y
+        super().handle_collision(obj1, obj2)
+        if obj1.pos.x != x1 or obj1.pos.y != y1:
+            self._sweep(obj1)
+        if obj2.pos.x != x2 or obj2.pos.y != y2:
+            self._sweep(obj2)
+
+    def _sweep(self, obj: PhysicalObject):
+        box = aabb_of(obj, self.swept_collision_enabled)
+        row = self.row_index[obj]
+        old = self.swept.get(row)
+        self.swept[row] = box if old is None else _aabb_union(old, box) # type: ignore
+
+    def _record(self, event: CollisionEvent):
+        row1 = self.row_index[event.obj1]
+        row2 = self.row_index[event.obj2]
+        nf = self.nf
+        na = self.na
+        # 与两两检查相同的对象对编号
+        if row1 < nf:
+            key = row1 * na + row2 - nf
+        elif row2 < nf:
+            key = row2 * na + row1 - nf
+        else:
+            i, j = (row1, row2) if row1 < row2 else (row2, row1)
+            key = nf * na + (i - nf) * na + (j - nf)
+        self.events.append((key, row1, row2, event.pos.x, event.pos.y, event.normal.x, event.normal.y,
+            event.obj1_last_velocity.x, event.obj1_last_velocity.y, event.obj2_last_velocity.x, event.obj2_last_velocity.y))
+
+def _solve_islands(memory_name: str, nf: int, na: int, settings: tuple, broad_phase, islands: list):
+    """工作进程入口：依次求解若干岛，把结果写回共享内存。返回[(岛下标, 事件, 经过的包围盒), ...]"""
+    buf = _open_memory(memory_name).buf
+    row_index = {}
+    fixed_objects = [_unpack_body(buf, row, True, row_index) for row in range(nf)]
+    results = []
+    for island_index, rows in islands:
+        phys = _IslandPhysics(settings, nf, na, row_index)
+        # 岛内物体保持原来的相对顺序，碰撞处理顺序与整体两两检查一致
+        phys._fixed_objects = fixed_objects
+        phys._active_objects = [_unpack_body(buf, row, False, row_index) for row in rows]
+        if broad_phase is not None and len(rows) >= 8:
+            phys.broad_phase = broad_phase()
+        phys.update_collision()
+        for obj in phys._active_objects:
+            _pack_body(buf, row_index[obj], obj)
+        results.append((island_index, phys.events, phys.swept))
+    return results
+
+def _circle_boxes(rows: np.ndarray, swept: bool) -> np.ndarray:
+    """一组圆的包围盒，每行(min_x, min_y, max_x, max_y)，与逐个aabb_of相同"""
+    x = rows[:, 1]
+    y = rows[:, 2]
+    r = rows[:, 8]
+    if not swept:
+        return np.stack((x - r, y - r, x + r, y + r), axis=1)
+    # NaN表示没有last_pos，此时只用当前位置
+    last_x = np.where(np.isnan(rows[:, 3]), x, rows[:, 3])
+    last_y = np.where(np.isnan(rows[:, 4]), y, rows[:, 4])
+    return np.stack((np.minimum(x, last_x) - r, np.minimum(y, last_y) - r,
+                     np.maximum(x, last_x) + r, np.maximum(y, last_y) + r), axis=1)
+
+def _overlapping_pairs(boxes: np.ndarray):
+    """包围盒相交(含恰好接触)的所有对(沿x轴排序后扫描)，返回下标数组(a, b)"""
+    n = len(boxes)
+    order = np.argsort(boxes[:, 0], kind="stable")
+    lower = boxes[order, 0]
+    # 排序后第k个盒与其后[k + 1, end[k])范围内的盒在x轴上相交
+    end = np.searchsorted(lower, boxes[order, 2], side="right")
+    counts = np.maximum(end - np.arange(1, n + 1), 0)
+    first = np.repeat(np.arange(n), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    a = order[first]
+    b = order[second]
+    overlap = (boxes[a, 1] <= boxes[b, 3]) & (boxes[b, 1] <= boxes[a, 3])
+    return a[overlap], b[overlap]
+
+def _pairs_with(boxes: np.ndarray, rows: np.ndarray):
+    """与rows所指的盒相交的所有对，返回下标数组(a, b)，a属于rows。rows远少于盒数时比_overlapping_pairs快"""
+    order = np.argsort(boxes[:, 0], kind="stable")
+    lower = boxes[order, 0]
+    # 与盒k在x轴上相交的盒，左端在[k的左端 - 最大宽度, k的右端]内。取两倍宽度，留出舍入误差的余量
+    width = float((boxes[:, 2] - boxes[:, 0]).max())
+    begin = np.searchsorted(lower, boxes[rows, 0] - 2.0 * width, side="left")
+    end = np.searchsorted(lower, boxes[rows, 2], side="right")
+    counts = end - begin
+    a = np.repeat(rows, counts)
+    b = order[np.repeat(begin, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+    overlap = ((a != b) & (boxes[a, 0] <= boxes[b, 2]) & (boxes[b, 0] <= boxes[a, 2])
+               & (boxes[a, 1] <= boxes[b, 3]) & (boxes[b, 1] <= boxes[a, 3]))
+    return a[overlap], b[overlap]
+
+def _components(root: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """在已有的划分root上连接各对(a, b)，返回新的划分。
+    root[i]为i所在集合中最小的下标，输入与输出都满足这一点"""
+    root = root.copy()
+    while True:
+        root_a = root[a]
+        root_b = root[b]
+        different = root_a != root_b
+        if not different.any():
+            return root
+        # 较大的根挂到较小的根下，root[i] <= i始终成立，不会成环
+        np.minimum.at(root, np.maximum(root_a, root_b)[different], np.minimum(root_a, root_b)[different])
+        # 路径压缩，直到每个元素都直接指向根
+        while True:
+            grand = root[root]
+            if (grand == root).all():
+                break
+            root = grand
+
+def _islands(root: np.ndarray, nf: int) -> list:
+    """按划分分组，返回[(根, 共享内存中的行号列表), ...]，岛内行号从小到大"""
+    order = np.argsort(root, kind="stable")
+    sorted_root = root[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_root[1:] != sorted_root[:-1])))
+    rows = (order + nf).tolist()
+    bounds = starts.tolist() + [len(root)]
+    roots = sorted_root[starts].tolist()
+    return [(roots[k], rows[bounds[k]:bounds[k + 1]]) for k in range(len(roots))]
+
+class ParallelPhysics2D(Physics2D):
+    """用进程池并行求解碰撞的Physics2D
+    每步先按包围盒把active的圆划分为接触岛(连通分量)，互不接触的岛分给多个进程同时求解，岛内仍按两两检查的顺序处理。
+    若穿透校正让不同岛的物体相遇，会合并这些岛并重新求解，因此结果与Physics2D完全相同。
+    碰撞handler在主进程中、所有岛求解完之后按两两检查的顺序调用；handler对物体的修改从下一步开始生效。
+    仅支持Circle和fixed的Line，其他情况、迭代求解(solver)以及物体较少时自动退回单线程。用完后应调用close()
+    岛内的粗检测由island_broad_phase决定。broad_phase和pair_cache_enabled的状态要跨步保存在主进程中，
+    设置了broad_phase或打开pair_cache_enabled时同样退回单线程，按它们的设置处理"""
+    def __init__(self, workers: int | None = None):
+        super().__init__()
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        """进程数"""
+        self.parallel_min_bodies = 256
+        """active物体少于该数目时不使用进程池"""
+        self.island_broad_phase = SpatialHashBroadPhase
+        """岛内使用的粗检测，需为可pickle的无参可调用对象(如粗检测类)。None表示岛内两两检查。
+        与broad_phase无关：设置broad_phase会让本类退回单线程"""
+        self.last_islands = 0
+        """上一步的岛数，0表示上一步未使用进程池"""
+        self.last_island_merges = 0
+        """上一步因校正而重新求解的次数"""
+        self._pool: ProcessPoolExecutor | None = None
+        self._memory: shared_memory.SharedMemory | None = None
+        self._state: np.ndarray | None = None # 共享内存上的(行数, 12)数组
+        self._packed_fixed: list = [] # 共享内存中fixed物体各行的内容，没有变化的行不再重写
+
+    def close(self):
+        """关闭进程池并释放共享内存"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._memory is not None:
+            self._state = None # 先释放数组对共享内存的引用
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _parallel_supported(self) -> bool:
+        if (self.workers < 2 or len(self._active_objects) < self.parallel_min_bodies or self.solver is not None
+                or self.broad_phase is not None or self.pair_cache_enabled):
+            return False
+        for obj in self._active_objects:
+            if type(obj) is not Circle:
+                return False
+        for obj in self._fixed_objects:
+            if type(obj) is not Circle and type(obj) is not Line:
+                return False
+        return True
+
+    def _ensure_memory(self, rows: int) -> np.ndarray:
+        size = rows * _ROW.size
+        if self._memory is None or self._memory.size < size:
+            if self._memory is not None:
+                self._state = None
+                self._memory.close()
+                self._memory.unlink()
+            self._memory = shared_memory.SharedMemory(create=True, size=max(size, 64 * _ROW.size) * 2)
+            self._state = np.ndarray((self._memory.size // _ROW.size, _ROW.size // 8), dtype=np.float64, buffer=self._memory.buf)
+            self._packed_fixed = []
+        return self._state # type: ignore
+
+    def _pack_fixed(self, buf):
+        """只重写内容有变化的fixed物体行"""
+        packed = self._packed_fixed
+        fixed_objects = self._fixed_objects
+        del packed[len(fixed_objects):]
+        for row in range(len(fixed_objects)):
+            values = _body_row(fixed_objects[row])
+            if row == len(packed):
+                packed.append(None)
+            elif packed[row] == values:
+                continue
+            _ROW.pack_into(buf, row * _ROW.size, *values)
+            packed[row] = values
+
+    def update_collision(self):
+        """更新碰撞"""
+        if not self._parallel_supported():
+            self.last_islands = 0
+            self.last_island_merges = 0
+            super().update_collision()
+            return
+        active_objects = self._active_objects
+        nf = len(self._fixed_objects)
+        na = len(active_objects)
+        state = self._ensure_memory(nf + na)
+        self._pack_fixed(self._memory.buf) # type: ignore
+        active_rows = state[nf:nf + na]
+        _pack_circles(active_rows, active_objects)
+        initial = active_rows.copy() # 重新求解时用于恢复
+
+        # 划分接触岛
+        boxes = _circle_boxes(active_rows, self.swept_collision_enabled)
+        root = _components(np.arange(na), *_overlapping_pairs(boxes))
+        results = {}
+        merges = 0
+        while True:
+            pending = [(island_root, rows) for island_root, rows in _islands(root, nf) if island_root not in results]
+            if merges > 0:
+                # 只恢复需要重新求解的岛
+                resolve = np.isin(root, [island_root for island_root, _ in pending])
+                active_rows[resolve] = initial[resolve]
+            for island_results in self._run(pending, nf, na):
+                for island_root, events, swept in island_results:
+                    results[island_root] = (events, swept)
+            # 检查不同岛的物体在本步中经过的包围盒是否相交
+            moved = []
+            moved_boxes = []
+            for events, swept in results.values():
+                for row, box in swept.items():
+                    moved.append(row - nf)
+                    moved_boxes.append(box)
+            if len(moved) == 0:
+                break
+            # 只有被移动过的物体的包围盒变大了，新的相交必然涉及它们
+            moved = np.array(moved)
+            moved_boxes = np.array(moved_boxes)
+            swept_boxes = boxes.copy()
+            swept_boxes[moved, :2] = np.minimum(boxes[moved, :2], moved_boxes[:, :2])
+            swept_boxes[moved, 2:] = np.maximum(boxes[moved, 2:], moved_boxes[:, 2:])
+            merged = _components(root, *_pairs_with(swept_boxes, moved))
+            changed = merged != root
+            if not changed.any():
+                break
+            # 合并后的岛需要重新求解
+            merges += 1
+            for island_root in set(root[changed].tolist()) | set(merged[changed].tolist()):
+                results.pop(island_root, None)
+            root = merged
+        self.last_islands = len(results)
+        self.last_island_merges = merges
+        self._apply(results, nf, na)
+
+    def _run(self, pending: list, nf: int, na: int) -> list:
+        """把待求解的岛按大小均分给各进程，返回各进程的结果"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        task_count = min(self.workers * 2, len(pending))
+        tasks = [[] for _ in range(task_count)]
+        loads = [0] * task_count
+        for root, rows in sorted(pending, key=lambda item: -len(item[1])):
+            index = loads.index(min(loads))
+            tasks[index].append((root, rows))
+            loads[index] += len(rows)
+        settings = (self.basic_correction_enabled, self.extend_correction_enabled, self.continuous_collision_sampling_enabled,
+                    self.swept_collision_enabled, self.sleep_enabled, self.sleep_velocity_threshold)
+        futures = [self._pool.submit(_solve_islands, self._memory.name, nf, na, settings, self.island_broad_phase, task) # type: ignore
+                   for task in tasks]
+        return [future.result() for future in futures]
+
+    def _apply(self, results: dict, nf: int, na: int):
+        """把各岛的结果写回物体，并按两两检查的顺序调用handler"""
+        fixed_objects = self._fixed_objects
+        active_objects = self._active_objects
+        state = self._state
+        events = []
+        for island_events, swept in results.values():
+            events.extend(island_events)
+        events.sort()
+        changed = set()
+        for island_events, swept in results.values():
+            changed.update(swept)
+        for event in events:
+            changed.add(event[1])
+            changed.add(event[2])
+        rows = [row for row in changed if row >= nf]
+        inplace = self.inplace_update_enabled
+        for row, values in zip(rows, state[rows].tolist()): # type: ignore
+            obj = active_objects[row - nf]
+            _, px, py, _, _, vx, vy, _, _, _, _, sleeping = values
+            if inplace:
+                obj.pos = obj.pos.set(px, py)
+                obj.velocity = obj.velocity.set(vx, vy)
+            else:
+                obj.pos = Pos2D(px, py)
+                obj.velocity = Vector2D(vx, vy)
+            obj.sleeping = sleeping != 0.0
+
+        for key, row1, row2, px, py, nx, ny, v1x, v1y, v2x, v2y in events:
+            obj1 = fixed_objects[row1] if row1 < nf else active_objects[row1 - nf]
+            obj2 = fixed_objects[row2] if row2 < nf else active_objects[row2 - nf]
+            # fixed物体的速度在各岛中互不相干地变化，这里按顺序重新计算
+            last_velocity1 = None
+            last_velocity2 = None
+            if obj1.fixed:
+                last_velocity1 = Vector2D(obj1.velocity.x, obj1.velocity.y) if inplace else obj1.velocity
+                self._resolve_fixed(obj1, obj2, nx, ny)
+            elif obj2.fixed:
+                last_velocity2 = Vector2D(obj2.velocity.x, obj2.velocity.y) if inplace else obj2.velocity
+                self._resolve_fixed(obj2, obj1, nx, ny)
+            if (self.collision_handler is None and obj1.collision_handler is None and obj2.collision_handler is None
+                    and (not self.batch_events_enabled or self.collision_batch_handler is None)):
+                continue
+            # 只在需要投递时创建事件对象
+            collision_point = CollisionEvent(obj1, obj2, Pos2D(px, py), Vector2D(nx, ny))
+            collision_point.obj1_last_velocity = last_velocity1 if last_velocity1 is not None else Vector2D(v1x, v1y)
+            collision_point.obj2_last_velocity = last_velocity2 if last_velocity2 is not None else Vector2D(v2x, v2y)
+            if self.batch_events_enabled:
+                # 由update结束时统一投递
+                self._batch.append(collision_point)
+                continue
+            if self.collision_handler is not None:
+                self.collision_handler(collision_point)
+            if obj1.collision_handler is not None:
+                obj1.collision_handler(collision_point)
+            if obj2.collision_handler is not None:
+                obj2.collision_handler(collision_point)
+
+    def _resolve_fixed(self, obj: PhysicalObject, other: PhysicalObject, nx: float, ny: float):
+        """与resolve_collision中fixed一方的速度计算相同"""
+        velocity = obj.velocity
+        tx = -ny
+        ty = nx
+        vn = velocity.x * nx + velocity.y * ny
+        vt = velocity.x * tx + velocity.y * ty
+        vn *= 1.0 - obj.collision_energy_loss
+        vn *= 1.0 - other.collision_energy_loss
+        if self.inplace_update_enabled:
+            obj.velocity = velocity.set(nx * vn + tx * vt, ny * vn + ty * vt)
+        else:
+            obj.velocity = Vector2D(nx * vn + tx * vt, ny * vn + ty * vt)
@@ -0,0 +1,268 @@
+# physics2d的轨迹记录，仅用于电脑端。
+# 每步把所有物体的位置与速度追加到内存映射(mmap)的二进制文件中，文件按块预分配、按需增长，并定期刷新到磁盘，
+# 模拟过程中不在内存里保留历史。读取时直接以NumPy数组映射文件，不复制数据。
+#
+# 文件格式(小端)：
+#   文件头 64字节: magic(8s) 版本(I) 每个数的字节数(I, 4或8) 物体数(I) 帧数据起始偏移(I) 帧数(Q)
+#   物体表 每个物体64字节: 类型(B, 0其他 1圆 2直线) fixed(B) 填充(6x) mass(d) radius(d) direction(2d) 名字(24s, UTF-8)
+#   帧 每帧: 时间(d) 各物体的(x, y, vx, vy)(float32或float64)
+
+import mmap
+import struct
+
+import numpy as np
+
+from physics2d import *
+
+MAGIC = b"P2DTRAJ\0"
+VERSION = 1
+KIND_OTHER = 0
+KIND_CIRCLE = 1
+KIND_LINE = 2
+
+_HEADER = struct.Struct("<8sIIIIQ")
+_HEADER_SIZE = 64
+_BODY = struct.Struct("<BB6xdddd24s")
+
+def _frame_dtype(itemsize: int, count: int) -> np.dtype:
+    return np.dtype([("time", "<f8"), ("state", "<f4" if itemsize == 4 else "<f8", (count, 4))])
+
+class TrajectoryRecorder:
+    """把phys每步之后的状态追加到文件path中
+    记录创建时phys中的物体(先fixed后active)，之后增加的物体不记录。通过phys.post_update_callback挂接，原有的回调照常调用。
+    dtype: "float32"或"float64"
+    chunk_frames: 文件每次增长的帧数
+    flush_frames: 每隔多少帧把数据刷新到磁盘并更新文件头中的帧数
+    用完后应调用close()，也可以用with语句"""
+    def __init__(self, path: str, phys: Physics2D, dtype: str = "float32",
+                 chunk_frames: int = 1024, flush_frames: int = 256, record_initial: bool = True):
+        if dtype not in ("float32", "float64"):
+            raise ValueError("dtype must be float32 or float64")
+        if chunk_frames < 1 or flush_frames < 1:
+            raise ValueError("chunk_frames and flush_frames must be positive")
+        self.path = path
+        self.phys = phys
+        self.bodies: list[PhysicalObject] = phys._fixed_objects + phys._active_objects
+        """记录的物体，与文件中的顺序相同"""
+        self.itemsize = 4 if dtype == "float32" else 8
+        self.chunk_frames = chunk_frames
+        self.flush_frames = flush_frames
+        self.frames = 0
+        """已记录的帧数"""
+        self.time = 0.0
+        """当前帧的时间(各步dt之和)"""
+        count = len(self.bodies)
+        self._dtype = _frame_dtype(self.itemsize, count)
+        # 文件头与每个物体的记录都是64字节，帧数据总是按8字节对齐
+        self._offset = _HEADER_SIZE + _BODY.size * count
+        self._capacity = 0
+        self._file = open(path, "w+b")
+        self._file.write(self._header())
+        for obj in self.bodies:
+            self._file.write(self._body(obj))
+        self._mmap: mmap.mmap | None = None
+        self._view: np.ndarray | None = None
+        self._grow()
+        self._base_callback = phys.post_update_callback
+        phys.post_update_callback = self._on_update # type: ignore
+        if record_initial:
+            self.record()
+
+    def _header(self) -> bytes:
+        return _HEADER.pack(MAGIC, VERSION, self.itemsize, len(self.bodies), self._offset, self.frames).ljust(_HEADER_SIZE, b"\0")
+
+    @staticmethod
+    def _body(obj: PhysicalObject) -> bytes:
+        radius = 0.0
+        dx = dy = 0.0
+        kind = KIND_OTHER
+        if isinstance(obj, Circle):
+            kind = KIND_CIRCLE
+            radius = obj.radius
+        elif isinstance(obj, Line):
+            kind = KIND_LINE
+            dx = obj.direction.x
+            dy = obj.direction.y
+        name = str(obj.name).encode("utf-8")[:24]
+        return _BODY.pack(kind, 1 if obj.fixed else 0, obj.mass, radius, dx, dy, name)
+
+    def _grow(self):
+        """文件增加chunk_frames帧的空间，重新映射"""
+        self._release()
+        self._capacity += self.chunk_frames
+        self._file.truncate(self._offset + self._capacity * self._dtype.itemsize)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._view = np.ndarray((self._capacity,), dtype=self._dtype, buffer=self._mmap, offset=self._offset)
+
+    def _release(self):
+        self._view = None
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+
+    def _on_update(self, dt: float):
+        if self._base_callback is not None:
+            self._base_callback(dt)
+        self.time += dt
+        self.record()
+
+    def record(self):
+        """记录当前状态为一帧"""
+        if self._view is None:
+            raise ValueError("Recorder is closed")
+        if self.frames == self._capacity:
+            self._grow()
+        self._view["time"][self.frames] = self.time
+        state = self._view["state"][self.frames]
+        bodies = self.bodies
+        row_index = getattr(self.phys, "_row_index", None)
+        if row_index is not None and all(obj in row_index for obj in bodies):
+            # 数组后端：直接从状态数组中按行复制
+            rows = np.fromiter((row_index[obj] for obj in bodies), dtype=np.int64, count=len(bodies))
+            state[:, 0:2] = self.phys._pos[rows] # type: ignore
+            state[:, 2:4] = self.phys._velocity[rows] # type: ignore
+        else:
+            state[:] = [(obj.pos.x, obj.pos.y, obj.velocity.x, obj.velocity.y) for obj in bodies]
+        self.frames += 1
+        if self.frames % self.flush_frames == 0:
+            self.flush()
+
+    def flush(self):
+        """把已记录的帧写入磁盘，并更新文件头中的帧数"""
+        if self._mmap is None:
+            return
+        self._mmap[0:_HEADER_SIZE] = self._header()
+        self._mmap.flush()
+
+    def close(self):
+        """停止记录：恢复phys原来的回调，文件截断到实际大小"""
+        if self._file.closed:
+            return
+        if self.phys.post_update_callback == self._on_update:
+            self.phys.post_update_callback = self._base_callback
+        self.flush()
+        self._release()
+        self._file.truncate(self._offset + self.frames * self._dtype.itemsize)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class TrajectoryReader:
+    """读取TrajectoryRecorder写入的文件。各属性都是映射文件的NumPy视图，不复制数据
+    times: (帧数,) 各帧的时间
+    states: (帧数, 物体数, 4) 各帧各物体的(x, y, vx, vy)
+    positions / velocities: states中(x, y)与(vx, vy)部分的视图"""
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            header = file.read(_HEADER_SIZE)
+            magic, version, itemsize, count, offset, frames = _HEADER.unpack_from(header)
+            if magic != MAGIC:
+                raise ValueError("{} is not a trajectory file".format(path))
+            if version != VERSION:
+                raise ValueError("Unsupported trajectory file version {}".format(version))
+            self.bodies: list[dict] = []
+            """物体表：每个物体的kind、fixed、mass、radius、direction、name"""
+            for _ in range(count):
+                kind, fixed, mass, radius, dx, dy, name = _BODY.unpack(file.read(_BODY.size))
+                self.bodies.append({
+                    "kind": kind,
+                    "fixed": bool(fixed),
+                    "mass": mass,
+                    "radius": radius,
+                    "direction": (dx, dy),
+                    "name": name.rstrip(b"\0").decode("utf-8", "replace"),
+                })
+        self.path = path
+        self.dtype = np.dtype("<f4" if itemsize == 4 else "<f8")
+        self.frame_count = frames
+        if frames > 0:
+            frames_view = np.memmap(path, dtype=_frame_dtype(itemsize, count), mode="r", offset=offset, shape=(frames,))
+        else:
+            frames_view = np.zeros((0,), dtype=_frame_dtype(itemsize, count))
+        self.times: np.ndarray = frames_view["time"]
+        self.states: np.ndarray = frames_view["state"]
+        self.positions: np.ndarray = self.states[:, :, 0:2]
+        self.velocities: np.ndarray = self.states[:, :, 2:4]
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+class TrajectoryPlayer:
+    """按时间回放轨迹文件，不需要Physics2D
+    按文件中的物体表创建Circle和Line(类型未知的物体不回放)，像Physics2D一样放在_fixed_objects与_active_objects中，
+    可以直接交给绘制Physics2D的代码。每次只读取正在显示的帧"""
+    def __init__(self, path: str):
+        self.reader = TrajectoryReader(path)
+        if len(self.reader) == 0:
+            raise ValueError("{} has no frames".format(path))
+        self.bodies: list[PhysicalObject | None] = []
+        """与文件中的顺序相同，类型未知的物体为None"""
+        self._fixed_objects: list[PhysicalObject] = []
+        self._active_objects: list[PhysicalObject] = []
+        first = self.reader.states[0].tolist()
+        for info, (x, y, _, _) in zip(self.reader.bodies, first):
+            obj = None
+            if info["kind"] == KIND_CIRCLE:
+                obj = Circle(Pos2D(x, y), info["radius"], info["mass"], info["fixed"])
+            elif info["kind"] == KIND_LINE:
+                obj = Line(Pos2D(x, y), Vector2D(*info["direction"]), info["mass"], info["fixed"])
+            self.bodies.append(obj)
+            if obj is None:
+                continue
+            obj.name = info["name"]
+            (self._fixed_objects if obj.fixed else self._active_objects).append(obj)
+        self.frame = 0
+        """当前显示的帧"""
+        self.time = float(self.reader.times[0])
+        """当前回放的时间"""
+        self.seek(0)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.reader)
+
+    @property
+    def finished(self) -> bool:
+        """是否已回放到最后一帧"""
+        return self.frame == self.frame_count - 1 and self.time >= float(self.reader.times[-1])
+
+    def _apply(self, frame: int, prev_frame: int):
+        """把frame帧的状态写入各物体，prev_frame帧的位置写入prev_pos供插值"""
+        state = self.reader.states[frame].tolist()
+        prev_state = state if prev_frame == frame else self.reader.states[prev_frame].tolist()
+        for obj, (x, y, vx, vy), (px, py, _, _) in zip(self.bodies, state, prev_state):
+            if obj is None:
+                continue
+            obj.pos = Pos2D(x, y)
+            obj.velocity = Vector2D(vx, vy)
+            obj.prev_pos = Pos2D(px, py)
+        self.frame = frame
+
+    def seek(self, frame: int):
+        """跳到第frame帧"""
+        frame = max(0, min(frame, self.frame_count - 1))
+        self.time = float(self.reader.times[frame])
+        self._apply(frame, frame)
+
+    def step(self, frames: int = 1):
+        """前进(负数为后退)若干帧"""
+        self.seek(self.frame + frames)
+
+    def advance(self, elapsed: float) -> float:
+        """回放时间前进elapsed秒(负数为倒放)，与Physics2D.advance一样返回绘制时在prev_pos与pos之间插值的alpha"""
+        times = self.reader.times
+        self.time = max(float(times[0]), min(self.time + elapsed, float(times[-1])))
+        # 第一个时间不早于当前时间的帧
+        frame = int(np.searchsorted(times, self.time))
+        if frame == 0:
+            self._apply(0, 0)
+            return 1.0
+        self._apply(frame, frame - 1)
+        t0 = float(times[frame - 1])
+        t1 = float(times[frame])
+        return (self.time - t0) / (t1 - t0) if t1 > t0 else 1.0
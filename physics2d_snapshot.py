@@ -0,0 +1,196 @@
+# physics2d的快照与快照历史。
+# 与physics2d分开存放，不需要回退的程序不必编译和加载这部分代码。
+# 用法: blob = snapshot(phys)，之后restore(phys, blob)；或phys.history = SnapshotHistory(1 << 20)自动记录
+
+from array import array
+
+from physics2d import *
+
+# 快照中每个物体的字段数：pos(2) velocity(2) last_pos(2, NaN表示None) mass fixed 在所属列表中的下标 collision_energy_loss sleeping 连续低速的步数
+SNAPSHOT_FIELDS = 12
+def snapshot(phys: Physics2D) -> array:
+    """把所有物体的状态打包为array('d')，可用restore恢复。
+    只保存数值状态，不保存物体本身：恢复时物体集合须与快照时相同(可以改变fixed与列表顺序，不能增删物体)。
+    布局：物体数, advance的累积时间, 各物体的字段(按id排序), 热启动冲量数, 各冲量(物体序号1, 物体序号2, 冲量)。没有solver时冲量数为0"""
+    bodies = sorted(phys._fixed_objects + phys._active_objects, key=id)
+    fields = SNAPSHOT_FIELDS
+    impulses = phys.solver._impulses if phys.solver is not None else {}
+    blob = array("d", [0.0] * (3 + len(bodies) * fields + len(impulses) * 3))
+    blob[0] = len(bodies)
+    blob[1] = phys._accumulator
+    index = {}
+    for i in range(len(phys._fixed_objects)):
+        index[id(phys._fixed_objects[i])] = i
+    for i in range(len(phys._active_objects)):
+        index[id(phys._active_objects[i])] = i
+    nan = float("nan")
+    sleep_counts = phys._sleep_counts
+    offset = 2
+    for obj in bodies:
+        last_pos = obj.last_pos
+        blob[offset] = obj.pos.x
+        blob[offset + 1] = obj.pos.y
+        blob[offset + 2] = obj.velocity.x
+        blob[offset + 3] = obj.velocity.y
+        blob[offset + 4] = nan if last_pos is None else last_pos.x
+        blob[offset + 5] = nan if last_pos is None else last_pos.y
+        blob[offset + 6] = obj.mass
+        blob[offset + 7] = 1.0 if obj.fixed else 0.0
+        blob[offset + 8] = index[id(obj)]
+        blob[offset + 9] = obj.collision_energy_loss
+        blob[offset + 10] = 1.0 if obj.sleeping else 0.0
+        blob[offset + 11] = sleep_counts.get(obj, 0)
+        offset += fields
+    if len(impulses) > 0:
+        row = {}
+        for i in range(len(bodies)):
+            row[id(bodies[i])] = i
+    blob[offset] = len(impulses)
+    offset += 1
+    for key, impulse in impulses.items():
+        blob[offset] = row[id(key[0])]
+        blob[offset + 1] = row[id(key[1])]
+        blob[offset + 2] = impulse
+        offset += 3
+    return blob
+
+def restore(phys: Physics2D, blob: array):
+    """恢复snapshot保存的状态"""
+    bodies = sorted(phys._fixed_objects + phys._active_objects, key=id)
+    fields = SNAPSHOT_FIELDS
+    if len(blob) < 3 + len(bodies) * fields or int(blob[0]) != len(bodies):
+        raise ValueError("Snapshot does not match the bodies in this world")
+    phys._accumulator = blob[1]
+    inplace = phys.inplace_update_enabled
+    sleep_counts = phys._sleep_counts
+    fixed_order = []
+    active_order = []
+    offset = 2
+    for obj in bodies:
+        fixed = blob[offset + 7] != 0.0
+        if obj.fixed != fixed:
+            phys.setFixed(obj, fixed)
+        if inplace:
+            obj.pos = obj.pos.set(blob[offset], blob[offset + 1])
+            obj.velocity = obj.velocity.set(blob[offset + 2], blob[offset + 3])
+        else:
+            obj.pos = Pos2D(blob[offset], blob[offset + 1])
+            obj.velocity = Vector2D(blob[offset + 2], blob[offset + 3])
+        x = blob[offset + 4]
+        if x != x: # NaN
+            obj.last_pos = None
+        elif inplace and obj.last_pos is not None:
+            obj.last_pos = obj.last_pos.set(x, blob[offset + 5])
+        else:
+            obj.last_pos = Pos2D(x, blob[offset + 5])
+        obj.mass = blob[offset + 6]
+        obj.collision_energy_loss = blob[offset + 9]
+        obj.sleeping = blob[offset + 10] != 0.0
+        count = int(blob[offset + 11])
+        if count > 0:
+            sleep_counts[obj] = count
+        elif obj in sleep_counts:
+            del sleep_counts[obj]
+        (fixed_order if fixed else active_order).append((blob[offset + 8], obj))
+        offset += fields
+    # 恢复列表中的顺序，碰撞检查的顺序依赖于它
+    fixed_order.sort(key=lambda item: item[0])
+    active_order.sort(key=lambda item: item[0])
+    for i in range(len(fixed_order)):
+        phys._fixed_objects[i] = fixed_order[i][1]
+    for i in range(len(active_order)):
+        phys._active_objects[i] = active_order[i][1]
+    impulses = {}
+    for _ in range(int(blob[offset])):
+        impulses[(bodies[int(blob[offset + 1])], bodies[int(blob[offset + 2])])] = blob[offset + 3]
+        offset += 3
+    if phys.solver is not None:
+        phys.solver._impulses = impulses
+
+class SnapshotHistory:
+    """最近若干个快照组成的环形缓冲区。赋给Physics2D.history后，每stride步自动记录一次update之后的状态，
+    总大小超过max_bytes时丢弃最旧的快照。槽数按物体数对应的最小快照大小一次分配，之后循环使用"""
+    def __init__(self, max_bytes: int, stride: int = 1):
+        if stride < 1:
+            raise ValueError("Stride must be at least 1")
+        self.max_bytes = max_bytes
+        """所有快照的总字节数上限，不能小于一个快照"""
+        self.stride = stride
+        """每隔多少步记录一次"""
+        self.steps = 0
+        """已经过的步数"""
+        self.nbytes = 0
+        """当前所有快照的总字节数"""
+        self._slots: list = [] # 循环使用的槽，每个为(步数, 快照)或None
+        self._first = 0 # 最旧的快照所在的槽
+        self._count = 0 # 快照数
+        self._bodies = -1 # 分配槽时的物体数
+    def __len__(self) -> int:
+        return self._count
+    def __getitem__(self, index: int) -> tuple[int, array]:
+        """返回(步数, 快照)，0为最旧，-1为最新"""
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError("Snapshot index out of range")
+        return self._slots[(self._first + index) % len(self._slots)]
+    def clear(self):
+        self._slots = []
+        self._first = 0
+        self._count = 0
+        self._bodies = -1
+        self.nbytes = 0
+    def _allocate(self, bodies: int, itemsize: int):
+        """按物体数重新分配槽，保留已有的快照。只在物体数变化时调用"""
+        kept = [self[index] for index in range(self._count)]
+        smallest = (3 + bodies * SNAPSHOT_FIELDS) * itemsize # 没有热启动冲量时的快照大小
+        for _, blob in kept:
+            smallest = min(smallest, len(blob) * blob.itemsize)
+        capacity = max(1, self.max_bytes // smallest)
+        self._slots = kept + [None] * (capacity - len(kept))
+        self._first = 0
+        self._bodies = bodies
+    def _drop_oldest(self):
+        slots = self._slots
+        _, old = slots[self._first]
+        self.nbytes -= len(old) * old.itemsize
+        slots[self._first] = None
+        self._first = (self._first + 1) % len(slots)
+        self._count -= 1
+    def record(self, phys: Physics2D):
+        """立即记录一个快照"""
+        blob = snapshot(phys)
+        size = len(blob) * blob.itemsize
+        if size > self.max_bytes:
+            raise ValueError("max_bytes ({}) is smaller than one snapshot ({} bytes)".format(self.max_bytes, size))
+        if int(blob[0]) != self._bodies:
+            self._allocate(int(blob[0]), blob.itemsize)
+        slots = self._slots
+        capacity = len(slots)
+        while self._count > 0 and (self._count == capacity or self.nbytes + size > self.max_bytes):
+            self._drop_oldest()
+        slots[(self._first + self._count) % capacity] = (self.steps, blob)
+        self._count += 1
+        self.nbytes += size
+    def _step(self, phys: Physics2D):
+        """由Physics2D.update在每步之后调用"""
+        self.steps += 1
+        if self.steps % self.stride == 0:
+            self.record(phys)
+    def rewind(self, phys: Physics2D, index: int = -1) -> int:
+        """把phys恢复到第index个快照，丢弃比它新的快照，返回该快照的步数。之后的模拟从这里重新开始记录"""
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError("Snapshot index out of range")
+        step, blob = self[index]
+        restore(phys, blob)
+        slots = self._slots
+        for newer in range(index + 1, self._count):
+            slot = (self._first + newer) % len(slots)
+            _, old = slots[slot]
+            self.nbytes -= len(old) * old.itemsize
+            slots[slot] = None
+        self._count = index + 1
+        self.steps = step
+        return step
@@ -0,0 +1,133 @@
+# physics2d的迭代求解器。
+# 与physics2d分开存放，按原来的方式逐对处理碰撞的程序不必编译和加载这部分代码。
+# 用法: phys.solver = SequentialImpulseSolver(10)
+
+import micropython
+
+from physics2d import *
+
+class SequentialImpulseSolver:
+    """顺序冲量(sequential impulse)迭代求解器。赋给Physics2D.solver后，碰撞不再逐对以闭式解处理，
+    而是先收集本步所有接触，再统一迭代求解法向冲量(累积冲量不小于0)，堆叠、成堆的物体更稳定，dt也可以更大"""
+    def __init__(self, iterations: int = 10):
+        self.iterations = iterations
+        """迭代次数"""
+        self.baumgarte = 0.2
+        """每步以速度消除穿透深度的比例"""
+        self.slop = 0.01
+        """允许的穿透深度，小于它的穿透不做修正，避免抖动"""
+        self.restitution_threshold = 0.5
+        """法向接近速度低于该值的接触不反弹，避免静止接触反复弹跳"""
+        self.warm_starting = True
+        """用上一步同一对物体的冲量作为初值"""
+        self._contacts: list[CollisionEvent] = [] # 本步收集的接触
+        self._impulses = {} # 上一步各对物体的累积法向冲量
+
+    def add_contact(self, collision_point: CollisionEvent):
+        """收集一个接触，由Physics2D.handle_collision调用"""
+        self._contacts.append(collision_point)
+
+    def remove(self, obj: PhysicalObject):
+        """丢弃与obj有关的热启动冲量，由Physics2D.remove调用"""
+        if len(self._impulses) > 0:
+            impulses = {}
+            for key, impulse in self._impulses.items():
+                if key[0] is not obj and key[1] is not obj:
+                    impulses[key] = impulse
+            self._impulses = impulses
+
+    @micropython.native
+    def solve(self, phys: Physics2D):
+        """以顺序冲量法迭代求解本步收集的所有接触，然后依次调用handler。由Physics2D.update_collision在检查完所有物体对后调用
+        只求解法向冲量(与resolve_collision一样不考虑摩擦)。恢复系数为两物体动能保留率(1 - collision_energy_loss)之积"""
+        contacts = self._contacts
+        self._contacts = []
+        dt = phys._step_dt
+        bias_rate = self.baumgarte / dt if dt > 0 else 0.0
+        slop = self.slop
+        threshold = self.restitution_threshold
+        penetration_of = Physics2D._penetration
+        old_impulses = self._impulses if self.warm_starting else {}
+        velocities = {} # 物体 -> [vx, vy]，迭代过程中只修改这里
+        rows = []
+        for collision_point in contacts:
+            obj1 = collision_point.obj1
+            obj2 = collision_point.obj2
+            inv_mass1 = 0.0 if obj1.fixed else 1.0 / obj1.mass
+            inv_mass2 = 0.0 if obj2.fixed else 1.0 / obj2.mass
+            if inv_mass1 + inv_mass2 == 0.0:
+                continue
+            v1 = velocities.get(obj1)
+            if v1 is None:
+                v1 = [obj1.velocity.x, obj1.velocity.y]
+                velocities[obj1] = v1
+            v2 = velocities.get(obj2)
+            if v2 is None:
+                v2 = [obj2.velocity.x, obj2.velocity.y]
+                velocities[obj2] = v2
+            # 法向由obj1指向obj2
+            nx = collision_point.normal.x
+            ny = collision_point.normal.y
+            vn = (v2[0] - v1[0]) * nx + (v2[1] - v1[1]) * ny
+            # 目标分离速度：反弹与穿透修正取较大者
+            bias = 0.0
+            if -vn > threshold:
+                bias = -vn * (1.0 - obj1.collision_energy_loss) * (1.0 - obj2.collision_energy_loss)
+            penetration = penetration_of(obj1, obj2) - slop
+            if penetration > 0 and bias_rate * penetration > bias:
+                bias = bias_rate * penetration
+            key = (obj1, obj2)
+            rows.append([v1, v2, nx, ny, inv_mass1, inv_mass2, 1.0 / (inv_mass1 + inv_mass2), bias, old_impulses.get(key, 0.0), key])
+
+        # 热启动：先施加上一步的冲量。反弹速度须在此之前按碰撞前的速度算好
+        for row in rows:
+            impulse = row[8]
+            if impulse > 0.0:
+                v1, v2, nx, ny, inv_mass1, inv_mass2 = row[0], row[1], row[2], row[3], row[4], row[5]
+                v1[0] -= impulse * inv_mass1 * nx
+                v1[1] -= impulse * inv_mass1 * ny
+                v2[0] += impulse * inv_mass2 * nx
+                v2[1] += impulse * inv_mass2 * ny
+
+        for _ in range(self.iterations):
+            for row in rows:
+                v1, v2, nx, ny, inv_mass1, inv_mass2, mass, bias, impulse, _ = row
+                vn = (v2[0] - v1[0]) * nx + (v2[1] - v1[1]) * ny
+                # 累积冲量不小于0：接触只能推开，不能拉近
+                new_impulse = impulse + mass * (bias - vn)
+                if new_impulse < 0.0:
+                    new_impulse = 0.0
+                delta = new_impulse - impulse
+                row[8] = new_impulse
+                v1[0] -= delta * inv_mass1 * nx
+                v1[1] -= delta * inv_mass1 * ny
+                v2[0] += delta * inv_mass2 * nx
+                v2[1] += delta * inv_mass2 * ny
+
+        impulses = {}
+        for row in rows:
+            impulses[row[9]] = row[8]
+        self._impulses = impulses
+        inplace = phys.inplace_update_enabled
+        if inplace:
+            # 碰撞点记录的碰撞前速度与物体共用同一个向量，原地修改前先复制。没有handler时不会有人读取，不必复制
+            shared_handler = phys.collision_batch_handler is not None or phys.collision_handler is not None
+            for collision_point in contacts:
+                if (not shared_handler and collision_point.obj1.collision_handler is None
+                        and collision_point.obj2.collision_handler is None):
+                    continue
+                velocity = collision_point.obj1.velocity
+                if collision_point.obj1_last_velocity is velocity:
+                    collision_point.obj1_last_velocity = Vector2D(velocity.x, velocity.y)
+                velocity = collision_point.obj2.velocity
+                if collision_point.obj2_last_velocity is velocity:
+                    collision_point.obj2_last_velocity = Vector2D(velocity.x, velocity.y)
+        for obj, v in velocities.items():
+            if obj.fixed:
+                continue
+            if inplace:
+                obj.velocity = obj.velocity.set(v[0], v[1])
+            else:
+                obj.velocity = Vector2D(v[0], v[1])
+        for collision_point in contacts:
+            phys._notify_collision(collision_point)
@@ -0,0 +1,133 @@
+# physics2d的分阶段耗时统计。
+# 与physics2d分开存放，不做性能分析的程序不必编译和加载这部分代码。
+# 用法: phys.stats = PhysicsStats()，之后phys.stats.report()
+
+import time
+
+from physics2d import *
+
+if hasattr(time, "ticks_us"):
+    # micropython：ticks_us会回绕，差值须用ticks_diff计算
+    def _ticks():
+        return time.ticks_us()
+    def _seconds(start, end) -> float:
+        return time.ticks_diff(end, start) * 1e-6
+else:
+    _ticks = time.perf_counter
+    def _seconds(start, end) -> float:
+        return end - start
+
+class PhysicsStats:
+    """Physics2D.update各阶段的耗时与计数。赋给Physics2D.stats后开始统计  
+    耗时按阶段互不重叠(秒)：
+    callback: update_callback与post_update_callback  
+    move: update_move  
+    broad_phase: update_collision中其余的时间，即粗检测配对与遍历(并行后端的碰撞求解也在这里)  
+    narrow_phase: handle_collision中的碰撞检测与运动校正  
+    resolve: 速度分配(resolve_collision或Physics2D.solver)  
+    handlers: 碰撞handler(含休眠物体的唤醒检查)  
+    sleep: 休眠判断  
+    计数：pairs_tested为检查的物体对数，pairs_colliding为发生碰撞的对数，corrections为运动校正移动了物体的对数。
+    数组后端批量处理的圆-圆对不经过handle_collision，不计入narrow_phase和pairs_tested。
+    计时本身会让逐对检查明显变慢，这部分开销计入broad_phase，物体对很多时应以各阶段的相对大小为准"""
+    PHASES = ("callback", "move", "broad_phase", "narrow_phase", "resolve", "handlers", "sleep")
+    COUNTERS = ("pairs_tested", "pairs_colliding", "corrections")
+    def __init__(self):
+        self.reset()
+    def reset(self):
+        """清零所有统计"""
+        self.steps = 0
+        """统计的步数"""
+        self.time_total = {phase: 0.0 for phase in self.PHASES}
+        """各阶段累计耗时"""
+        self.time_last = {phase: 0.0 for phase in self.PHASES}
+        """各阶段上一步的耗时"""
+        self.count_total = {counter: 0 for counter in self.COUNTERS}
+        """累计计数"""
+        self.count_last = {counter: 0 for counter in self.COUNTERS}
+        """上一步的计数"""
+        self._child = 0.0 # 当前阶段内已计入子阶段的耗时
+    def _begin_step(self):
+        for phase in self.PHASES:
+            self.time_last[phase] = 0.0
+        for counter in self.COUNTERS:
+            self.count_last[counter] = 0
+    def _end_step(self):
+        self.steps += 1
+        for phase in self.PHASES:
+            self.time_total[phase] += self.time_last[phase]
+        for counter in self.COUNTERS:
+            self.count_total[counter] += self.count_last[counter]
+    def _timed(self, phase: str, func, *args):
+        """调用func并把耗时(扣除其中子阶段的耗时)计入phase"""
+        child = self._child
+        self._child = 0.0
+        start = _ticks()
+        result = func(*args)
+        elapsed = _seconds(start, _ticks())
+        self.time_last[phase] += elapsed - self._child
+        self._child = child + elapsed
+        return result
+    def report(self) -> str:
+        """返回累计统计的文字报告"""
+        total = 0.0
+        for phase in self.PHASES:
+            total += self.time_total[phase]
+        lines = ["{} steps, {:.6f} s".format(self.steps, total)]
+        for phase in self.PHASES:
+            elapsed = self.time_total[phase]
+            lines.append("{:<14}{:>12.6f} s {:>6.1f}%".format(phase, elapsed, elapsed * 100 / total if total > 0 else 0.0))
+        for counter in self.COUNTERS:
+            lines.append("{:<16}{:>12}".format(counter, self.count_total[counter]))
+        return "\n".join(lines)
+
+    def step(self, phys: Physics2D, dt: float):
+        """代替Physics2D.update执行一步，并统计各阶段耗时。由Physics2D.update在stats不为None时调用
+        逐对调用的方法临时换成计时的版本，统计关闭时没有额外开销"""
+        self._begin_step()
+        timed = self._timed
+        count = self.count_last
+        handle_collision = phys.handle_collision
+        resolve_collision = phys.resolve_collision
+        notify_collision = phys._notify_collision
+        solver = phys.solver
+        def timed_handle_collision(obj1: PhysicalObject, obj2: PhysicalObject):
+            count["pairs_tested"] += 1
+            pos1 = obj1.pos
+            pos2 = obj2.pos
+            x1, y1, x2, y2 = pos1.x, pos1.y, pos2.x, pos2.y
+            timed("narrow_phase", handle_collision, obj1, obj2)
+            pos1 = obj1.pos
+            pos2 = obj2.pos
+            if pos1.x != x1 or pos1.y != y1 or pos2.x != x2 or pos2.y != y2:
+                count["corrections"] += 1
+        def timed_notify_collision(collision_point: CollisionEvent):
+            count["pairs_colliding"] += 1
+            timed("handlers", notify_collision, collision_point)
+        phys.handle_collision = timed_handle_collision
+        phys.resolve_collision = lambda collision_point: timed("resolve", resolve_collision, collision_point)
+        phys._notify_collision = timed_notify_collision
+        if solver is not None:
+            solve = solver.solve
+            solver.solve = lambda world: timed("resolve", solve, world)
+        try:
+            if phys.update_callback is not None:
+                timed("callback", phys.update_callback, dt)
+            phys._step_dt = dt
+            timed("move", phys.update_move, dt)
+            timed("broad_phase", phys.update_collision)
+            if phys.sleep_enabled:
+                timed("sleep", phys._update_sleep)
+            if phys.batch_events_enabled:
+                timed("handlers", phys._deliver_events)
+        finally:
+            del phys.handle_collision
+            del phys.resolve_collision
+            del phys._notify_collision
+            if solver is not None:
+                del solver.solve
+        if phys.history is not None:
+            phys.history._step(phys)
+        if phys.post_update_callback is not None:
+            timed("callback", phys.post_update_callback, dt)
+        self._end_step()
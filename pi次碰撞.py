@@ -48,4 +48,8 @@ def collision_handler(plat):
 
 ball1.collision_handler = collision_handler # type: ignore
 
+# 时间步进在速度很大时会穿模，碰撞次数也不准。换用事件驱动引擎可以精确求出每次碰撞的时刻
+# from physics2d_event import EventPhysics2D
+# EventPhysics2D.from_physics(phys)
+
 # 接下来总能发现，碰撞次数是pi的整倍次
\ No newline at end of file
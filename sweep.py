@@ -0,0 +1,167 @@
+# 参数扫描(仅用于电脑端)
+# 对同一个测试项目的多组参数各建一个独立的世界，在进程池中并行运行到结束，每完成一个就输出结果，最后保存汇总表。
+# 参数写作"变量.属性"，在测试项目模块导入后设置，例如ball2.mass、ball.collision_energy_loss、test.velocity、phys.extend_correction_enabled。
+# 用法:
+#   python sweep.py pi次碰撞 --param "ball2.mass=[1, 100, 10000, 1000000]" --time 200 --dt 0.001 --until-idle 20 --csv pi.csv
+#   python sweep.py 带动能损失的自由落体 --param "ball.collision_energy_loss=[0.0, 0.05, 0.2]" --param "ball.velocity=[(2, 0), (5, 0)]"
+# 多个--param取笛卡尔积。--jsonl额外逐行保存每次运行的完整结果(含最终状态)
+
+import argparse
+import ast
+import contextlib
+import csv
+import importlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from physics2d import *
+from headless import count_collisions
+
+class ScenarioFactory:
+    """按参数创建测试项目的世界：重新导入模块得到全新的phys，再按"变量.属性"设置参数
+    原值是向量时，参数可以写成(x, y)"""
+    def __init__(self, module_name: str):
+        if module_name.endswith(".py"):
+            module_name = module_name[:-3]
+        self.module_name = module_name
+    def __call__(self, params: dict) -> Physics2D:
+        module = sys.modules.get(self.module_name)
+        if module is None:
+            module = importlib.import_module(self.module_name)
+        else:
+            module = importlib.reload(module)
+        phys = getattr(module, "phys", None)
+        if not isinstance(phys, Physics2D):
+            raise ValueError("{}: module has no Physics2D named phys".format(self.module_name))
+        for path, value in params.items():
+            name, _, attribute = path.rpartition(".")
+            if name == "" or not hasattr(module, name):
+                raise ValueError("{}: no variable for parameter {}".format(self.module_name, path))
+            target = getattr(module, name)
+            old = getattr(target, attribute)
+            if isinstance(old, Vector2D) and isinstance(value, (tuple, list)):
+                value = type(old)(value[0], value[1])
+            setattr(target, attribute, value)
+        return phys
+
+def expand_grid(grid: dict) -> list[dict]:
+    """{名字: [取值...]}的笛卡尔积，按参数出现的顺序展开"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def run_world(factory, params: dict, steps: int, dt: float, until_idle: float | None = None, quiet: bool = True) -> dict:
+    """创建并运行一个世界，返回结果。在工作进程中调用
+    until_idle: 连续这么长的模拟时间内没有碰撞即视为结束"""
+    result = {"params": params, "steps": 0, "sim_time": 0.0, "wall_time": 0.0, "collisions": 0, "state": [], "error": None}
+    start = time.perf_counter()
+    output = io.StringIO() if quiet else None
+    try:
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            phys = factory(params)
+            collisions = count_collisions(phys)
+            last_collision_step = 0
+            seen = 0
+            step = 0
+            while step < steps:
+                phys.update(dt)
+                step += 1
+                if collisions[0] != seen:
+                    seen = collisions[0]
+                    last_collision_step = step
+                elif until_idle is not None and (step - last_collision_step) * dt >= until_idle:
+                    break
+                if output is not None and step % 1000 == 0:
+                    # 不让丢弃的输出一直占用内存
+                    output.seek(0)
+                    output.truncate()
+        result["steps"] = step
+        result["sim_time"] = step * dt
+        result["collisions"] = collisions[0]
+        for index, obj in enumerate(phys._fixed_objects + phys._active_objects):
+            name = str(obj.name)
+            if name.startswith("<"):
+                # 默认名字是repr，含内存地址，换成类型名与序号
+                name = "{} #{}".format(type(obj).__name__, index)
+            result["state"].append([name, obj.pos.x, obj.pos.y, obj.velocity.x, obj.velocity.y])
+    except Exception as error:
+        result["error"] = "{}: {}".format(type(error).__name__, error)
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+def sweep(factory, runs: list[dict], steps: int, dt: float, until_idle: float | None = None, workers: int | None = None):
+    """在进程池中运行所有参数组合，按完成的先后逐个产出(序号, 结果)
+    factory须可被pickle(模块顶层的函数或ScenarioFactory)"""
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_world, factory, params, steps, dt, until_idle): index for index, params in enumerate(runs)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def write_summary(path: str, runs: list[dict], results: dict[int, dict]):
+    """保存汇总表：每次运行一行，参数各占一列"""
+    names = list(runs[0]) if len(runs) > 0 else []
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["index"] + names + ["steps", "sim_time", "wall_time", "collisions", "error"])
+        for index in sorted(results):
+            result = results[index]
+            writer.writerow([index] + [repr(runs[index][name]) for name in names] + [
+                result["steps"], result["sim_time"], "{:.6f}".format(result["wall_time"]), result["collisions"], result["error"] or ""])
+
+def parse_param(text: str) -> tuple[str, list]:
+    """"变量.属性=[取值, ...]" -> (名字, 取值列表)"""
+    name, separator, values = text.partition("=")
+    if separator == "" or "." not in name:
+        raise argparse.ArgumentTypeError("expected NAME.ATTRIBUTE=[values...], got {!r}".format(text))
+    try:
+        parsed = ast.literal_eval(values)
+    except (ValueError, SyntaxError):
+        raise argparse.ArgumentTypeError("cannot parse values of {}".format(name))
+    if not isinstance(parsed, list):
+        parsed = [parsed]
+    return name.strip(), parsed
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Run a scenario over a parameter grid in a process pool")
+    parser.add_argument("scenario", help="scenario module name, e.g. pi次碰撞")
+    parser.add_argument("--param", type=parse_param, action="append", default=[], metavar="NAME.ATTR=[...]",
+                        help="parameter values as a Python list literal; repeat for a grid")
+    length = parser.add_mutually_exclusive_group()
+    length.add_argument("--steps", type=int, help="maximum steps per run (default 10000)")
+    length.add_argument("--time", type=float, help="maximum simulated seconds per run")
+    parser.add_argument("--dt", type=float, default=0.002, help="time step in seconds (default 0.002)")
+    parser.add_argument("--until-idle", type=float, help="end a run after this many simulated seconds without collisions")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--csv", default="sweep.csv", help="summary table path (default sweep.csv)")
+    parser.add_argument("--jsonl", help="also write every full result, including final states, to this file (overwritten)")
+    args = parser.parse_args(argv)
+    if args.dt <= 0:
+        parser.error("--dt must be positive")
+    steps = int(round(args.time / args.dt)) if args.time is not None else (args.steps if args.steps is not None else 10000)
+    runs = expand_grid(dict(args.param))
+    factory = ScenarioFactory(args.scenario)
+
+    results = {}
+    jsonl = open(args.jsonl, "w", encoding="utf-8") if args.jsonl is not None else None
+    start = time.perf_counter()
+    try:
+        for index, result in sweep(factory, runs, steps, args.dt, args.until_idle, args.workers):
+            results[index] = result
+            status = result["error"] or "{} collisions, {} steps".format(result["collisions"], result["steps"])
+            print("[{}/{}] #{} {}  {}  ({:.2f} s)".format(len(results), len(runs), index, runs[index], status, result["wall_time"]), flush=True)
+            if jsonl is not None:
+                jsonl.write(json.dumps(dict(result, index=index), ensure_ascii=False) + "\n")
+                jsonl.flush()
+    finally:
+        if jsonl is not None:
+            jsonl.close()
+        write_summary(args.csv, runs, results)
+    print("{} runs in {:.2f} s, summary saved to {}".format(len(results), time.perf_counter() - start, args.csv))
+
+if __name__ == "__main__":
+    main()
@@ -29,13 +29,20 @@ from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF, QBrush
 
 from PyQt5.QtCore import QTimer, pyqtSignal
 
+import sys
 import time
 
 from physics2d import *
 
 from typing import Any
 
-from 平面反弹 import phys # 改这里可以更改测试项目
+# python window.py --replay 轨迹文件：回放TrajectoryRecorder记录的文件，不运行物理模拟
+replay_path: str | None = sys.argv[sys.argv.index("--replay") + 1] if "--replay" in sys.argv[:-1] else None
+if replay_path is None:
+    from 平面反弹 import phys # 改这里可以更改测试项目
+else:
+    from physics2d_record import TrajectoryPlayer
+    phys = TrajectoryPlayer(replay_path) # 与Physics2D一样提供物体列表和advance，绘制代码不需区分
 
 phys_obj_scene_map: dict[PhysicalObject, QGraphicsItem] = {}
 
@@ -46,6 +53,16 @@ speed_scale: float = 0.2
 # ms
 tick: int = 1
 
+# s，每帧最多补偿的延迟，超出的部分丢弃(模拟变慢)
+max_catch_up: float = 0.1
+
+def obj_color(obj: PhysicalObject) -> tuple[int, int, int]:
+    """物体的显示颜色：取user_data["color"]，没有则为白色"""
+    user_data = obj.user_data
+    if isinstance(user_data, dict):
+        return user_data.get("color", (255, 255, 255))
+    return (255, 255, 255)
+
 class WinMain(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -61,8 +78,9 @@ class WinMain(QMainWindow):
         self.collision_analysis_events: list[CollisionEvent] = []
         # 碰撞分析的组件缓存
         self.collision_analysis_cache: list[QGraphicsItem] = []
-        # 绑回调
-        self.bind_callbacks()
+        # 绑回调。回放时没有碰撞事件
+        if replay_path is None:
+            self.bind_callbacks()
         # 单次定时器任务：initscene
         QTimer.singleShot(0, self.initscene)
         # self.initscene()
@@ -77,23 +95,34 @@ class WinMain(QMainWindow):
                     self.phys_stop()
                 else:
                     self.phys_start()
+            # 回放时左右方向键逐帧后退/前进
+            elif replay_path is not None and event.key() in (Qt.Key.Key_Left, Qt.Key.Key_Right):
+                self.replay_step(-1 if event.key() == Qt.Key.Key_Left else 1)
         self.keyPressEvent = keyPressEvent # type: ignore
         self.show()
-    # 回调函数
-    def collision_callback(self, event: CollisionEvent):
-        if self.collision_analysis:
-            self.collision_analysis_events.append(event)
-    # 绑定回调
+    # 回调函数：每步一批碰撞事件。事件对象会被物理引擎复用，需复制后暂存
+    def collision_batch_callback(self, events: list[CollisionEvent]):
+        if self.scenario_batch_handler is not None:
+            self.scenario_batch_handler(events)
+        for event in events:
+            self.collision_analysis_events.append(event.copy())
+    # 绑定回调。测试项目自己的collision_handler照常调用
     def bind_callbacks(self):
-        if phys.collision_handler is not None:
-            phys.collision_handler = self.collision_callback # type: ignore
+        # 测试项目自己的批量投递设置，关闭碰撞分析时恢复
+        self.scenario_batch_events_enabled = phys.batch_events_enabled
+        self.scenario_batch_handler = phys.collision_batch_handler
+        self.set_collision_analysis(self.collision_analysis)
+        self.collision_analysis_checkbox.toggled.connect(self.set_collision_analysis)
+    # 只在碰撞分析打开时开启批量投递
+    def set_collision_analysis(self, enabled: bool):
+        self.collision_analysis = enabled
+        if enabled:
+            phys.batch_events_enabled = True
+            phys.collision_batch_handler = self.collision_batch_callback # type: ignore
         else:
-            base_callback = phys.collision_handler
-            def combined_callback(event: CollisionEvent):
-                if base_callback is not None:
-                    base_callback(event)
-                self.collision_callback(event)
-            phys.collision_handler = combined_callback # type: ignore
+            phys.batch_events_enabled = self.scenario_batch_events_enabled
+            phys.collision_batch_handler = self.scenario_batch_handler
+            self.collision_analysis_events.clear()
     
     def phys_stop(self):
         self.timer.stop()
@@ -157,6 +186,9 @@ class WinMain(QMainWindow):
         self.scale_slider.setMaximum(1e+10)
         self.scale_slider.setValue(1)
         self.scale_layout.addWidget(self.scale_slider)
+        # 固定步长
+        self.stepping_label = QLabel()
+        self.control_panel_layout.addWidget(self.stepping_label)
 
         # 实际延迟
         self.refresh_ms_label = QLabel(f"实际延迟：-- ms")
@@ -164,11 +196,14 @@ class WinMain(QMainWindow):
         def refresh_interval_changed(value):
             global tick
             tick = value
+            self.update_stepping()
             # 重设定时器
             if self.timer.isActive():
                 self.timer.stop()
                 self.timer.start(tick)
         self.refresh_interval_slider.valueChanged.connect(refresh_interval_changed)
+        self.scale_slider.valueChanged.connect(self.update_stepping)
+        self.update_stepping()
         # 延迟补偿
         self.delay_compensation_checkbox = QCheckBox("延迟补偿(物理模拟异常时关闭)")
         self.control_panel_layout.addWidget(self.delay_compensation_checkbox)
@@ -179,6 +214,68 @@ class WinMain(QMainWindow):
         self.control_panel_layout.addWidget(self.collision_pause_checkbox)
         # 默认打开
         self.collision_pause_checkbox.setChecked(False)
+        # 碰撞分析。回放时没有碰撞事件
+        self.collision_analysis_checkbox = QCheckBox("碰撞分析")
+        self.control_panel_layout.addWidget(self.collision_analysis_checkbox)
+        self.collision_analysis_checkbox.setChecked(True)
+        if replay_path is not None:
+            self.collision_analysis_checkbox.hide()
+        if replay_path is not None:
+            self.init_replay_controls()
+
+    def update_stepping(self, *args):
+        # 步长取刷新间隔乘以倍率，即不开延迟补偿时每帧推进的时间；每帧的步数上限足以补偿max_catch_up秒的延迟
+        if replay_path is not None:
+            self.stepping_label.hide()
+            return
+        scale = self.scale_slider.value()
+        if scale > 0:
+            phys.fixed_dt = tick * scale / 1000
+            phys.max_substeps = max(1, int(max_catch_up * 1000 / tick + 0.5))
+        self.stepping_label.setText(f"步长：{phys.fixed_dt * 1000:.3g} ms，每帧最多{phys.max_substeps}步")
+
+    def init_replay_controls(self):
+        # 回放控制：进度条拖动跳转，按钮逐帧前进/后退(会暂停)
+        self.replay_layout = QHBoxLayout()
+        self.control_panel_layout.addLayout(self.replay_layout)
+        self.replay_prev_button = QPushButton("上一帧")
+        self.replay_layout.addWidget(self.replay_prev_button)
+        self.replay_slider = QSlider(Qt.Orientation.Horizontal)
+        self.replay_slider.setMinimum(0)
+        self.replay_slider.setMaximum(phys.frame_count - 1)
+        self.replay_layout.addWidget(self.replay_slider)
+        self.replay_next_button = QPushButton("下一帧")
+        self.replay_layout.addWidget(self.replay_next_button)
+        self.replay_label = QLabel()
+        self.replay_layout.addWidget(self.replay_label)
+        # 回放时倍率可以为负，即倒放
+        self.scale_slider.setMinimum(-1e+10)
+        self.replay_prev_button.clicked.connect(lambda: self.replay_step(-1))
+        self.replay_next_button.clicked.connect(lambda: self.replay_step(1))
+        def replay_slider_moved(value):
+            phys.seek(value)
+            self.replay_redraw()
+        self.replay_slider.valueChanged.connect(replay_slider_moved)
+        self.update_replay_controls()
+
+    def update_replay_controls(self):
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setValue(phys.frame)
+        self.replay_slider.blockSignals(False)
+        self.replay_label.setText(f"{phys.frame + 1}/{phys.frame_count}  t = {phys.time:.3f} s")
+
+    def replay_step(self, frames: int):
+        self.phys_stop()
+        phys.step(frames)
+        self.replay_redraw()
+
+    def replay_redraw(self):
+        # 跳转或逐帧后立即重绘当前帧
+        self.alpha = 1.0
+        self.draw_scene()
+        if self.force_analysis:
+            self.draw_force_analysis()
+        self.update_replay_controls()
         
     def __map_pos(self, x, y) -> tuple[float, float]:
         # 将物理坐标映射到屏幕坐标
@@ -201,14 +298,14 @@ class WinMain(QMainWindow):
                     continue # 相切，忽略
                 line.setLine(*self.__map_pos(*start), *self.__map_pos(*end))
                 # 检查颜色属性
-                color = QColor(*getattr(obj, "color", (255, 255, 255)))
+                color = QColor(*obj_color(obj))
                 line.setPen(QPen(color, 1))
             elif isinstance(obj, Circle):
                 circle: QGraphicsEllipseItem = phys_obj_scene_map[obj] # type: ignore
-                maped_pos = self.__map_pos(obj.pos.x, obj.pos.y)
+                maped_pos = self.__map_pos(*obj.interpolate_pos(self.alpha))
                 circle.setPos(*maped_pos)
                 # 检查颜色属性
-                color = QColor(*getattr(obj, "color", (255, 255, 255)))
+                color = QColor(*obj_color(obj))
                 circle.setPen(QPen(color, 1))
     
     def draw_force_analysis(self):
@@ -220,9 +317,9 @@ class WinMain(QMainWindow):
             if obj.velocity.abs_square() < DIV_EPLISON:
                 continue
             if isinstance(obj, Circle):
-                # 绘制运动方向箭头
-                start = obj.pos
-                end = obj.pos + obj.velocity * speed_scale
+                # 绘制运动方向箭头，起点与圆一样取插值位置
+                start = Pos2D(*obj.interpolate_pos(self.alpha))
+                end = start + obj.velocity * speed_scale
                 line = QGraphicsLineItem(*self.__map_pos(start.x, start.y), *self.__map_pos(end.x, end.y))
                 pen = QPen(QColor(100, 0, 0))
                 pen.setWidth(2)
@@ -283,8 +380,8 @@ class WinMain(QMainWindow):
             ):
                 if v.abs_square() < DIV_EPLISON:
                     continue
-                start = obj.pos
-                end = obj.pos + v * speed_scale
+                start = Pos2D(*obj.interpolate_pos(self.alpha))
+                end = start + v * speed_scale
                 line = QGraphicsLineItem(*self.__map_pos(start.x, start.y), *self.__map_pos(end.x, end.y))
                 pen = QPen(QColor(0, 100, 0))
                 pen.setStyle(Qt.PenStyle.DashLine)
@@ -344,14 +441,17 @@ class WinMain(QMainWindow):
                 raise Exception("未知物理对象类型")
         self.draw_scene()
     actual_delay: float = tick / 1000
+    alpha: float = 1.0
     def single_step(self):
-        # 仅模拟一步
+        # 按经过的时间以固定步长模拟，帧率不影响模拟结果
         if self.delay_compensation_checkbox.isChecked():
-            phys.update(self.actual_delay * self.scale_slider.value())
+            self.alpha = phys.advance(self.actual_delay * self.scale_slider.value())
         else:
-            phys.update(tick * self.scale_slider.value() / 1000)
+            self.alpha = phys.advance(tick * self.scale_slider.value() / 1000)
         # 更新场景
         self.draw_scene()
+        if replay_path is not None:
+            self.update_replay_controls()
         # 如果开启碰撞分析，绘制碰撞分析
         if self.collision_analysis:
             self.draw_collision_analysis(self.collision_analysis_events)
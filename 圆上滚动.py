@@ -4,6 +4,9 @@ from physics2d import *
 phys = Physics2D()
 # 全局重力
 phys.global_acceleration = Vector2D(0, -9.81)
+# 大小相差悬殊的场景适合用AABB树粗检测
+# from physics2d_broadphase import AABBTreeBroadPhase
+# phys.broad_phase = AABBTreeBroadPhase()
 # 地面(外圆)
 floor = Circle(
     (20, -90),
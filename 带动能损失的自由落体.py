@@ -24,4 +24,6 @@ ball.collision_energy_loss = 0.05
 
 # 添加到场景
 phys.append(floor)
-phys.append(ball)
\ No newline at end of file
+phys.append(ball)
+# 球停稳后让其休眠，不再计算
+# phys.sleep_enabled = True
@@ -3,6 +3,9 @@ from physics2d import *
 
 phys = Physics2D()
 # phys.continuous_collision_sampling_enabled = False
+# 球很多时可打开网格粗检测
+# from physics2d_broadphase import SpatialHashBroadPhase
+# phys.broad_phase = SpatialHashBroadPhase()
 phys.extend_correction_enabled = True
 
 space_LR = (1, 30)  # 左右侧墙壁位置
@@ -44,8 +47,8 @@ center_ball = Circle(
 center_ball.name = "Ball Center"
 # 有右上的初速度
 center_ball.velocity = Vector2D(10, 10)
-# 自定义属性：颜色
-center_ball.color = (255, 0, 0) # type: ignore
+# 自定义数据：颜色
+center_ball.user_data = {"color": (255, 0, 0)}
 
 phys.extend([
     wall_left,
@@ -81,10 +84,12 @@ def on_collision(dt: float):
     # 检查是否有球出界，若有则发送信息
     for obj in phys._active_objects:
         if isinstance(obj, Circle):
-            if not (space_LR[0] <= obj.pos.x <= space_LR[1] and space_TB[0] <= obj.pos.y <= space_TB[1]) and not getattr(obj, "is_out_of_bounds", False):
+            if obj.user_data is None:
+                obj.user_data = {}
+            if not (space_LR[0] <= obj.pos.x <= space_LR[1] and space_TB[0] <= obj.pos.y <= space_TB[1]) and not obj.user_data.get("is_out_of_bounds", False):
                 print(f"[Out of Bounds] {obj.name} out of bounds at position ({obj.pos.x:.2f}, {obj.pos.y:.2f})")
-                obj.is_out_of_bounds = True # type: ignore
-                obj.color = (0, 0, 255)  # type: ignore
+                obj.user_data["is_out_of_bounds"] = True
+                obj.user_data["color"] = (0, 0, 255)
                 phys.setFixed(obj, True)
 
 phys.update_callback = on_collision # type: ignore
\ No newline at end of file
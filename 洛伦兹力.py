@@ -1,4 +1,5 @@
 from physics2d import *
+from physics2d_integrators import Integrator
 
 
 phys = Physics2D()
@@ -21,8 +22,8 @@ phys.append(ball)
 ball_charge = 1.0
 lorenz_scale = 10.0
 
-def update_callback(dt: float):
-    # 洛伦兹力垂直于速度方向
-    ball.extra_force = ball.velocity.rotate90() * ball_charge * ball_charge / ball.mass * lorenz_scale # type: ignore
+def lorenz_force(obj: PhysicalObject, pos: Pos2D, velocity: Vector2D):
+    # 洛伦兹力垂直于速度方向。积分时按步内各阶段的速度重新计算，轨迹不会越转越大
+    return velocity.rotate90() * ball_charge * ball_charge / obj.mass * lorenz_scale
 
-phys.update_callback = update_callback # type: ignore
\ No newline at end of file
+phys.integrator = Integrator("rk4", lorenz_force)
\ No newline at end of file